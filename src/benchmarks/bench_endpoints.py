@@ -0,0 +1,250 @@
+"""
+Measures the API and HTML endpoints against the local fixture replica and
+a stub MediaWiki server, and compares the results with a saved baseline.
+
+Builds the fixture replica first if it does not exist. Run from ``src/``::
+
+    python -m benchmarks.bench_endpoints --save baseline.json
+    python -m benchmarks.bench_endpoints --compare baseline.json
+
+For each endpoint it reports p50/p95 latency, the database queries per
+request on each alias and the peak memory allocated per request.
+``--compare`` exits with status 1 if an endpoint got slower or allocates
+more than ``--tolerance`` over the baseline, or makes more queries.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import ExitStack
+
+import django
+
+# Benchmark name: (URL name, query string).
+ENDPOINTS = {
+    "api-search": ("api-search", "q=river"),
+    "api-search-prefix": ("api-search", "q=River&mode=prefix"),
+    "api-stats": ("api-stats", ""),
+    "api-user": ("api-user", ""),
+    "search": ("search", "q=river"),
+    "profile": ("profile", ""),
+}
+
+BENCH_USERNAME = "BenchUser"
+
+
+def count_queries(counter, alias):
+    def wrapper(execute, sql, params, many, context):
+        counter[alias] += 1
+        return execute(sql, params, many, context)
+
+    return wrapper
+
+
+def measure(client, endpoint, requests, cold):
+    from django.core.cache import cache
+    from django.db import connections
+    from django.urls import reverse
+
+    url_name, query_string = endpoint
+    path = reverse(url_name) + (f"?{query_string}" if query_string else "")
+
+    for _ in range(3):
+        client.get(path)
+
+    timings = []
+    queries = Counter()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(
+                connections[alias].execute_wrapper(count_queries(queries, alias))
+            )
+        for _ in range(requests):
+            if cold:
+                cache.clear()
+            start = time.perf_counter()
+            response = client.get(path)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}")
+
+    peaks = []
+    tracemalloc.start()
+    for _ in range(min(requests, 20)):
+        if cold:
+            cache.clear()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        client.get(path)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    percentiles = statistics.quantiles(timings, n=100)
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(percentiles[94], 3),
+        "queries": {alias: count / requests for alias, count in queries.items()},
+        "peak_kib": round(statistics.median(peaks) / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance, min_ms):
+    """Returns a list of regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        slower = result["p95_ms"] - base["p95_ms"]
+        if slower > min_ms and result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {base['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms"
+            )
+        for alias, count in result["queries"].items():
+            if count > base["queries"].get(alias, 0):
+                regressions.append(
+                    f"{name}: {alias} queries "
+                    f"{base['queries'].get(alias, 0):g} -> {count:g}"
+                )
+        if result["peak_kib"] > base["peak_kib"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: peak {base['peak_kib']:.1f} -> {result['peak_kib']:.1f} KiB"
+            )
+    return regressions
+
+
+def print_results(results):
+    for name, result in results.items():
+        queries = " ".join(
+            f"{alias}={count:g}" for alias, count in sorted(result["queries"].items())
+        )
+        print(
+            f"{name:>18}: p50 {result['p50_ms']:8.2f} ms  "
+            f"p95 {result['p95_ms']:8.2f} ms  "
+            f"peak {result['peak_kib']:8.1f} KiB  queries {queries or '-'}"
+        )
+
+
+def setup(args, server):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "oauth_app.settings_bench")
+    os.environ["MEDIAWIKI_URL"] = server.url
+    os.environ.setdefault("MEDIAWIKI_KEY", "consumer-key")
+    os.environ.setdefault("MEDIAWIKI_SECRET", "consumer-secret")
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import connections
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment(debug=False)
+
+    replica = connections["wiki_replica"]
+    if "page" not in replica.introspection.table_names():
+        print("Building the fixture replica...")
+        call_command(
+            "create_fixture_replica",
+            pages=args.pages,
+            revisions=args.revisions,
+        )
+
+    # The default database is a throwaway test database with one user.
+    connections["default"].creation.create_test_db(verbosity=0, serialize=False)
+
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from social_django.models import UserSocialAuth
+
+    from user_profile.models import WikiActor
+
+    # The most active actor, so stats and edit counts have real work to do.
+    actor = WikiActor.objects.order_by("actor_id").first()
+    user = User.objects.create_user(username=BENCH_USERNAME)
+    UserSocialAuth.objects.create(
+        user=user,
+        provider="mediawiki",
+        uid="1",
+        extra_data={
+            "username": actor.actor_name,
+            "access_token": {
+                "oauth_token": "access-key",
+                "oauth_token_secret": "access-secret",
+            },
+        },
+    )
+
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--endpoint", action="append", choices=list(ENDPOINTS))
+    parser.add_argument(
+        "--cold",
+        action="store_true",
+        help="Clear the cache before every request.",
+    )
+    parser.add_argument("--save", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--min-ms",
+        type=float,
+        default=1.0,
+        help="Ignore p95 increases smaller than this many milliseconds.",
+    )
+    parser.add_argument("--pages", type=int, default=200000)
+    parser.add_argument("--revisions", type=int, default=1000000)
+    parser.add_argument("--request-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    from benchmarks.stub_mediawiki import StubMediaWikiServer
+
+    server = StubMediaWikiServer(request_delay=args.request_ms / 1000).start()
+    try:
+        client = setup(args, server)
+        results = {}
+        for name in args.endpoint or ENDPOINTS:
+            results[name] = measure(client, ENDPOINTS[name], args.requests, args.cold)
+    finally:
+        server.stop()
+
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "requests": args.requests,
+                    "cold": args.cold,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("cold") != args.cold:
+            print("Note: the baseline was taken with a different --cold setting.")
+        regressions = compare(results, baseline["results"], args.tolerance, args.min_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Compares the old ``SearchAPIView`` result pipeline (full ``WikiPage``
+instances, model properties and ``SearchResultSerializer``) with the
+``values_list`` fast path, on a 100-row result.
+
+Run from ``src/``::
+
+    python -m benchmarks.bench_search_serialization --rows 100
+"""
+
+import argparse
+import os
+import timeit
+import tracemalloc
+
+import django
+
+
+def make_rows(count):
+    """Rows as the replica returns them: every ``page`` column, bytes titles."""
+    return [
+        (
+            page_id,
+            0,
+            f"Example_page_title_{page_id}".encode(),
+            False,
+            False,
+            0.123456789,
+            b"20240101000000",
+            b"20240101000000",
+            1000 + page_id,
+            5000 + page_id,
+            b"wikitext",
+            None,
+        )
+        for page_id in range(1, count + 1)
+    ]
+
+
+def measure(label, func, number):
+    func()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+
+    per_call = timeit.timeit(func, number=number) / number * 1e6
+    print(
+        f"{label:>8}: {per_call:8.1f} us/request  "
+        f"peak {peak / 1024:7.1f} KiB  live blocks {blocks:6d}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "oauth_app.settings")
+    django.setup()
+
+    from user_profile.api_views import search_results_data
+    from user_profile.models import WikiPage
+    from user_profile.search import RESULT_COLUMNS
+    from user_profile.serializers import SearchResultSerializer
+
+    full_rows = make_rows(args.rows)
+    field_names = [field.attname for field in WikiPage._meta.concrete_fields]
+    column_positions = [field_names.index(column) for column in RESULT_COLUMNS]
+    value_rows = [tuple(row[i] for i in column_positions) for row in full_rows]
+
+    def model_pipeline():
+        pages = [
+            WikiPage.from_db("wiki_replica", field_names, row) for row in full_rows
+        ]
+        results_data = [
+            {
+                "page_id": page.page_id,
+                "page_title": page.full_title,
+                "page_namespace": page.page_namespace,
+                "page_is_redirect": page.page_is_redirect,
+                "page_len": page.page_len,
+                "url": page.url,
+            }
+            for page in pages
+        ]
+        return SearchResultSerializer(results_data, many=True).data
+
+    def values_pipeline():
+        return search_results_data(value_rows)
+
+    assert [dict(row) for row in model_pipeline()] == values_pipeline()
+
+    measure("models", model_pipeline, args.number)
+    measure("values", values_pipeline, args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Compares building an ``mwclient.Site`` per request with the pooled sites
+from ``user_profile.mediawiki``, against a local stub MediaWiki server.
+
+Run from ``src/``::
+
+    python -m benchmarks.bench_site_pool --requests 200 --connect-ms 20
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import django
+
+
+def measure(label, server, fetch, requests):
+    server.connections = server.requests = server.siteinfo_requests = 0
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fetch()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{label:>8}: p50 {statistics.median(timings):7.2f} ms  "
+        f"p95 {p95:7.2f} ms  "
+        f"connections {server.connections:4d}  "
+        f"http requests {server.requests:4d}  "
+        f"siteinfo {server.siteinfo_requests:4d}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument(
+        "--connect-ms",
+        type=float,
+        default=20.0,
+        help="Delay per new connection, standing in for the TLS handshake.",
+    )
+    parser.add_argument("--request-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    from benchmarks.stub_mediawiki import StubMediaWikiServer
+
+    server = StubMediaWikiServer(
+        connect_delay=args.connect_ms / 1000, request_delay=args.request_ms / 1000
+    ).start()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "oauth_app.settings")
+    os.environ["MEDIAWIKI_URL"] = server.url
+    os.environ.setdefault("MEDIAWIKI_KEY", "consumer-key")
+    os.environ.setdefault("MEDIAWIKI_SECRET", "consumer-secret")
+    django.setup()
+
+    from django.conf import settings
+    from mwclient import Site
+
+    from user_profile.mediawiki import SitePool
+
+    host = server.url.split("://", 1)[1]
+
+    def fresh_site():
+        site = Site(
+            host,
+            path="/w/",
+            scheme="http",
+            consumer_token=settings.SOCIAL_AUTH_MEDIAWIKI_KEY,
+            consumer_secret=settings.SOCIAL_AUTH_MEDIAWIKI_SECRET,
+            access_token="access-key",
+            access_secret="access-secret",
+        )
+        site.get("query", meta="userinfo", uiprop="email|groups|rights")
+        site.connection.close()
+
+    pool = SitePool()
+
+    def pooled_site():
+        site = pool.get("access-key", "access-secret")
+        site.get("query", meta="userinfo", uiprop="email|groups|rights")
+
+    try:
+        measure("fresh", server, fresh_site, args.requests)
+        measure("pooled", server, pooled_site, args.requests)
+    finally:
+        pool.clear()
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
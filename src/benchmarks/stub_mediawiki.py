@@ -0,0 +1,101 @@
+"""
+Minimal stand-in for the MediaWiki action API, for benchmarks.
+
+Answers ``meta=siteinfo`` and ``meta=userinfo`` queries over HTTP/1.1 with
+keep-alive, and can add an artificial delay per new connection (to model
+the TCP/TLS handshake to the real wiki) and per request.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+USERINFO = {
+    "id": 1,
+    "name": "BenchUser",
+    "email": "bench@example.org",
+    "groups": ["*", "user", "autoconfirmed"],
+    "rights": ["read", "edit", "createpage", "upload"],
+}
+
+SITEINFO = {
+    "general": {"generator": "MediaWiki 1.44.0", "sitename": "Stubpedia"},
+    "namespaces": {
+        "0": {"id": 0, "*": ""},
+        "6": {"id": 6, "*": "File"},
+        "14": {"id": 14, "*": "Category"},
+    },
+}
+
+
+class StubMediaWikiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, connect_delay=0.0, request_delay=0.0):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.connect_delay = connect_delay
+        self.request_delay = request_delay
+        self.connections = 0
+        self.requests = 0
+        self.siteinfo_requests = 0
+        self._counter_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server._counter_lock:
+            self.server.connections += 1
+        time.sleep(self.server.connect_delay)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.respond(self.path.partition("?")[2])
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.respond(self.rfile.read(length).decode("utf-8"))
+
+    def respond(self, query_string):
+        params = {k: v[0] for k, v in parse_qs(query_string).items()}
+        meta = params.get("meta", "").split("|")
+
+        with self.server._counter_lock:
+            self.server.requests += 1
+            if "siteinfo" in meta:
+                self.server.siteinfo_requests += 1
+        time.sleep(self.server.request_delay)
+
+        query = {}
+        if "siteinfo" in meta:
+            query.update(SITEINFO)
+        if "userinfo" in meta:
+            query["userinfo"] = USERINFO
+
+        body = json.dumps({"batchcomplete": True, "query": query}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
@@ -47,13 +47,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "user_profile.timing.RequestTimingMiddleware",
+    "user_profile.metrics.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "user_profile.credentials.CachedAuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "social_django.middleware.SocialAuthExceptionMiddleware",
@@ -85,6 +87,19 @@ WSGI_APPLICATION = "oauth_app.wsgi.application"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 if IS_TOOLFORGE:
+    WIKI_REPLICA_DATABASE = {
+        "ENGINE": "django.db.backends.mysql",
+        "NAME": "enwiki_p",
+        # Keep one connection per worker and check it before reuse.
+        "CONN_MAX_AGE": 300,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "charset": "utf8mb4",
+            "read_default_file": os.path.expanduser("~/replica.my.cnf"),
+            "connect_timeout": 5,
+        },
+    }
+
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.mysql",
@@ -97,13 +112,12 @@ if IS_TOOLFORGE:
             },
         },
         "wiki_replica": {
-            "ENGINE": "django.db.backends.mysql",
-            "NAME": "enwiki_p",
+            **WIKI_REPLICA_DATABASE,
             "HOST": "enwiki.analytics.db.svc.wikimedia.cloud",
-            "OPTIONS": {
-                "charset": "utf8mb4",
-                "read_default_file": os.path.expanduser("~/replica.my.cnf"),
-            },
+        },
+        "wiki_replica_web": {
+            **WIKI_REPLICA_DATABASE,
+            "HOST": "enwiki.web.db.svc.wikimedia.cloud",
         },
     }
 else:
@@ -114,6 +128,73 @@ else:
         }
     }
 
+# Local SQLite title index used by substring/fuzzy search; built with
+# ``manage.py build_title_index``. Namespaces it was not built for are still
+# searched on the replica. It is a snapshot whose build time is stored in its
+# ``meta`` table, so rebuild it regularly (e.g. a daily job) to find new pages.
+WIKI_TITLE_INDEX_PATH = os.environ.get(
+    "WIKI_TITLE_INDEX_PATH", str(BASE_DIR / "title_index.sqlite3")
+)
+
+# The MediaWiki models are read from the wiki replicas through a router,
+# which balances reads across WIKI_REPLICA_ALIASES and skips replicas that
+# are unreachable or lag more than WIKI_REPLICA_MAX_LAG seconds.
+DATABASE_ROUTERS = ["user_profile.replica.WikiReplicaRouter"]
+
+WIKI_REPLICA_ALIASES = ["wiki_replica", "wiki_replica_web"]
+# Table scans, LIKE searches, exports and management commands only use the
+# analytics replica; the web replicas are for short interactive queries.
+WIKI_REPLICA_BULK_ALIAS = "wiki_replica"
+WIKI_REPLICA_MAX_LAG = 300
+WIKI_REPLICA_LAG_QUERY = "SELECT lag FROM heartbeat_p.heartbeat WHERE shard = 's1'"
+
+# Seconds any single wiki replica query may run (see user_profile.replica).
+WIKI_REPLICA_QUERY_TIMEOUT = 30
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+if IS_TOOLFORGE:
+    # Shared between the uwsgi workers. FileBasedCache.add() is not atomic,
+    # so the locks built on it (request coalescing, background refresh of
+    # the stats cache) only keep workers apart on a best-effort basis.
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.expanduser("~/cache/django"),
+        }
+    }
+
+# Seconds the replica statistics are served fresh, and how long a stale
+# value may still be served while it is refreshed in the background.
+WIKI_STATS_CACHE_TTL = 600
+WIKI_STATS_CACHE_STALE_TTL = 86400
+
+# Stored edit counts are only topped up with new revisions, so they are
+# recounted from scratch once their last full count is older than this many
+# seconds, to pick up deleted, undeleted and imported revisions.
+WIKI_EDIT_COUNT_RECOUNT_AGE = 7 * 86400
+
+# Most usernames accepted by one /api/stats/batch/ request.
+WIKI_STATS_BATCH_MAX_USERS = 50
+
+# Namespace names and URLs come from the siteinfo of WIKI_SITE_URL, which
+# ``manage.py refresh_siteinfo`` saves to SITEINFO_CACHE_PATH for all
+# workers. Without that file the bundled enwiki snapshot is used.
+WIKI_SITE_URL = "https://en.wikipedia.org"
+SITEINFO_CACHE_PATH = (
+    os.path.expanduser("~/cache/siteinfo.json") if IS_TOOLFORGE else None
+)
+
+# Sessions are read from the cache and only written through to the database,
+# so with the cached user (see user_profile.credentials) a steady-state API
+# request runs no queries against the default database.
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+# Seconds a logged-in user is served from the cache.
+AUTH_USER_CACHE_TTL = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -141,6 +222,60 @@ AUTHENTICATION_BACKENDS = (
 SOCIAL_AUTH_PROTECTED_USER_FIELDS = ["groups"]
 
 
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+
+# Wiki replica queries slower than SLOW_QUERY_THRESHOLD seconds are logged
+# to one file per process next to SLOW_QUERY_LOG_PATH (slow_queries.<pid>.log)
+# and listed at admin/slow-queries/. With
+# SLOW_QUERY_EXPLAIN their plan is captured too, once per query every
+# SLOW_QUERY_EXPLAIN_INTERVAL seconds.
+SLOW_QUERY_THRESHOLD = 1.0
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "false").lower() == "true"
+SLOW_QUERY_EXPLAIN_INTERVAL = 300
+SLOW_QUERY_LOG_PATH = os.environ.get(
+    "SLOW_QUERY_LOG_PATH", str(BASE_DIR / "slow_queries.log")
+)
+
+# user_profile.timing logs one line per request with its phase timings.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+        "slow_queries": {
+            "class": "user_profile.slow_queries.ProcessRotatingFileHandler",
+            "filename": SLOW_QUERY_LOG_PATH,
+            "maxBytes": 5 * 1024 * 1024,
+            "backupCount": 5,
+            "encoding": "utf-8",
+        },
+    },
+    "loggers": {
+        "user_profile": {"handlers": ["console"], "level": "INFO"},
+        "user_profile.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+# Send the per-request phase timings to clients in a Server-Timing header.
+REQUEST_TIMING_HEADER = True
+
+# Prometheus metrics at /metrics. With several worker processes, each one
+# writes its values to METRICS_DIR every METRICS_FLUSH_INTERVAL seconds and
+# /metrics adds them up. If METRICS_TOKEN is set, scrapers must send it as a
+# bearer token.
+if IS_TOOLFORGE:
+    METRICS_DIR = os.path.expanduser("~/metrics")
+else:
+    METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -182,6 +317,27 @@ SOCIAL_AUTH_MEDIAWIKI_SECRET = os.environ.get("MEDIAWIKI_SECRET")
 SOCIAL_AUTH_MEDIAWIKI_URL = os.environ.get("MEDIAWIKI_URL")
 SOCIAL_AUTH_MEDIAWIKI_CALLBACK = os.environ.get("MEDIAWIKI_CALLBACK")
 
+# Pooled mwclient sites per access token (see user_profile.mediawiki).
+MEDIAWIKI_SITE_POOL_SIZE = 128
+MEDIAWIKI_SITE_IDLE_TIMEOUT = 300
+
+# Seconds a user's MediaWiki userinfo (groups, rights, email) is cached.
+MEDIAWIKI_USERINFO_CACHE_TTL = 3600
+
+SOCIAL_AUTH_PIPELINE = (
+    "social_core.pipeline.social_auth.social_details",
+    "social_core.pipeline.social_auth.social_uid",
+    "social_core.pipeline.social_auth.auth_allowed",
+    "social_core.pipeline.social_auth.social_user",
+    "social_core.pipeline.user.get_username",
+    "social_core.pipeline.user.create_user",
+    "social_core.pipeline.social_auth.associate_user",
+    "social_core.pipeline.social_auth.load_extra_data",
+    "social_core.pipeline.user.user_details",
+    "user_profile.pipeline.invalidate_cached_userinfo",
+    "user_profile.pipeline.forget_session_credentials",
+)
+
 LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "profile"
 
@@ -192,8 +348,47 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
+    "DEFAULT_THROTTLE_RATES": {
+        "search-export": "10/hour",
+    },
+}
+
+# Token buckets guarding the replica in the search and stats APIs, as
+# (tokens refilled per second, bucket size), per user and for all users.
+TOKEN_BUCKET_THROTTLES = {
+    "search": (1, 20),
+    "search-global": (30, 100),
+    "stats": (1, 20),
+    "stats-global": (50, 200),
+    "contributions": (1, 20),
+    "contributions-global": (30, 100),
+    "random": (1, 20),
+    "random-global": (30, 100),
+    "lookup": (1, 20),
+    "lookup-global": (30, 100),
 }
 
+# Most revisions returned by one /api/contributions/ page.
+CONTRIBUTIONS_MAX_LIMIT = 500
+
+# Most pages returned by one /api/random/ request, and the number of
+# consecutive pages taken from each random point in the page_random index.
+RANDOM_PAGES_MAX_COUNT = 100
+RANDOM_PAGES_RUN_LENGTH = 5
+
+# Most titles and page ids resolved by one /api/pages/lookup/ request.
+PAGE_LOOKUP_MAX_ITEMS = 500
+
+# Seconds browsers and proxies may reuse /api/search/ responses before
+# revalidating them with their ETag.
+SEARCH_CACHE_MAX_AGE = 60
+
+# Streaming search export: rows per replica query, most rows per export,
+# and most exports streaming at once from one worker.
+SEARCH_EXPORT_CHUNK_SIZE = 1000
+SEARCH_EXPORT_MAX_ROWS = 500000
+SEARCH_EXPORT_MAX_CONCURRENT = 2
+
 if IS_TOOLFORGE:
     CORS_ALLOWED_ORIGINS = [
         "https://harshita-wiki-test.toolforge.org",
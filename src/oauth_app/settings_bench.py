@@ -0,0 +1,33 @@
+"""
+Settings for load testing outside Toolforge.
+
+Registers a local database as ``wiki_replica`` so the replica code paths
+run against the synthetic data written by ``manage.py create_fixture_replica``:
+
+    DJANGO_SETTINGS_MODULE=oauth_app.settings_bench \\
+        python manage.py create_fixture_replica --pages 1000000
+
+Set ``WIKI_FIXTURE_REPLICA`` to use another SQLite file.
+"""
+
+import os
+
+from .settings import *  # noqa: F403
+from .settings import BASE_DIR, DATABASES, IS_TOOLFORGE
+
+if IS_TOOLFORGE:
+    raise RuntimeError("oauth_app.settings_bench must not be used on Toolforge")
+
+DATABASES = {
+    **DATABASES,
+    "wiki_replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get(
+            "WIKI_FIXTURE_REPLICA", str(BASE_DIR / "fixture_replica.sqlite3")
+        ),
+    },
+}
+
+# Load tests send many requests as one user, which the token buckets would
+# throttle; they measure the endpoints, not the throttling.
+TOKEN_BUCKET_THROTTLES = {}
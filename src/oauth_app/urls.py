@@ -2,11 +2,16 @@ from django.conf.urls.i18n import i18n_patterns
 from django.contrib import admin
 from django.urls import include, path
 
+from user_profile.metrics import metrics_view
+from user_profile.slow_queries import slow_queries_view
+
 urlpatterns = [
     path("i18n/", include("django.conf.urls.i18n")),
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 urlpatterns += i18n_patterns(  # type: ignore[arg-type]
+    path("admin/slow-queries/", slow_queries_view, name="admin-slow-queries"),
     path("admin/", admin.site.urls),
     path("", include("user_profile.urls")),
 )
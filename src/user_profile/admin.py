@@ -1 +1,22 @@
-# Register your models here.
+from django.contrib import admin
+
+from .models import NamespaceStats, UserEditCount
+
+
+@admin.register(UserEditCount)
+class UserEditCountAdmin(admin.ModelAdmin):
+    list_display = (
+        "mw_username",
+        "edit_count",
+        "max_rev_timestamp",
+        "recounted_at",
+        "updated_at",
+    )
+    search_fields = ("mw_username",)
+    readonly_fields = ("updated_at",)
+
+
+@admin.register(NamespaceStats)
+class NamespaceStatsAdmin(admin.ModelAdmin):
+    list_display = ("namespace", "page_count", "redirect_count", "refreshed_at")
+    readonly_fields = ("refreshed_at",)
@@ -1,15 +1,102 @@
-from urllib.parse import urlparse
+import csv
+import json
+import threading
 
 from django.conf import settings
-from mwclient import Site
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.views import APIView
 from social_django.models import UserSocialAuth
 
-from .models import WikiActor, WikiPage, WikiRevision
-from .serializers import SearchResultSerializer, UserInfoSerializer, WikiStatsSerializer
+from .coalescing import SingleFlight
+from .contributions import UnknownUser, contributions_page
+from .credentials import remember_username, resolve_credentials
+from .http_caching import etag_matches, make_etag, not_modified, set_cache_headers
+from .lookup import lookup_pages
+from .mediawiki import get_userinfo
+from .models import PAGE_LEN_BUCKETS, NamespaceStats, format_page_url
+from .namespaces import normalize_username, parse_namespace
+from .pagination import InvalidCursor
+from .random_pages import sample_pages
+from .replica import ReplicaQueryTimeout, replica_available
+from .search import (
+    DEFAULT_SEARCH_MODE,
+    SEARCH_MODES,
+    InvalidSearchMode,
+    iter_search_rows,
+    search_page,
+)
+from .serializers import (
+    BatchWikiStatsRequestSerializer,
+    NamespaceStatsSerializer,
+    PageLookupRequestSerializer,
+    UserInfoSerializer,
+    WikiStatsSerializer,
+)
+from .stats import (
+    get_edit_counts,
+    get_total_articles,
+    get_user_edit_count,
+    stats_flight,
+)
+from .throttling import TokenBucketThrottle
+
+# Identical searches running at the same time share one replica query.
+search_flight = SingleFlight("search")
+
+
+def parse_search_params(query_params):
+    """
+    Returns the ``search_pages`` keyword arguments for the API's query
+    parameters. Raises ``InvalidSearchMode`` for an unknown ``mode``.
+    """
+    try:
+        limit = min(int(query_params.get("limit", 10)), 100)
+    except ValueError:
+        limit = 10
+
+    namespace = parse_namespace(query_params.get("namespace"))
+
+    exclude_redirects = query_params.get("exclude_redirects", "true").lower() == "true"
+
+    mode = query_params.get("mode", DEFAULT_SEARCH_MODE)
+    if mode not in SEARCH_MODES:
+        raise InvalidSearchMode(mode)
+
+    return {
+        "namespace": namespace,
+        "exclude_redirects": exclude_redirects,
+        "limit": limit,
+        "mode": mode,
+    }
+
+
+def search_result_data(row):
+    """
+    Builds a ``SearchResultSerializer``-shaped dict from a ``RESULT_COLUMNS``
+    row. The values come straight from the replica, so they are not run
+    through the serializer's field validation.
+    """
+    page_id, namespace, title, is_redirect, page_len = row
+    if isinstance(title, bytes):
+        title = title.decode("utf-8")
+    return {
+        "page_id": page_id,
+        "page_title": title.replace("_", " "),
+        "page_namespace": namespace,
+        "page_is_redirect": bool(is_redirect),
+        "page_len": page_len,
+        "url": format_page_url(namespace, title),
+    }
+
+
+def search_results_data(rows):
+    """Builds a list of ``search_result_data`` dicts."""
+    return [search_result_data(row) for row in rows]
 
 
 class UserInfoAPIView(APIView):
@@ -19,23 +106,7 @@ class UserInfoAPIView(APIView):
 
     def get(self, request):
         try:
-            social_auth = request.user.social_auth.get(provider="mediawiki")
-
-            mw_username = (
-                social_auth.extra_data.get("username")
-                or social_auth.extra_data.get("user", {}).get("name")
-                or None
-            )
-
-            token_blob = social_auth.extra_data.get("access_token") or {}
-            if isinstance(token_blob, dict):
-                access_key = token_blob.get("oauth_token") or token_blob.get("key")
-                access_secret = token_blob.get("oauth_token_secret") or token_blob.get(
-                    "secret"
-                )
-            else:
-                access_key = token_blob
-                access_secret = social_auth.extra_data.get("access_token_secret")
+            mw_username, access_key, access_secret = resolve_credentials(request)
 
             if not access_key or not access_secret:
                 return Response(
@@ -43,27 +114,17 @@ class UserInfoAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            parsed_url = urlparse(settings.SOCIAL_AUTH_MEDIAWIKI_URL)
-            host = parsed_url.netloc
-            path = "/w/"
-
-            site = Site(
-                host,
-                path=path,
-                consumer_token=settings.SOCIAL_AUTH_MEDIAWIKI_KEY,
-                consumer_secret=settings.SOCIAL_AUTH_MEDIAWIKI_SECRET,
-                access_token=access_key,
-                access_secret=access_secret,
+            user_info = get_userinfo(
+                request.user.pk,
+                access_key,
+                access_secret,
+                refresh=request.GET.get("refresh") == "1",
             )
 
-            result = site.get("query", meta="userinfo", uiprop="email|groups|rights")
-            user_info = result.get("query", {}).get("userinfo", {})
-
             if not mw_username:
                 mw_username = user_info.get("name")
                 if mw_username:
-                    social_auth.extra_data["username"] = mw_username
-                    social_auth.save()
+                    remember_username(request, mw_username)
 
             data = {
                 "username": request.user.username,
@@ -71,7 +132,7 @@ class UserInfoAPIView(APIView):
                 "user_id": user_info.get("id"),
                 "email": user_info.get("email"),
                 "groups": user_info.get("groups", []),
-                "rights_count": len(user_info.get("rights", [])),
+                "rights_count": user_info.get("rights_count", 0),
             }
 
             serializer = UserInfoSerializer(data)
@@ -92,130 +153,479 @@ class WikiStatsAPIView(APIView):
     """API endpoint for Wikipedia statistics."""
 
     permission_classes = [IsAuthenticated]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "stats"
 
     def get(self, request):
         try:
-            if "wiki_replica" not in settings.DATABASES:
+            if not replica_available():
                 data = {
                     "total_articles": "N/A",
                     "user_edit_count": "N/A",
                 }
-                return Response(data)
+                return self.conditional_response(request, data)
 
-            social_auth = request.user.social_auth.get(provider="mediawiki")
-            mw_username = social_auth.extra_data.get("username")
+            mw_username = resolve_credentials(request)[0]
 
-            total_articles = (
-                WikiPage.objects.using("wiki_replica")
-                .filter(page_namespace=0, page_is_redirect=False)
-                .count()
-            )
+            total_articles = get_total_articles()
 
             user_edit_count = 0
             if mw_username:
-                username_bytes = (
-                    mw_username.encode("utf-8")
-                    if isinstance(mw_username, str)
-                    else mw_username
-                )
-                actor = (
-                    WikiActor.objects.using("wiki_replica")
-                    .filter(actor_name=username_bytes)
-                    .first()
+                user_edit_count = stats_flight.do(
+                    ("edit-count", mw_username),
+                    lambda: get_user_edit_count(mw_username),
                 )
 
-                if actor:
-                    user_edit_count = (
-                        WikiRevision.objects.using("wiki_replica")
-                        .filter(rev_actor=actor.actor_id)
-                        .count()
-                    )
-
             data = {
                 "total_articles": total_articles,
                 "user_edit_count": user_edit_count,
             }
+            return self.conditional_response(request, data, WikiStatsSerializer)
 
-            serializer = WikiStatsSerializer(data)
-            return Response(serializer.data)
-
+        except ReplicaQueryTimeout as e:
+            return Response({"error": str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def conditional_response(self, request, data, serializer_class=None):
+        """
+        Returns 304 if the client has these exact statistics, otherwise the
+        serialized ``data``. The response is per user, so it is private.
+        """
+        etag = make_etag("stats", request.user.pk, sorted(data.items()))
+        if etag_matches(request, etag):
+            return not_modified(etag, public=False)
+        if serializer_class is not None:
+            data = serializer_class(data).data
+        return set_cache_headers(Response(data), etag, public=False)
 
-class SearchAPIView(APIView):
-    """API endpoint for searching Wikipedia articles."""
+
+class BatchWikiStatsAPIView(APIView):
+    """API endpoint for the edit counts of several users at once."""
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        search_query = request.GET.get("q", "").strip()
+        usernames = []
+        for value in request.GET.getlist("usernames"):
+            usernames.extend(value.split("|"))
+        return self.batch_stats({"usernames": usernames})
 
-        if not search_query:
+    def post(self, request):
+        return self.batch_stats(request.data)
+
+    def batch_stats(self, data):
+        request_serializer = BatchWikiStatsRequestSerializer(data=data)
+        if not request_serializer.is_valid():
             return Response(
-                {"error": "Search query is required"},
-                status=status.HTTP_400_BAD_REQUEST,
+                request_serializer.errors, status=status.HTTP_400_BAD_REQUEST
             )
 
-        if "wiki_replica" not in settings.DATABASES:
+        if not replica_available():
             return Response(
-                {"error": "Search only available on Toolforge"},
+                {"error": "Statistics only available on Toolforge"},
                 status=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
+        usernames = request_serializer.validated_data["usernames"]
+        try:
+            edit_counts = get_edit_counts(usernames)
+            users = {
+                username: WikiStatsSerializer({"user_edit_count": count}).data
+                for username, count in edit_counts.items()
+            }
+            return Response(
+                {
+                    "total_articles": get_total_articles(),
+                    "users": users,
+                    "missing": [name for name in usernames if name not in users],
+                }
+            )
+
+        except ReplicaQueryTimeout as e:
+            return Response({"error": str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+        except Exception as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class NamespaceStatsAPIView(APIView):
+    """
+    API endpoint for per-namespace page statistics. Reads only the local
+    table filled by ``manage.py refresh_namespace_stats``.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        namespaces = list(NamespaceStats.objects.all())
+        etag = make_etag(
+            "namespace-stats", [(ns.namespace, ns.refreshed_at) for ns in namespaces]
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag, public=True)
+
+        response = Response(
+            {
+                "len_buckets": list(PAGE_LEN_BUCKETS),
+                "namespaces": NamespaceStatsSerializer(namespaces, many=True).data,
+            }
+        )
+        return set_cache_headers(response, etag, public=True)
+
+
+class ContributionsAPIView(APIView):
+    """
+    API endpoint for the edits of a user, newest first. Defaults to the
+    logged-in user; ``next`` is the cursor for older edits.
+    """
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "contributions"
+
+    def get(self, request):
         try:
-            limit = min(int(request.GET.get("limit", 10)), 100)
+            limit = int(request.GET.get("limit", 50))
         except ValueError:
-            limit = 10
+            limit = 50
+        limit = max(1, min(limit, getattr(settings, "CONTRIBUTIONS_MAX_LIMIT", 500)))
 
+        mw_username = normalize_username(request.GET.get("user", ""))
         try:
-            namespace = int(request.GET.get("namespace", 0))
+            if not mw_username:
+                mw_username = resolve_credentials(request)[0]
+        except UserSocialAuth.DoesNotExist:
+            mw_username = None
+        if not mw_username:
+            return Response(
+                {"error": "User is required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not replica_available():
+            return Response(
+                {"error": "Contributions only available on Toolforge"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        try:
+            results, next_cursor = contributions_page(
+                mw_username, cursor=request.GET.get("cursor"), limit=limit
+            )
+            return Response(
+                {
+                    "user": mw_username,
+                    "results": results,
+                    "count": len(results),
+                    "next": next_cursor,
+                }
+            )
+
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except UnknownUser:
+            return Response(
+                {"error": f"Unknown user: {mw_username}"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except ReplicaQueryTimeout as e:
+            return Response({"error": str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+        except Exception as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class RandomPagesAPIView(APIView):
+    """API endpoint for random pages in a namespace."""
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "random"
+
+    def get(self, request):
+        try:
+            count = int(request.GET.get("count", 10))
         except ValueError:
-            namespace = 0
+            count = 10
+        count = max(1, min(count, getattr(settings, "RANDOM_PAGES_MAX_COUNT", 100)))
+
+        namespace = parse_namespace(request.GET.get("namespace"))
 
         exclude_redirects = (
             request.GET.get("exclude_redirects", "true").lower() == "true"
         )
 
+        if not replica_available():
+            return Response(
+                {"error": "Random pages only available on Toolforge"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
         try:
-            query = WikiPage.objects.using("wiki_replica").filter(
-                page_namespace=namespace
-            )
-
-            if search_query:
-                search_term = search_query.replace(" ", "_")
-                query = query.filter(page_title__contains=search_term)
-
-            if exclude_redirects:
-                query = query.filter(page_is_redirect=False)
-
-            results = list(query[:limit])
-
-            results_data = []
-            for page in results:
-                results_data.append(
-                    {
-                        "page_id": page.page_id,
-                        "page_title": page.full_title,
-                        "page_namespace": page.page_namespace,
-                        "page_is_redirect": page.page_is_redirect,
-                        "page_len": page.page_len,
-                        "url": page.url,
-                    }
-                )
+            rows = sample_pages(
+                count, namespace=namespace, exclude_redirects=exclude_redirects
+            )
+            response = Response(
+                {"results": search_results_data(rows), "count": len(rows)}
+            )
+            # Every request should get a new sample.
+            patch_cache_control(response, no_store=True)
+            return response
 
-            serializer = SearchResultSerializer(results_data, many=True)
+        except ReplicaQueryTimeout as e:
+            return Response({"error": str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+        except Exception as e:
             return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class PageLookupAPIView(APIView):
+    """
+    API endpoint resolving many titles or page ids at once. Takes
+    ``titles`` and ``ids`` separated by ``|`` on GET, or as JSON lists on
+    POST.
+    """
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "lookup"
+
+    def get(self, request):
+        data = {}
+        for name in ("titles", "ids"):
+            values = []
+            for value in request.GET.getlist(name):
+                values.extend(part for part in value.split("|") if part)
+            data[name] = values
+        return self.lookup(data)
+
+    def post(self, request):
+        return self.lookup(request.data)
+
+    def lookup(self, data):
+        request_serializer = PageLookupRequestSerializer(data=data)
+        if not request_serializer.is_valid():
+            return Response(
+                request_serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not replica_available():
+            return Response(
+                {"error": "Page lookup only available on Toolforge"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        try:
+            rows, missing, invalid = lookup_pages(
+                request_serializer.validated_data["titles"],
+                request_serializer.validated_data["ids"],
+            )
+            return Response(
+                {
+                    "results": search_results_data(rows),
+                    "count": len(rows),
+                    "missing": missing,
+                    "invalid": invalid,
+                }
+            )
+
+        except ReplicaQueryTimeout as e:
+            return Response({"error": str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+        except Exception as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class SearchAPIView(APIView):
+    """API endpoint for searching Wikipedia articles."""
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "search"
+
+    def get(self, request):
+        search_query = request.GET.get("q", "").strip()
+
+        if not search_query:
+            return Response(
+                {"error": "Search query is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if not replica_available():
+            return Response(
+                {"error": "Search only available on Toolforge"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        try:
+            params = parse_search_params(request.GET)
+        except InvalidSearchMode:
+            return Response(
+                {"error": f"Invalid mode, expected one of: {', '.join(SEARCH_MODES)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        cursor = request.GET.get("cursor")
+        try:
+            results, next_cursor = search_flight.do(
+                (search_query, cursor, tuple(sorted(params.items()))),
+                lambda: search_page(search_query, cursor=cursor, values=True, **params),
+            )
+
+            # Results are the same for every user, so shared caches may keep them.
+            max_age = getattr(settings, "SEARCH_CACHE_MAX_AGE", 60)
+            etag = make_etag(
+                "search", search_query, params, cursor, results, next_cursor
+            )
+            if etag_matches(request, etag):
+                return not_modified(etag, public=True, max_age=max_age)
+
+            response = Response(
                 {
-                    "results": serializer.data,
+                    "results": search_results_data(results),
                     "count": len(results),
                     "query": search_query,
+                    "mode": params["mode"],
+                    "next": next_cursor,
                 }
             )
+            return set_cache_headers(response, etag, public=True, max_age=max_age)
 
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ReplicaQueryTimeout as e:
+            return Response({"error": str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value, for ``csv.writer``."""
+
+    def write(self, value):
+        return value
+
+
+class _ExportStream:
+    """
+    Streamed export body that frees its export slot when the response is
+    closed, which Django does even if the client goes away mid-stream.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.released = False
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def close(self):
+        if not self.released:
+            self.released = True
+            _export_slots.release()
+
+
+# Caps the number of exports streaming from this worker at the same time.
+_export_slots = threading.BoundedSemaphore(
+    getattr(settings, "SEARCH_EXPORT_MAX_CONCURRENT", 2)
+)
+
+
+class SearchExportAPIView(APIView):
+    """API endpoint streaming every search match as NDJSON or CSV."""
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = "search-export"
+
+    export_formats = {
+        "ndjson": "application/x-ndjson",
+        "csv": "text/csv",
+    }
+
+    def get(self, request):
+        search_query = request.GET.get("q", "").strip()
+        if not search_query:
+            return Response(
+                {"error": "Search query is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        output = request.GET.get("output", "ndjson")
+        if output not in self.export_formats:
+            return Response(
+                {
+                    "error": f"Invalid output, expected one of: {', '.join(self.export_formats)}"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if not replica_available():
+            return Response(
+                {"error": "Search only available on Toolforge"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        try:
+            params = parse_search_params(request.GET)
+        except InvalidSearchMode:
+            params = None
+        if params is None or params["mode"] == "fuzzy":
+            return Response(
+                {"error": "Invalid mode, expected one of: prefix, substring"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        del params["limit"]
+
+        if not _export_slots.acquire(blocking=False):
+            return Response(
+                {"error": "Too many exports running, try again later"},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+            )
+
+        rows = iter_search_rows(
+            search_query,
+            chunk_size=getattr(settings, "SEARCH_EXPORT_CHUNK_SIZE", 1000),
+            max_rows=getattr(settings, "SEARCH_EXPORT_MAX_ROWS", None),
+            **params,
+        )
+        encode = self.csv_lines if output == "csv" else self.ndjson_lines
+        response = StreamingHttpResponse(
+            _ExportStream(encode(rows)),
+            content_type=self.export_formats[output],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="search-export.{output}"'
+        )
+        return response
+
+    @staticmethod
+    def ndjson_lines(rows):
+        # One row at a time, so the body streams while later chunks load.
+        for row in rows:
+            yield json.dumps(search_result_data(row)) + "\n"
+
+    @staticmethod
+    def csv_lines(rows):
+        writer = csv.writer(_Echo())
+        fields = [
+            "page_id",
+            "page_title",
+            "page_namespace",
+            "page_is_redirect",
+            "page_len",
+            "url",
+        ]
+        yield writer.writerow(fields)
+        for row in rows:
+            result = search_result_data(row)
+            yield writer.writerow([result[field] for field in fields])
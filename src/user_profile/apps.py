@@ -1,6 +1,26 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class UserProfileConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "user_profile"
+
+    def ready(self):
+        from .credentials import invalidate_cached_user
+        from .metrics import install_replica_metrics
+        from .replica import configure_replica_connection
+        from .slow_queries import install_slow_query_log
+        from .timing import install_query_timer
+
+        # Before the timeout guard, so timeouts are counted as such.
+        connection_created.connect(install_replica_metrics)
+        connection_created.connect(install_slow_query_log)
+        connection_created.connect(configure_replica_connection)
+        connection_created.connect(install_query_timer)
+
+        user_model = get_user_model()
+        post_save.connect(invalidate_cached_user, sender=user_model)
+        post_delete.connect(invalidate_cached_user, sender=user_model)
@@ -0,0 +1,252 @@
+"""
+Async variants of the API views.
+
+The MediaWiki userinfo call and the replica queries are independent, so
+they run concurrently on worker threads and a response takes about as
+long as the slowest of them. Under WSGI Django still runs these views in
+an event loop per request, so the concurrency applies there too.
+"""
+
+import asyncio
+import math
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.http import JsonResponse
+from social_django.models import UserSocialAuth
+
+from .api_views import parse_search_params, search_flight, search_results_data
+from .credentials import aremember_username, aresolve_credentials
+from .mediawiki import get_userinfo
+from .pagination import InvalidCursor
+from .replica import ReplicaQueryTimeout, replica_available
+from .search import SEARCH_MODES, InvalidSearchMode, search_page
+from .serializers import UserInfoSerializer, WikiStatsSerializer
+from .stats import get_total_articles, get_user_edit_count, stats_flight
+from .throttling import throttle_wait
+
+
+def _close_connections_after(func):
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # The thread is not reused for requests, so CONN_MAX_AGE does not
+            # apply and close_old_connections() would leave them open.
+            connections.close_all()
+
+    return wrapper
+
+
+def run_in_thread(func, *args, **kwargs):
+    """
+    Runs blocking ``func`` on its own worker thread, so several calls can
+    overlap. Database connections opened by the thread are closed afterwards.
+    """
+    return sync_to_async(_close_connections_after(func), thread_sensitive=False)(
+        *args, **kwargs
+    )
+
+
+def error_response(message, status):
+    return JsonResponse({"error": message}, status=status)
+
+
+async def authenticated_user(request):
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def not_authenticated():
+    return JsonResponse(
+        {"detail": "Authentication credentials were not provided."}, status=403
+    )
+
+
+async def throttled(request, scope):
+    """
+    Applies the token buckets of ``scope``, as ``throttle_scope`` does for
+    the DRF views. Returns a 429 response if the request must wait.
+    """
+    wait = await sync_to_async(throttle_wait)(request, scope)
+    if wait is None:
+        return None
+    seconds = math.ceil(wait)
+    response = JsonResponse(
+        {"detail": f"Request was throttled. Expected available in {seconds} seconds."},
+        status=429,
+    )
+    response["Retry-After"] = str(seconds)
+    return response
+
+
+async def _fetch_user_data(request, user, credentials):
+    """Returns the ``UserInfoSerializer`` data for ``user``."""
+    mw_username, access_key, access_secret = credentials
+    user_info = await run_in_thread(
+        get_userinfo,
+        user.pk,
+        access_key,
+        access_secret,
+        refresh=request.GET.get("refresh") == "1",
+    )
+    if not mw_username:
+        mw_username = user_info.get("name")
+        if mw_username:
+            await aremember_username(request, mw_username)
+
+    return UserInfoSerializer(
+        {
+            "username": user.username,
+            "mw_username": mw_username,
+            "user_id": user_info.get("id"),
+            "email": user_info.get("email"),
+            "groups": user_info.get("groups", []),
+            "rights_count": user_info.get("rights_count", 0),
+        }
+    ).data
+
+
+async def _fetch_edit_count(mw_username):
+    if not mw_username:
+        return 0
+    return await run_in_thread(
+        stats_flight.do,
+        ("edit-count", mw_username),
+        lambda: get_user_edit_count(mw_username),
+    )
+
+
+async def user_info(request):
+    """Async counterpart of ``UserInfoAPIView``."""
+    user = await authenticated_user(request)
+    if user is None:
+        return not_authenticated()
+
+    try:
+        credentials = await aresolve_credentials(request)
+        if not credentials[1] or not credentials[2]:
+            return error_response("Missing OAuth credentials", 400)
+        return JsonResponse(await _fetch_user_data(request, user, credentials))
+    except UserSocialAuth.DoesNotExist:
+        return error_response("No MediaWiki social-auth record", 404)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+async def wiki_stats(request):
+    """Async counterpart of ``WikiStatsAPIView``."""
+    user = await authenticated_user(request)
+    if user is None:
+        return not_authenticated()
+    response = await throttled(request, "stats")
+    if response is not None:
+        return response
+
+    try:
+        if not replica_available():
+            return JsonResponse({"total_articles": "N/A", "user_edit_count": "N/A"})
+
+        mw_username = (await aresolve_credentials(request))[0]
+
+        total_articles, user_edit_count = await asyncio.gather(
+            run_in_thread(get_total_articles), _fetch_edit_count(mw_username)
+        )
+        data = {"total_articles": total_articles, "user_edit_count": user_edit_count}
+        return JsonResponse(WikiStatsSerializer(data).data)
+    except ReplicaQueryTimeout as e:
+        return error_response(str(e), 504)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+async def search(request):
+    """Async counterpart of ``SearchAPIView``."""
+    user = await authenticated_user(request)
+    if user is None:
+        return not_authenticated()
+    response = await throttled(request, "search")
+    if response is not None:
+        return response
+
+    search_query = request.GET.get("q", "").strip()
+    if not search_query:
+        return error_response("Search query is required", 400)
+
+    if not replica_available():
+        return error_response("Search only available on Toolforge", 503)
+
+    try:
+        params = parse_search_params(request.GET)
+    except InvalidSearchMode:
+        return error_response(
+            f"Invalid mode, expected one of: {', '.join(SEARCH_MODES)}", 400
+        )
+
+    cursor = request.GET.get("cursor")
+    try:
+        # Same key as SearchAPIView, so both share one replica query.
+        results, next_cursor = await run_in_thread(
+            search_flight.do,
+            (search_query, cursor, tuple(sorted(params.items()))),
+            lambda: search_page(search_query, cursor=cursor, values=True, **params),
+        )
+        return JsonResponse(
+            {
+                "results": search_results_data(results),
+                "count": len(results),
+                "query": search_query,
+                "mode": params["mode"],
+                "next": next_cursor,
+            }
+        )
+    except InvalidCursor as e:
+        return error_response(str(e), 400)
+    except ReplicaQueryTimeout as e:
+        return error_response(str(e), 504)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+async def profile(request):
+    """
+    Combined user info and statistics, fetching the MediaWiki userinfo and
+    the replica counts concurrently.
+    """
+    user = await authenticated_user(request)
+    if user is None:
+        return not_authenticated()
+
+    try:
+        credentials = await aresolve_credentials(request)
+    except UserSocialAuth.DoesNotExist:
+        return error_response("No MediaWiki social-auth record", 404)
+
+    mw_username, access_key, access_secret = credentials
+    if not access_key or not access_secret:
+        return error_response("Missing OAuth credentials", 400)
+
+    has_replica = replica_available()
+    tasks = [_fetch_user_data(request, user, credentials)]
+    if has_replica:
+        tasks.append(run_in_thread(get_total_articles))
+        if mw_username:
+            tasks.append(_fetch_edit_count(mw_username))
+
+    try:
+        user_data, *counts = await asyncio.gather(*tasks)
+        if not has_replica:
+            stats = {"total_articles": "N/A", "user_edit_count": "N/A"}
+        else:
+            if not mw_username:
+                # Only known once userinfo has answered.
+                counts.append(await _fetch_edit_count(user_data["mw_username"]))
+            stats = WikiStatsSerializer(
+                {"total_articles": counts[0], "user_edit_count": counts[1]}
+            ).data
+    except ReplicaQueryTimeout as e:
+        return error_response(str(e), 504)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+    return JsonResponse({"user": user_data, "stats": stats})
@@ -0,0 +1,118 @@
+"""
+Two-tier caching for values that are expensive to compute on the replica.
+
+Values live in a per-process memory tier in front of Django's cache
+framework, which is shared between workers. Once an entry is older than
+``ttl`` it is served stale for up to ``stale_ttl`` while a single background
+thread recomputes it, so requests only wait on the loader when nothing has
+been cached at all.
+
+The background refresh is guarded by a ``cache.add`` lock, so only one
+worker recomputes an entry, unless the cache's ``add`` is not atomic. With
+the ``FileBasedCache`` used on Toolforge two workers may occasionally both
+refresh it, which costs a duplicate query but serves nothing wrong.
+"""
+
+import logging
+import threading
+import time
+
+from django.core.cache import caches
+from django.db import connections
+
+from .metrics import cache_requests
+
+logger = logging.getLogger(__name__)
+
+
+class TieredCache:
+    def __init__(self, name, ttl, stale_ttl, cache_alias="default"):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.cache_alias = cache_alias
+        self._local = {}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    def _key(self, key):
+        return f"{self.name}:{key}"
+
+    def get(self, key, loader):
+        """
+        Returns the cached value for ``key``, calling ``loader()`` to compute
+        it on a cold cache or in the background once the entry is stale.
+        """
+        now = time.time()
+        entry = self._local.get(key)
+        if entry is None or entry[1] <= now:
+            shared_entry = self.shared.get(self._key(key))
+            if shared_entry is not None and (
+                entry is None or shared_entry[1] > entry[1]
+            ):
+                entry = shared_entry
+                self._local[key] = entry
+
+        if entry is None or entry[2] <= now:
+            cache_requests.inc(cache=self.name, result="miss")
+            return self.refresh(key, loader)
+
+        value, fresh_until, _ = entry
+        if fresh_until <= now:
+            cache_requests.inc(cache=self.name, result="stale")
+            self._start_refresh(key, loader)
+        else:
+            cache_requests.inc(cache=self.name, result="hit")
+        return value
+
+    def peek(self, key):
+        """Returns the cached value for ``key`` without loading, or None."""
+        entry = self._local.get(key) or self.shared.get(self._key(key))
+        if entry is None or entry[2] <= time.time():
+            return None
+        return entry[0]
+
+    def set(self, key, value):
+        now = time.time()
+        entry = (value, now + self.ttl, now + self.stale_ttl)
+        self._local[key] = entry
+        self.shared.set(self._key(key), entry, timeout=self.stale_ttl)
+        return value
+
+    def refresh(self, key, loader):
+        """Computes ``key`` now and stores it in both tiers."""
+        return self.set(key, loader())
+
+    def invalidate(self, key):
+        self._local.pop(key, None)
+        self.shared.delete(self._key(key))
+
+    def _start_refresh(self, key, loader):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            # Usually only one worker process recomputes a given stale entry
+            # (best-effort: see the module docstring).
+            if not self.shared.add(self._key(key) + ":refreshing", 1, self.ttl):
+                return
+            self._refreshing.add(key)
+
+        thread = threading.Thread(
+            target=self._refresh_in_background, args=(key, loader), daemon=True
+        )
+        thread.start()
+
+    def _refresh_in_background(self, key, loader):
+        try:
+            self.refresh(key, loader)
+        except Exception:
+            logger.exception("Background refresh of %s failed", self._key(key))
+        finally:
+            self.shared.delete(self._key(key) + ":refreshing")
+            with self._lock:
+                self._refreshing.discard(key)
+            connections.close_all()
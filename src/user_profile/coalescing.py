@@ -0,0 +1,132 @@
+"""
+Single-flight request coalescing.
+
+When many requests ask for the same expensive value at once, e.g. a search
+link that is being shared, only one of them should run the replica query.
+``SingleFlight.do(key, loader)`` makes concurrent calls with the same key
+share one call of ``loader``:
+
+* Within a process, the first thread runs the loader and the others wait
+  for its result.
+* Across worker processes, that thread first takes a lock in the shared
+  cache with ``cache.add``. If another worker holds it, the thread waits
+  for that worker to publish its result in the cache instead of querying.
+
+The result is only shared with calls that were waiting for it, so nothing
+is served from a previous flight. If the other worker fails or takes longer
+than ``wait_timeout``, the waiting worker runs the loader itself.
+
+Coalescing across processes is best-effort. It is only strict when the
+cache's ``add`` is atomic, as with Redis or memcached. The
+``FileBasedCache`` used on Toolforge checks for the key and then writes it,
+so two workers can both take the lock and each run the loader. Within a
+process, coalescing is always strict.
+"""
+
+import hashlib
+import threading
+import time
+import uuid
+
+from django.core.cache import caches
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(
+        self,
+        name,
+        cache_alias="default",
+        lock_timeout=60,
+        wait_timeout=30,
+        poll_interval=0.05,
+    ):
+        self.name = name
+        self.cache_alias = cache_alias
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    def _key(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8"), usedforsecurity=False)
+        return f"single-flight:{self.name}:{digest.hexdigest()}"
+
+    def do(self, key, loader):
+        """Returns ``loader()``, sharing one call among concurrent callers of ``key``."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._load_shared(self._key(key), loader)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _load_shared(self, cache_key, loader):
+        """Runs ``loader`` unless another worker is already running it."""
+        lock_key = f"{cache_key}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+
+        while not self.shared.add(lock_key, token, self.lock_timeout):
+            other = self.shared.get(lock_key)
+            # None if it was released between add and get; just retry.
+            if other is not None:
+                found, result = self._wait_for(cache_key, other, lock_key, deadline)
+                if found:
+                    return result
+            if time.monotonic() >= deadline:
+                return loader()
+
+        try:
+            result = loader()
+            # Waiting workers match the token, so they never get an older result.
+            self.shared.set(f"{cache_key}:result", (token, result), self.lock_timeout)
+            return result
+        finally:
+            if self.shared.get(lock_key) == token:
+                self.shared.delete(lock_key)
+
+    def _wait_for(self, cache_key, token, lock_key, deadline):
+        """
+        Waits for the flight ``token`` of another worker. Returns
+        ``(True, result)`` once it is published, or ``(False, None)`` if the
+        lock went away without one or the deadline passed.
+        """
+        while time.monotonic() < deadline:
+            # The result is published before the lock is released, so read
+            # the lock first to not miss a result that lands in between.
+            holder = self.shared.get(lock_key)
+            published = self.shared.get(f"{cache_key}:result")
+            if published is not None and published[0] == token:
+                return True, published[1]
+            if holder != token:
+                return False, None
+            time.sleep(self.poll_interval)
+        return False, None
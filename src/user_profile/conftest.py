@@ -0,0 +1,34 @@
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+
+@pytest.fixture
+def user(db):
+    """Create test user."""
+    return User.objects.create_user(username="testuser", password="testpass123")
+
+
+@pytest.fixture
+def authenticated_client(client, user):
+    """Create authenticated client."""
+    client.login(username="testuser", password="testpass123")
+    return client
+
+
+@pytest.fixture
+def fixture_replica(request, db):
+    """
+    Fills the default database with a small synthetic replica. Other sizes
+    are passed as ``create_fixture_replica`` options by parametrizing it
+    indirectly::
+
+        @pytest.mark.parametrize("fixture_replica", [{"pages": 300}], indirect=True)
+    """
+    options = {"pages": 100, "actors": 2, "revisions": 1}
+    options.update(getattr(request, "param", {}))
+    call_command(
+        "create_fixture_replica", database="default", stdout=StringIO(), **options
+    )
@@ -0,0 +1,123 @@
+"""
+User contributions read from the wiki replica.
+
+Revisions are listed newest first and paged with keyset cursors over
+``(rev_timestamp, rev_id)`` within one actor, so each page is a single seek
+on the replica's ``(rev_actor, rev_timestamp, rev_id)`` index however far
+back it is. The titles for a page of revisions come from one
+``page_id IN (...)`` lookup.
+"""
+
+from django.db.models import Q
+
+from .models import WikiPage, WikiRevision, format_full_title, format_page_url
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+from .stats import find_actor_id
+from .timing import phase
+
+# Columns fetched per revision, in ``values_list`` order.
+CONTRIBUTION_COLUMNS = (
+    "rev_id",
+    "rev_page",
+    "rev_timestamp",
+    "rev_minor_edit",
+    "rev_len",
+    "rev_parent_id",
+)
+
+
+class UnknownUser(LookupError):
+    pass
+
+
+def format_timestamp(timestamp):
+    """Returns a MediaWiki ``YYYYMMDDHHMMSS`` timestamp in ISO 8601 (UTC)."""
+    ts = timestamp.decode("ascii") if isinstance(timestamp, bytes) else timestamp
+    return f"{ts[0:4]}-{ts[4:6]}-{ts[6:8]}T{ts[8:10]}:{ts[10:12]}:{ts[12:14]}Z"
+
+
+@phase("contributions")
+def fetch_revisions(actor_id, before=None, limit=50):
+    """
+    Returns up to ``limit`` ``CONTRIBUTION_COLUMNS`` rows by ``actor_id``,
+    newest first, older than the ``(rev_timestamp, rev_id)`` key ``before``.
+    """
+    revisions = WikiRevision.objects.filter(rev_actor=actor_id)
+    if before is not None:
+        timestamp, rev_id = before
+        # The plain upper bound lets the index do a range seek; the OR only
+        # breaks ties between revisions saved in the same second.
+        revisions = revisions.filter(rev_timestamp__lte=timestamp).filter(
+            Q(rev_timestamp__lt=timestamp) | Q(rev_id__lt=rev_id)
+        )
+    revisions = revisions.order_by("-rev_timestamp", "-rev_id")
+    return list(revisions.values_list(*CONTRIBUTION_COLUMNS)[:limit])
+
+
+def fetch_titles(page_ids):
+    """Returns ``{page_id: (page_namespace, page_title)}`` in one query."""
+    if not page_ids:
+        return {}
+    rows = WikiPage.objects.filter(page_id__in=set(page_ids)).values_list(
+        "page_id", "page_namespace", "page_title"
+    )
+    return {page_id: (namespace, title) for page_id, namespace, title in rows}
+
+
+def contributions_data(rows, titles):
+    """
+    Builds ``ContributionSerializer``-shaped dicts from ``CONTRIBUTION_COLUMNS``
+    rows. Pages missing from ``titles``, e.g. deleted since, have no title.
+    """
+    results = []
+    for rev_id, page_id, timestamp, minor, rev_len, parent_id in rows:
+        namespace, title = titles.get(page_id, (None, None))
+        results.append(
+            {
+                "rev_id": rev_id,
+                "parent_id": parent_id or None,
+                "page_id": page_id,
+                "page_namespace": namespace,
+                "page_title": None if title is None else format_full_title(title),
+                "url": None if title is None else format_page_url(namespace, title),
+                "timestamp": format_timestamp(timestamp),
+                "minor": bool(minor),
+                "size": rev_len,
+            }
+        )
+    return results
+
+
+def contributions_page(mw_username, cursor=None, limit=50):
+    """
+    Returns one page of the contributions of ``mw_username`` and the cursor
+    for the next page, or None after the oldest revision.
+    Raises ``UnknownUser`` if the replica has no actor of that name, and
+    ``InvalidCursor`` if ``cursor`` cannot be decoded.
+    """
+    before = None
+    if cursor:
+        key = decode_cursor(cursor)
+        if (
+            not isinstance(key, dict)
+            or not isinstance(key.get("ts"), str)
+            or not isinstance(key.get("id"), int)
+        ):
+            raise InvalidCursor("Invalid cursor")
+        before = (key["ts"], key["id"])
+
+    actor_id = find_actor_id(mw_username)
+    if actor_id is None:
+        raise UnknownUser(mw_username)
+
+    rows = fetch_revisions(actor_id, before=before, limit=limit + 1)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        rev_id, _, timestamp = rows[-1][:3]
+        if isinstance(timestamp, bytes):
+            timestamp = timestamp.decode("ascii")
+        next_cursor = encode_cursor({"ts": timestamp, "id": rev_id})
+
+    titles = fetch_titles([row[1] for row in rows])
+    return contributions_data(rows, titles), next_cursor
@@ -0,0 +1,121 @@
+"""
+Per-session credential and user caching.
+
+Every API request needs the MediaWiki username and OAuth token pair of the
+logged-in user. Reading them from the social-auth record, and the user from
+``auth_user``, costs two queries against the ``default`` database per
+request. Both are instead kept where the request already looks:
+
+* ``resolve_credentials`` stores the parsed ``(mw_username, access_key,
+  access_secret)`` in the session the first time it is needed. Sessions use
+  the ``cached_db`` engine, so reading them is a cache hit; the tokens are
+  never sent to the browser as they would be with signed-cookie sessions.
+* ``CachedAuthenticationMiddleware`` loads ``request.user`` from the cache,
+  keyed by user id, and checks the session auth hash like Django does, so a
+  password change still logs other sessions out.
+
+The login pipeline drops the stored credentials, and saving or deleting a
+user drops the cached user.
+"""
+
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from .mediawiki import get_credentials
+
+CREDENTIALS_SESSION_KEY = "mediawiki_credentials"
+
+
+def resolve_credentials(request):
+    """
+    Returns ``(mw_username, access_key, access_secret)`` for the user of
+    ``request``, from the session if they were resolved before. Raises
+    ``UserSocialAuth.DoesNotExist`` for users who did not log in with
+    MediaWiki.
+    """
+    stored = request.session.get(CREDENTIALS_SESSION_KEY)
+    if stored is not None:
+        return tuple(stored)
+
+    social_auth = request.user.social_auth.get(provider="mediawiki")
+    credentials = get_credentials(social_auth)
+    if credentials[1] and credentials[2]:
+        request.session[CREDENTIALS_SESSION_KEY] = list(credentials)
+    return credentials
+
+
+aresolve_credentials = sync_to_async(resolve_credentials)
+
+
+def remember_username(request, mw_username):
+    """
+    Records the MediaWiki username learned from userinfo for the rest of the
+    session. The social-auth record is left alone, so a GET never writes to
+    the database.
+    """
+    stored = request.session.get(CREDENTIALS_SESSION_KEY)
+    if stored is not None and not stored[0]:
+        request.session[CREDENTIALS_SESSION_KEY] = [mw_username, *stored[1:]]
+
+
+aremember_username = sync_to_async(remember_username)
+
+
+def forget_credentials(session):
+    session.pop(CREDENTIALS_SESSION_KEY, None)
+
+
+def _user_cache_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def get_cached_user(request):
+    """
+    ``django.contrib.auth.get_user`` backed by the cache. Falls back to the
+    database when the user is not cached or the session hash does not match
+    the cached user, e.g. right after a password change.
+    """
+    user_id = request.session.get(auth.SESSION_KEY)
+    if user_id is None:
+        return auth.get_user(request)
+
+    key = _user_cache_key(user_id)
+    user = cache.get(key)
+    if user is not None:
+        session_hash = request.session.get(auth.HASH_SESSION_KEY)
+        if session_hash and constant_time_compare(
+            session_hash, user.get_session_auth_hash()
+        ):
+            return user
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, user, getattr(settings, "AUTH_USER_CACHE_TTL", 300))
+    return user
+
+
+async def aget_cached_user(request):
+    if not hasattr(request, "_acached_user"):
+        request._acached_user = await sync_to_async(get_cached_user)(request)
+    return request._acached_user
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    """``post_save``/``post_delete`` receiver for the user model."""
+    cache.delete(_user_cache_key(instance.pk))
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """``AuthenticationMiddleware`` that loads the user with ``get_cached_user``."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+        request.auser = partial(aget_cached_user, request)
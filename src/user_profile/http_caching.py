@@ -0,0 +1,52 @@
+"""
+Conditional GET support for the JSON API.
+
+Views compute a weak ETag from the data the response would be built from
+(the query and the raw result rows, or the statistic values) before
+serializing anything. When it matches ``If-None-Match`` they answer
+``304 Not Modified`` with no body, so a repeat load costs the lookup but
+no serialization or transfer.
+"""
+
+import hashlib
+
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+
+def make_etag(*parts):
+    """Returns a weak ETag for ``parts``, which must have a stable ``repr``."""
+    digest = hashlib.sha1(repr(parts).encode("utf-8"), usedforsecurity=False)
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+
+def _opaque(etag):
+    return etag.removeprefix("W/")
+
+
+def etag_matches(request, etag):
+    """Whether ``If-None-Match`` matches ``etag``, using weak comparison."""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or _opaque(etag) in map(_opaque, candidates)
+
+
+def set_cache_headers(response, etag, public, max_age=0):
+    """
+    Adds ``ETag``, ``Cache-Control`` and ``Vary`` to ``response``. Private
+    responses must be revalidated by the browser on every use.
+    """
+    response["ETag"] = etag
+    if public:
+        patch_cache_control(response, public=True, max_age=max_age)
+    else:
+        patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    # DRF picks the renderer from the Accept header.
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+def not_modified(etag, public, max_age=0):
+    return set_cache_headers(HttpResponseNotModified(), etag, public, max_age)
@@ -0,0 +1,73 @@
+"""
+Bulk page lookup by title or page id.
+
+Titles are parsed back into the ``(page_namespace, page_title)`` key the
+replica stores them under and grouped by namespace, so every namespace
+costs one query on the ``(page_namespace, page_title)`` unique index, and
+all page ids together one ``page_id IN (...)`` query.
+"""
+
+from collections import defaultdict
+
+from .models import WikiPage, parse_full_title
+from .search import RESULT_COLUMNS
+from .timing import phase
+
+
+def _as_text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+@phase("lookup")
+def lookup_pages(titles=(), page_ids=()):
+    """
+    Looks up pages by displayed title and by page id.
+
+    Returns ``(rows, missing, invalid)``: the ``RESULT_COLUMNS`` rows found,
+    in the order they were asked for and without duplicates, the titles and
+    ids that did not match a page, and the titles that are not valid.
+    """
+    keys = {}
+    invalid = []
+    for title in titles:
+        key = parse_full_title(title)
+        if key is None:
+            invalid.append(title)
+        else:
+            keys[title] = key
+
+    by_namespace = defaultdict(set)
+    for namespace, title in keys.values():
+        by_namespace[namespace].add(title)
+
+    by_key = {}
+    for namespace, group in by_namespace.items():
+        rows = WikiPage.objects.filter(
+            page_namespace=namespace, page_title__in=sorted(group)
+        ).values_list(*RESULT_COLUMNS)
+        for row in rows:
+            by_key[(row[1], _as_text(row[2]))] = row
+
+    by_id = {}
+    if page_ids:
+        rows = WikiPage.objects.filter(page_id__in=set(page_ids)).values_list(
+            *RESULT_COLUMNS
+        )
+        by_id = {row[0]: row for row in rows}
+
+    found = {}
+    missing = []
+    for title, key in keys.items():
+        row = by_key.get(key)
+        if row is None:
+            missing.append(title)
+        else:
+            found.setdefault(row[0], row)
+    for page_id in page_ids:
+        row = by_id.get(page_id)
+        if row is None:
+            missing.append(page_id)
+        else:
+            found.setdefault(row[0], row)
+
+    return list(found.values()), missing, invalid
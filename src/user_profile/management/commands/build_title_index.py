@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from user_profile.models import WikiPage
+from user_profile.replica import bulk_alias, replica_available
+from user_profile.search import TitleIndex
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the local title index used by substring and fuzzy search. "
+        "It is a snapshot, so rerun it regularly to pick up new pages."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--namespace",
+            type=int,
+            action="append",
+            dest="namespaces",
+            help="Namespace to index (repeatable, defaults to 0, 6 and 14).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=50000)
+        parser.add_argument(
+            "--path",
+            default=None,
+            help="Index file to write (defaults to WIKI_TITLE_INDEX_PATH).",
+        )
+
+    def handle(self, *args, **options):
+        if not replica_available():
+            raise CommandError("No wiki replica database is configured.")
+
+        path = options["path"] or getattr(settings, "WIKI_TITLE_INDEX_PATH", None)
+        if not path:
+            raise CommandError("No index path given and WIKI_TITLE_INDEX_PATH unset.")
+
+        namespaces = options["namespaces"] or [0, 6, 14]
+        rows = self.iter_pages(namespaces, options["chunk_size"])
+        index = TitleIndex(path)
+        count = index.build(rows, namespaces=namespaces)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {count} titles in namespaces "
+                f"{', '.join(str(n) for n in sorted(set(namespaces)))} into {path} "
+                f"(built at {index.metadata()['built_at']})"
+            )
+        )
+
+    def iter_pages(self, namespaces, chunk_size):
+        """Walks the page table in primary-key order, one chunk at a time."""
+        last_id = 0
+        while True:
+            chunk = list(
+                WikiPage.objects.using(bulk_alias())
+                .filter(page_id__gt=last_id, page_namespace__in=namespaces)
+                .order_by("page_id")
+                .values_list(
+                    "page_id", "page_namespace", "page_title", "page_is_redirect"
+                )[:chunk_size]
+            )
+            if not chunk:
+                return
+            yield from chunk
+            last_id = chunk[-1][0]
@@ -0,0 +1,241 @@
+import random
+import string
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+# Share of pages per namespace, roughly as on enwiki.
+NAMESPACE_WEIGHTS = {0: 55, 1: 10, 2: 8, 3: 7, 4: 2, 6: 8, 10: 3, 14: 7}
+
+WORDS = (
+    "river mountain history battle station county album football church "
+    "school river island railway village language film season party war "
+    "bridge castle district election museum park road ship song valley"
+).split()
+
+FIRST_TIMESTAMP = datetime(2001, 1, 15, tzinfo=timezone.utc).timestamp()
+LAST_TIMESTAMP = datetime(2025, 12, 31, tzinfo=timezone.utc).timestamp()
+
+# Titles and actor names are VARBINARY on the replicas; SQLite stores them as
+# text so they compare the same way against str parameters.
+NAME_TYPES = {"mysql": "VARBINARY(255)", "sqlite": "VARCHAR(255)"}
+
+INDEXES = [
+    "CREATE UNIQUE INDEX page_name_title ON page (page_namespace, page_title)",
+    "CREATE INDEX page_random ON page (page_random)",
+    "CREATE INDEX page_len ON page (page_len)",
+    "CREATE INDEX page_redirect_namespace_len "
+    "ON page (page_is_redirect, page_namespace, page_len)",
+    "CREATE INDEX rev_actor_timestamp ON revision (rev_actor, rev_timestamp, rev_id)",
+    "CREATE INDEX rev_page_timestamp ON revision (rev_page, rev_timestamp)",
+    "CREATE INDEX rev_timestamp ON revision (rev_timestamp)",
+    "CREATE UNIQUE INDEX actor_name ON actor (actor_name)",
+    "CREATE UNIQUE INDEX actor_user ON actor (actor_user)",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates page, revision and actor tables filled with synthetic rows in "
+        "a local database, for load testing the replica code paths. Use with "
+        "the oauth_app.settings_bench settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="wiki_replica")
+        parser.add_argument("--pages", type=int, default=100000)
+        parser.add_argument("--actors", type=int, default=2000)
+        parser.add_argument("--revisions", type=int, default=500000)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Drop existing page, revision and actor tables first.",
+        )
+
+    def handle(self, *args, **options):
+        if getattr(settings, "IS_TOOLFORGE", False):
+            raise CommandError("Refusing to write fixture data on Toolforge.")
+
+        alias = options["database"]
+        if alias not in settings.DATABASES:
+            raise CommandError(f"Database '{alias}' is not configured.")
+
+        connection = connections[alias]
+        if connection.vendor not in NAME_TYPES:
+            raise CommandError(f"Unsupported database vendor '{connection.vendor}'.")
+
+        existing = set(connection.introspection.table_names())
+        if existing & {"page", "revision", "actor"}:
+            if not options["force"]:
+                raise CommandError(
+                    "Replica tables already exist, pass --force to replace them."
+                )
+
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        started = time.monotonic()
+
+        if connection.vendor == "sqlite" and not connection.in_atomic_block:
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA synchronous = OFF")
+
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            self.create_tables(cursor, connection.vendor)
+            self.insert(cursor, "actor", 3, self.actor_rows(options["actors"]))
+            self.insert(cursor, "page", 12, self.page_rows(options["pages"]))
+            self.insert(
+                cursor,
+                "revision",
+                10,
+                self.revision_rows(
+                    options["revisions"], options["pages"], options["actors"]
+                ),
+            )
+            for statement in INDEXES:
+                cursor.execute(statement)
+
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {options['pages']} pages, {options['actors']} actors and "
+                f"{options['revisions']} revisions in '{alias}' "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
+
+    def create_tables(self, cursor, vendor):
+        name_type = NAME_TYPES[vendor]
+        for table in ("page", "revision", "actor"):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+        cursor.execute(
+            f"""
+            CREATE TABLE page (
+                page_id INTEGER NOT NULL PRIMARY KEY,
+                page_namespace INTEGER NOT NULL,
+                page_title {name_type} NOT NULL,
+                page_is_redirect SMALLINT NOT NULL DEFAULT 0,
+                page_is_new SMALLINT NOT NULL DEFAULT 0,
+                page_random DOUBLE PRECISION NOT NULL,
+                page_touched VARCHAR(14) NOT NULL,
+                page_links_updated VARCHAR(14) NULL,
+                page_latest INTEGER NOT NULL,
+                page_len INTEGER NOT NULL,
+                page_content_model VARCHAR(32) NULL,
+                page_lang VARCHAR(35) NULL
+            )
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE revision (
+                rev_id INTEGER NOT NULL PRIMARY KEY,
+                rev_page INTEGER NOT NULL,
+                rev_comment_id BIGINT NOT NULL,
+                rev_actor BIGINT NOT NULL,
+                rev_timestamp VARCHAR(14) NOT NULL,
+                rev_minor_edit SMALLINT NOT NULL DEFAULT 0,
+                rev_deleted SMALLINT NOT NULL DEFAULT 0,
+                rev_len INTEGER NULL,
+                rev_parent_id INTEGER NULL,
+                rev_sha1 VARCHAR(32) NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            f"""
+            CREATE TABLE actor (
+                actor_id BIGINT NOT NULL PRIMARY KEY,
+                actor_user INTEGER NULL,
+                actor_name {name_type} NOT NULL
+            )
+            """
+        )
+
+    def insert(self, cursor, table, columns, rows):
+        placeholders = ", ".join(["%s"] * columns)
+        sql = f"INSERT INTO {table} VALUES ({placeholders})"  # nosec B608
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+
+    def timestamp(self, seconds):
+        return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime("%Y%m%d%H%M%S")
+
+    def actor_rows(self, count):
+        for actor_id in range(1, count + 1):
+            word = self.random.choice(WORDS).capitalize()
+            yield (actor_id, actor_id, f"{word} editor {actor_id}")
+
+    def page_rows(self, count):
+        rng = self.random
+        namespaces = list(NAMESPACE_WEIGHTS)
+        weights = list(NAMESPACE_WEIGHTS.values())
+        for page_id in range(1, count + 1):
+            namespace = rng.choices(namespaces, weights)[0]
+            words = rng.sample(WORDS, rng.randint(1, 3))
+            title = "_".join(words).capitalize() + f"_{page_id}"
+            is_redirect = namespace == 0 and rng.random() < 0.35
+            length = (
+                rng.randint(20, 120) if is_redirect else int(rng.lognormvariate(8, 1.2))
+            )
+            touched = self.timestamp(rng.uniform(FIRST_TIMESTAMP, LAST_TIMESTAMP))
+            yield (
+                page_id,
+                namespace,
+                title,
+                int(is_redirect),
+                int(rng.random() < 0.05),
+                rng.random(),
+                touched,
+                touched,
+                0,
+                length,
+                "wikitext",
+                None,
+            )
+
+    def revision_rows(self, count, pages, actors):
+        rng = self.random
+        # A few prolific editors make most edits, as on the real wikis.
+        actor_weights = [1 / rank**1.1 for rank in range(1, actors + 1)]
+        cumulative, total = [], 0.0
+        for weight in actor_weights:
+            total += weight
+            cumulative.append(total)
+
+        step = (LAST_TIMESTAMP - FIRST_TIMESTAMP) / max(count, 1)
+        alphabet = string.ascii_lowercase + string.digits
+        batch = max(self.batch_size, 1)
+        for start in range(0, count, batch):
+            size = min(batch, count - start)
+            actor_ids = rng.choices(
+                range(1, actors + 1), cum_weights=cumulative, k=size
+            )
+            for offset, actor_id in enumerate(actor_ids):
+                rev_id = start + offset + 1
+                yield (
+                    rev_id,
+                    rng.randint(1, pages),
+                    rng.randint(1, 1000000),
+                    actor_id,
+                    self.timestamp(FIRST_TIMESTAMP + rev_id * step),
+                    int(rng.random() < 0.2),
+                    0,
+                    int(rng.lognormvariate(8, 1.2)),
+                    rev_id - 1,
+                    "".join(rng.choices(alphabet, k=31)),
+                )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from user_profile.replica import replica_available
+from user_profile.stats import refresh_namespace_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the per-namespace page statistics from the replica, "
+        "e.g. from a daily scheduled job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=100000)
+
+    def handle(self, *args, **options):
+        if not replica_available():
+            raise CommandError("No wiki replica database is configured.")
+
+        stats = refresh_namespace_stats(options["chunk_size"])
+        for namespace, values in sorted(stats.items()):
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"NS{namespace}: {values['page_count']} pages, "
+                    f"{values['redirect_count']} redirects"
+                )
+            )
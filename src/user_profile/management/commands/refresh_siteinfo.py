@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from user_profile.namespaces import fetch_siteinfo, save_siteinfo
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetches the namespaces and interwiki prefixes of the wiki and saves "
+        "them for the workers to load, e.g. on deploy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default=getattr(settings, "SITEINFO_CACHE_PATH", None),
+            help="File to write (default: SITEINFO_CACHE_PATH).",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not path:
+            raise CommandError("No --path given and SITEINFO_CACHE_PATH is not set.")
+
+        try:
+            siteinfo = fetch_siteinfo()
+        except Exception as e:
+            raise CommandError(f"Could not fetch siteinfo: {e}") from e
+        save_siteinfo(siteinfo, path)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Saved {len(siteinfo['namespaces'])} namespaces to {path}; "
+                "restart the workers to load them."
+            )
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from user_profile.replica import replica_available
+from user_profile.stats import warm_stats_cache
+
+
+class Command(BaseCommand):
+    help = "Pre-computes the cached wiki statistics, e.g. on deploy."
+
+    def handle(self, *args, **options):
+        if not replica_available():
+            raise CommandError("No wiki replica database is configured.")
+
+        for key, value in warm_stats_cache().items():
+            self.stdout.write(self.style.SUCCESS(f"{key} = {value}"))
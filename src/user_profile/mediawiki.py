@@ -0,0 +1,172 @@
+"""
+Access to the MediaWiki action API on behalf of logged-in users.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.cache import cache
+from mwclient import Site
+
+from .metrics import cache_requests, mediawiki_duration, mediawiki_errors
+from .timing import phase
+
+
+def get_credentials(social_auth):
+    """
+    Returns ``(mw_username, access_key, access_secret)`` from the
+    ``extra_data`` of a MediaWiki social-auth record. Missing values are None.
+    """
+    extra_data = social_auth.extra_data
+    mw_username = (
+        extra_data.get("username") or extra_data.get("user", {}).get("name") or None
+    )
+
+    token_blob = extra_data.get("access_token") or {}
+    if isinstance(token_blob, dict):
+        access_key = token_blob.get("oauth_token") or token_blob.get("key")
+        access_secret = token_blob.get("oauth_token_secret") or token_blob.get("secret")
+    else:
+        access_key = token_blob
+        access_secret = extra_data.get("access_token_secret")
+
+    return mw_username, access_key or None, access_secret or None
+
+
+class SitePool:
+    """
+    Bounded LRU pool of ``mwclient.Site`` objects keyed by OAuth access token.
+
+    Pooled sites keep their ``requests`` session, and with it the HTTP
+    keep-alive connection, between requests. They are created with
+    ``do_init=False`` so no siteinfo query is made; nothing here needs it.
+    """
+
+    def __init__(self, max_size=128, idle_timeout=300):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._sites = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sites)
+
+    def get(self, access_key, access_secret):
+        key = (access_key, access_secret)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sites.pop(key, None)
+            if entry is not None and now - entry[1] <= self.idle_timeout:
+                site = entry[0]
+            else:
+                if entry is not None:
+                    entry[0].connection.close()
+                site = None
+            self._evict(now)
+
+        if site is None:
+            site = self.create_site(access_key, access_secret)
+
+        with self._lock:
+            self._sites[key] = (site, now)
+            while len(self._sites) > self.max_size:
+                _, (evicted, _) = self._sites.popitem(last=False)
+                evicted.connection.close()
+        return site
+
+    def discard(self, access_key, access_secret):
+        with self._lock:
+            entry = self._sites.pop((access_key, access_secret), None)
+        if entry is not None:
+            entry[0].connection.close()
+
+    def clear(self):
+        with self._lock:
+            sites, self._sites = self._sites, OrderedDict()
+        for site, _ in sites.values():
+            site.connection.close()
+
+    def _evict(self, now):
+        """Drops idle sites; the least recently used ones are at the front."""
+        while self._sites:
+            key, (site, last_used) = next(iter(self._sites.items()))
+            if now - last_used <= self.idle_timeout:
+                break
+            del self._sites[key]
+            site.connection.close()
+
+    def create_site(self, access_key, access_secret):
+        parsed_url = urlparse(settings.SOCIAL_AUTH_MEDIAWIKI_URL)
+        return Site(
+            parsed_url.netloc,
+            path="/w/",
+            scheme=parsed_url.scheme or "https",
+            consumer_token=settings.SOCIAL_AUTH_MEDIAWIKI_KEY,
+            consumer_secret=settings.SOCIAL_AUTH_MEDIAWIKI_SECRET,
+            access_token=access_key,
+            access_secret=access_secret,
+            do_init=False,
+        )
+
+
+site_pool = SitePool(
+    max_size=getattr(settings, "MEDIAWIKI_SITE_POOL_SIZE", 128),
+    idle_timeout=getattr(settings, "MEDIAWIKI_SITE_IDLE_TIMEOUT", 300),
+)
+
+
+def get_site(access_key, access_secret):
+    """Returns a pooled ``mwclient.Site`` authenticated with the given token."""
+    return site_pool.get(access_key, access_secret)
+
+
+def userinfo_cache_key(user_id):
+    return f"mw-userinfo:{user_id}"
+
+
+def fetch_userinfo(access_key, access_secret):
+    """
+    Queries ``meta=userinfo`` for the token's user. Only the number of rights
+    is kept, since that is all the views show.
+    """
+    with phase("mediawiki"), mediawiki_duration.time(operation="userinfo"):
+        try:
+            site = get_site(access_key, access_secret)
+            result = site.get("query", meta="userinfo", uiprop="email|groups|rights")
+        except Exception as e:
+            mediawiki_errors.inc(operation="userinfo", error=type(e).__name__)
+            raise
+    user_info = result.get("query", {}).get("userinfo", {})
+    return {
+        "id": user_info.get("id"),
+        "name": user_info.get("name"),
+        "email": user_info.get("email"),
+        "groups": user_info.get("groups", []),
+        "rights_count": len(user_info.get("rights", [])),
+    }
+
+
+def get_userinfo(user_id, access_key, access_secret, refresh=False):
+    """
+    Returns the MediaWiki userinfo for the Django user ``user_id``, cached
+    for ``MEDIAWIKI_USERINFO_CACHE_TTL`` seconds. ``refresh=True`` bypasses
+    the cached copy.
+    """
+    key = userinfo_cache_key(user_id)
+    if not refresh:
+        user_info = cache.get(key)
+        if user_info is not None:
+            cache_requests.inc(cache="mw-userinfo", result="hit")
+            return user_info
+        cache_requests.inc(cache="mw-userinfo", result="miss")
+
+    user_info = fetch_userinfo(access_key, access_secret)
+    cache.set(key, user_info, getattr(settings, "MEDIAWIKI_USERINFO_CACHE_TTL", 3600))
+    return user_info
+
+
+def invalidate_userinfo(user_id):
+    cache.delete(userinfo_cache_key(user_id))
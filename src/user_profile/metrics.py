@@ -0,0 +1,310 @@
+"""
+Prometheus metrics, served in the text exposition format at ``/metrics``.
+
+Each process keeps its counters and histograms in memory. uwsgi workers
+are separate processes, so when ``METRICS_DIR`` is set every process also
+writes its values to ``METRICS_DIR/<pid>.json``, at most once every
+``METRICS_FLUSH_INTERVAL`` seconds and whenever it serves ``/metrics``, and
+``/metrics`` adds up the files of all workers. Files of exited workers are
+kept so their counts are not lost; empty the directory on restart.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .replica import is_replica_alias
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values, strict=True), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return json.dumps([str(labels[name]) for name in self.labelnames])
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self._values))
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def merge(self, total, value):
+        return (total or 0) + value
+
+    def render(self, values):
+        for key, value in sorted(values.items()):
+            labels = _format_labels(self.labelnames, json.loads(key))
+            yield f"{self.name}{labels} {_format_number(value)}"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {
+                    "buckets": [0] * len(self.buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][i] += 1
+                    break
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def merge(self, total, value):
+        if len(value["buckets"]) != len(self.buckets):
+            # Written by a worker running with other buckets, before a deploy.
+            return total
+        if total is None:
+            return {**value, "buckets": list(value["buckets"])}
+        total["buckets"] = [
+            a + b for a, b in zip(total["buckets"], value["buckets"], strict=True)
+        ]
+        total["sum"] += value["sum"]
+        total["count"] += value["count"]
+        return total
+
+    def render(self, values):
+        for key, entry in sorted(values.items()):
+            label_values = json.loads(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry["buckets"], strict=True):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames, label_values, [("le", _format_number(bound))]
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, label_values, [("le", "+Inf")])
+            yield f"{self.name}_bucket{labels} {entry['count']}"
+            labels = _format_labels(self.labelnames, label_values)
+            yield f"{self.name}_sum{labels} {_format_number(entry['sum'])}"
+            yield f"{self.name}_count{labels} {entry['count']}"
+
+
+class _Timer:
+    """Observes the seconds spent in a ``with`` block."""
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._flushed_at = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), **kwargs):
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def flush(self, directory):
+        """Writes this process's values to ``directory``."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+        self._flushed_at = time.monotonic()
+
+    def maybe_flush(self, directory, interval):
+        if directory and time.monotonic() - self._flushed_at >= interval:
+            self.flush(directory)
+
+    def collect(self, directory=None):
+        """
+        Returns the values of every process that wrote to ``directory``, or
+        of this process only when ``directory`` is None.
+        """
+        if not directory:
+            return self.snapshot()
+
+        self.flush(directory)
+        merged = {}
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, values in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                totals = merged.setdefault(name, {})
+                for key, value in values.items():
+                    total = metric.merge(totals.get(key), value)
+                    if total is not None:
+                        totals[key] = total
+        return merged
+
+    def render(self, values):
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.render(values.get(name, {})))
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time spent handling requests.",
+    ["url_name", "method", "status"],
+)
+replica_query_duration = registry.histogram(
+    "wiki_replica_query_duration_seconds",
+    "Time spent on wiki replica queries.",
+    ["alias"],
+)
+replica_query_errors = registry.counter(
+    "wiki_replica_query_errors_total",
+    "Wiki replica queries that raised a database error.",
+    ["alias", "error"],
+)
+mediawiki_duration = registry.histogram(
+    "mediawiki_request_duration_seconds",
+    "Time spent on MediaWiki API calls.",
+    ["operation"],
+)
+mediawiki_errors = registry.counter(
+    "mediawiki_request_errors_total",
+    "MediaWiki API calls that raised an exception.",
+    ["operation", "error"],
+)
+cache_requests = registry.counter(
+    "cache_requests_total",
+    "Cache lookups by result (hit, stale or miss).",
+    ["cache", "result"],
+)
+
+
+def metrics_dir():
+    return getattr(settings, "METRICS_DIR", None)
+
+
+def observe_replica_query(execute, sql, params, many, context):
+    """Execute wrapper recording the duration and errors of replica queries."""
+    alias = context["connection"].alias
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    except Exception as e:
+        replica_query_errors.inc(alias=alias, error=type(e).__name__)
+        raise
+    finally:
+        replica_query_duration.observe(time.perf_counter() - start, alias=alias)
+
+
+def install_replica_metrics(sender, connection, **kwargs):
+    """``connection_created`` receiver for the replica aliases."""
+    if not is_replica_alias(connection.alias):
+        return
+    if observe_replica_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(observe_replica_query)
+
+
+class MetricsMiddleware:
+    """Records the duration of every request by URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        request_duration.observe(
+            time.perf_counter() - start,
+            url_name=(match.url_name if match else None) or "unmatched",
+            method=request.method,
+            status=response.status_code,
+        )
+        registry.maybe_flush(
+            metrics_dir(), getattr(settings, "METRICS_FLUSH_INTERVAL", 5)
+        )
+        return response
+
+
+def metrics_view(request):
+    """
+    Serves the metrics. If ``METRICS_TOKEN`` is set, the request must send
+    it as ``Authorization: Bearer <token>``.
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    body = registry.render(registry.collect(metrics_dir()))
+    return HttpResponse(body, content_type=CONTENT_TYPE)
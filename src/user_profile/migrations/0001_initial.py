@@ -0,0 +1,94 @@
+# Generated by Django 5.2.9 on 2026-10-18 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="WikiActor",
+            fields=[
+                ("actor_id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("actor_user", models.IntegerField(blank=True, null=True)),
+                ("actor_name", models.CharField(max_length=255)),
+            ],
+            options={
+                "db_table": "actor",
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="WikiPage",
+            fields=[
+                ("page_id", models.IntegerField(primary_key=True, serialize=False)),
+                ("page_namespace", models.IntegerField()),
+                ("page_title", models.CharField(max_length=255)),
+                ("page_is_redirect", models.BooleanField()),
+                ("page_is_new", models.BooleanField()),
+                ("page_random", models.FloatField()),
+                ("page_touched", models.CharField(max_length=14)),
+                (
+                    "page_links_updated",
+                    models.CharField(blank=True, max_length=14, null=True),
+                ),
+                ("page_latest", models.IntegerField()),
+                ("page_len", models.IntegerField()),
+                (
+                    "page_content_model",
+                    models.CharField(blank=True, max_length=32, null=True),
+                ),
+                ("page_lang", models.CharField(blank=True, max_length=35, null=True)),
+            ],
+            options={
+                "db_table": "page",
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="WikiRevision",
+            fields=[
+                ("rev_id", models.IntegerField(primary_key=True, serialize=False)),
+                ("rev_page", models.IntegerField()),
+                ("rev_comment_id", models.BigIntegerField()),
+                ("rev_actor", models.BigIntegerField()),
+                ("rev_timestamp", models.CharField(max_length=14)),
+                ("rev_minor_edit", models.BooleanField()),
+                ("rev_deleted", models.IntegerField()),
+                ("rev_len", models.IntegerField(blank=True, null=True)),
+                ("rev_parent_id", models.IntegerField(blank=True, null=True)),
+                ("rev_sha1", models.CharField(max_length=32)),
+            ],
+            options={
+                "db_table": "revision",
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="UserEditCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mw_username", models.CharField(max_length=255, unique=True)),
+                ("actor_id", models.BigIntegerField(blank=True, null=True)),
+                ("edit_count", models.PositiveBigIntegerField(default=0)),
+                (
+                    "max_rev_timestamp",
+                    models.CharField(blank=True, default="", max_length=14),
+                ),
+                ("max_rev_id", models.PositiveBigIntegerField(default=0)),
+                ("recounted_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
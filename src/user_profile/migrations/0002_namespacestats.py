@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user_profile", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NamespaceStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("namespace", models.IntegerField(unique=True)),
+                ("page_count", models.PositiveBigIntegerField(default=0)),
+                ("redirect_count", models.PositiveBigIntegerField(default=0)),
+                ("total_len", models.PositiveBigIntegerField(default=0)),
+                ("min_len", models.PositiveIntegerField(blank=True, null=True)),
+                ("max_len", models.PositiveIntegerField(blank=True, null=True)),
+                ("len_histogram", models.JSONField(default=list)),
+                ("refreshed_at", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name_plural": "namespace stats",
+                "ordering": ["namespace"],
+            },
+        ),
+    ]
@@ -1,5 +1,29 @@
 from django.db import models
 
+from .namespaces import get_registry
+
+
+def format_full_title(page_title):
+    """Returns a raw ``page_title`` with underscores replaced by spaces."""
+    if isinstance(page_title, bytes):
+        page_title = page_title.decode("utf-8")
+    return page_title.replace("_", " ")
+
+
+def parse_full_title(full_title):
+    """
+    Returns the ``(page_namespace, page_title)`` a displayed title is stored
+    under, or None if it is not a valid local title.
+    """
+    return get_registry().parse_title(full_title)
+
+
+def format_page_url(page_namespace, page_title):
+    """Returns the URL to view the page with the given raw title."""
+    if isinstance(page_title, bytes):
+        page_title = page_title.decode("utf-8")
+    return get_registry().page_url(page_namespace, page_title)
+
 
 class WikiPage(models.Model):
     """
@@ -29,25 +53,12 @@ class WikiPage(models.Model):
     @property
     def full_title(self):
         """Returns the page title with underscores replaced by spaces"""
-        return (
-            self.page_title.decode("utf-8").replace("_", " ")
-            if isinstance(self.page_title, bytes)
-            else self.page_title.replace("_", " ")
-        )
+        return format_full_title(self.page_title)
 
     @property
     def url(self):
         """Returns the URL to view this page"""
-        namespace_names = {0: "", 6: "File:", 14: "Category:"}
-        ns_prefix = namespace_names.get(
-            self.page_namespace, f"NS{self.page_namespace}:"
-        )
-        title = (
-            self.page_title.decode("utf-8")
-            if isinstance(self.page_title, bytes)
-            else self.page_title
-        )
-        return f"https://en.wikipedia.org/wiki/{ns_prefix}{title}"
+        return format_page_url(self.page_namespace, self.page_title)
 
 
 class WikiRevision(models.Model):
@@ -94,3 +105,67 @@ class WikiActor(models.Model):
             if isinstance(self.actor_name, bytes)
             else self.actor_name
         )
+
+
+class UserEditCount(models.Model):
+    """
+    Locally stored edit count for a MediaWiki user.
+
+    ``max_rev_timestamp`` is the newest revision timestamp included in
+    ``edit_count`` and ``max_rev_id`` the highest revision id at that
+    timestamp, so a refresh only has to count revisions after them.
+    ``recounted_at`` is when the count was last made from scratch.
+    """
+
+    mw_username = models.CharField(max_length=255, unique=True)
+    actor_id = models.BigIntegerField(null=True, blank=True)
+    edit_count = models.PositiveBigIntegerField(default=0)
+    max_rev_timestamp = models.CharField(max_length=14, blank=True, default="")
+    max_rev_id = models.PositiveBigIntegerField(default=0)
+    recounted_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.mw_username}: {self.edit_count}"
+
+
+# Upper bounds (exclusive) of the ``page_len`` buckets in
+# ``NamespaceStats.len_histogram``; the last bucket holds everything larger.
+PAGE_LEN_BUCKETS = (500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 200000)
+
+
+class NamespaceStats(models.Model):
+    """
+    Page aggregates for one namespace, precomputed from the replica by
+    ``manage.py refresh_namespace_stats``.
+
+    The length figures only cover non-redirect pages.
+    """
+
+    namespace = models.IntegerField(unique=True)
+    page_count = models.PositiveBigIntegerField(default=0)
+    redirect_count = models.PositiveBigIntegerField(default=0)
+    total_len = models.PositiveBigIntegerField(default=0)
+    min_len = models.PositiveIntegerField(null=True, blank=True)
+    max_len = models.PositiveIntegerField(null=True, blank=True)
+    len_histogram = models.JSONField(default=list)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["namespace"]
+        verbose_name_plural = "namespace stats"
+
+    def __str__(self):
+        return f"NS{self.namespace}: {self.page_count} pages"
+
+    @property
+    def content_count(self):
+        return self.page_count - self.redirect_count
+
+    @property
+    def redirect_ratio(self):
+        return self.redirect_count / self.page_count if self.page_count else 0.0
+
+    @property
+    def average_len(self):
+        return self.total_len / self.content_count if self.content_count else 0.0
@@ -0,0 +1,213 @@
+"""
+Namespace and interwiki metadata of the wiki behind the replica.
+
+The registry is built once per process from MediaWiki siteinfo. It reads
+the copy that ``manage.py refresh_siteinfo`` writes to
+``SITEINFO_CACHE_PATH``, which every worker shares. Without one, e.g.
+offline or in local development, it falls back to the enwiki snapshot
+bundled in ``data/enwiki_siteinfo.json``. The snapshot only lists the
+common interwiki prefixes.
+
+URL prefixes are precomputed per namespace, so formatting a page URL
+is a dict lookup and a string concatenation.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+from django.conf import settings
+from mwclient import Site
+
+SNAPSHOT_PATH = Path(__file__).resolve().parent / "data" / "enwiki_siteinfo.json"
+
+SITEINFO_PROPS = "general|namespaces|namespacealiases|interwikimap"
+
+USER_NAMESPACE = 2
+
+
+def _key(name):
+    return " ".join(name.replace("_", " ").split()).lower()
+
+
+def _upper_first(title):
+    first = title[0].upper()
+    # Letters like "ß" upper-case to several characters; MediaWiki keeps them.
+    return first + title[1:] if len(first) == 1 else title
+
+
+class NamespaceRegistry:
+    """Namespace names, aliases and URLs from a siteinfo ``query`` result."""
+
+    def __init__(self, siteinfo):
+        general = siteinfo["general"]
+        server = general["server"]
+        if server.startswith("//"):
+            server = "https:" + server
+        self.article_url = server + general["articlepath"].replace("$1", "")
+
+        self.names = {}
+        self.url_prefixes = {}
+        self.first_letter = set()
+        self.ids = {}
+        for namespace in siteinfo["namespaces"].values():
+            namespace_id = namespace["id"]
+            name = namespace["name"]
+            prefix = f"{name}:".replace(" ", "_") if name else ""
+            self.names[namespace_id] = name
+            self.url_prefixes[namespace_id] = self.article_url + prefix
+            if namespace.get("case", "first-letter") == "first-letter":
+                self.first_letter.add(namespace_id)
+            for alias in (name, namespace.get("canonical")):
+                if alias:
+                    self.ids[_key(alias)] = namespace_id
+        for alias in siteinfo.get("namespacealiases", ()):
+            self.ids[_key(alias["alias"])] = alias["id"]
+
+        self.interwiki = {
+            entry["prefix"].lower(): entry["url"]
+            for entry in siteinfo.get("interwikimap", ())
+        }
+
+    def namespace_id(self, value):
+        """
+        Returns the namespace id for a name, alias or canonical name in any
+        case, or None if there is no such namespace. Numbers are returned
+        as they are.
+        """
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return self.ids.get(_key(str(value)))
+
+    def page_url(self, page_namespace, page_title):
+        """Returns the URL to view the page with the given raw title."""
+        prefix = self.url_prefixes.get(page_namespace)
+        if prefix is None:
+            # Only for namespaces missing from a stale snapshot.
+            prefix = f"{self.article_url}NS{page_namespace}:"
+        return prefix + page_title
+
+    def parse_title(self, full_title):
+        """
+        Returns the ``(page_namespace, page_title)`` a displayed title is
+        stored under. Returns None if no title is left after normalisation,
+        or if the title points to another wiki through an interwiki prefix.
+        """
+        title = " ".join(full_title.replace("_", " ").split())
+        # A leading colon, as in wiki links, is dropped; the prefix after it
+        # still selects the namespace.
+        title = title.removeprefix(":").strip()
+
+        namespace = 0
+        prefix, colon, rest = title.partition(":")
+        if colon:
+            namespace_id = self.ids.get(_key(prefix))
+            if namespace_id is not None:
+                namespace, title = namespace_id, rest.strip()
+            elif _key(prefix) in self.interwiki:
+                return None
+
+        if not title:
+            return None
+        if namespace in self.first_letter:
+            title = _upper_first(title)
+        return namespace, title.replace(" ", "_")
+
+    def normalize_username(self, name):
+        """
+        Returns a username the way MediaWiki stores it in ``actor_name``:
+        with spaces for underscores and, where user pages have an upper-case
+        first letter, an upper-case first letter.
+        """
+        name = " ".join(name.replace("_", " ").split())
+        if name and USER_NAMESPACE in self.first_letter:
+            name = _upper_first(name)
+        return name
+
+
+def read_siteinfo(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_registry():
+    """
+    Builds a registry from the shared siteinfo copy, or from the bundled
+    snapshot if there is none or it cannot be read.
+    """
+    path = getattr(settings, "SITEINFO_CACHE_PATH", None)
+    if path:
+        try:
+            return NamespaceRegistry(read_siteinfo(path))
+        except (OSError, ValueError, KeyError):
+            pass
+    return NamespaceRegistry(read_siteinfo(SNAPSHOT_PATH))
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Returns the process-wide registry, loading it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = load_registry()
+    return _registry
+
+
+def reset_registry():
+    """Makes the next ``get_registry`` call load the registry again."""
+    global _registry
+    with _registry_lock:
+        _registry = None
+
+
+def fetch_siteinfo():
+    """Fetches the siteinfo ``query`` result from the wiki's action API."""
+    parsed_url = urlparse(
+        getattr(settings, "WIKI_SITE_URL", "https://en.wikipedia.org")
+    )
+    site = Site(
+        parsed_url.netloc,
+        path="/w/",
+        scheme=parsed_url.scheme or "https",
+        do_init=False,
+    )
+    result = site.api("query", meta="siteinfo", siprop=SITEINFO_PROPS, formatversion=2)
+    return result["query"]
+
+
+def save_siteinfo(siteinfo, path):
+    """Writes ``siteinfo`` to ``path`` atomically, for other workers to read."""
+    # Validates it before replacing a working copy.
+    NamespaceRegistry(siteinfo)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=directory, delete=False, suffix=".tmp"
+    ) as f:
+        json.dump(siteinfo, f)
+    os.replace(f.name, path)
+
+
+def normalize_username(name):
+    """Normalises ``name`` with the process-wide registry."""
+    return get_registry().normalize_username(name)
+
+
+def parse_namespace(value, default=0):
+    """
+    Returns the namespace id for a query parameter given as a number or a
+    name, or ``default`` if it is missing or unknown.
+    """
+    if value is None or value == "":
+        return default
+    namespace_id = get_registry().namespace_id(value)
+    return default if namespace_id is None else namespace_id
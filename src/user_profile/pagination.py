@@ -0,0 +1,29 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor is the urlsafe base64 encoding of the JSON-serialisable key of
+the last row on the previous page. The next page continues after that
+key, so every page costs the same index seek regardless of depth.
+"""
+
+import base64
+import binascii
+import json
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(key):
+    data = json.dumps(key, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Returns the key encoded in ``cursor``, or raises ``InvalidCursor``."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise InvalidCursor("Invalid cursor") from e
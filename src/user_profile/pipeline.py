@@ -0,0 +1,18 @@
+"""
+Extra steps for the social-auth login pipeline (``SOCIAL_AUTH_PIPELINE``).
+"""
+
+from .credentials import CREDENTIALS_SESSION_KEY
+from .mediawiki import invalidate_userinfo
+
+
+def invalidate_cached_userinfo(backend, user=None, *args, **kwargs):
+    """Drops the cached userinfo so a fresh login sees current groups/rights."""
+    if user is not None and backend.name == "mediawiki":
+        invalidate_userinfo(user.pk)
+
+
+def forget_session_credentials(strategy, backend, *args, **kwargs):
+    """Drops the credentials stored in the session, the login may have new tokens."""
+    if backend.name == "mediawiki":
+        strategy.session_pop(CREDENTIALS_SESSION_KEY)
@@ -0,0 +1,124 @@
+"""
+Random page sampling through the replica's ``page_random`` index.
+
+Every page gets a uniformly distributed ``page_random`` value when it is
+created, so the pages following a random point in ``page_random`` order
+are a random sample. This is how MediaWiki's Special:Random works and
+avoids ``ORDER BY RAND()``, which would sort the whole page table:
+
+* A sample is made of short runs of ``run_length`` pages, each one an
+  index seek ``page_random >= r ORDER BY page_random LIMIT k``.
+* A seek that hits the end of the index before finding ``k`` pages wraps
+  around and continues from ``page_random >= 0``.
+* The seeks of a round go to the replica as one ``UNION ALL`` query where
+  the database supports it, otherwise one query each.
+* Runs can overlap, and a namespace with few pages may not fill the
+  sample, so further rounds top it up until ``max_rounds``.
+
+The index only covers ``page_random``, so in a sparse namespace each seek
+reads past the pages of other namespaces until it has found ``k``.
+"""
+
+import math
+import random
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import IntegerField, Value
+
+from .models import WikiPage
+from .search import RESULT_COLUMNS
+from .timing import phase
+
+
+def _seek(pages, low, high):
+    """``pages`` with ``low <= page_random < high``, in index order."""
+    query = pages.filter(page_random__gte=low)
+    if high is not None:
+        query = query.filter(page_random__lt=high)
+    return query.order_by("page_random")
+
+
+def run_seeks(pages, seeks):
+    """
+    Runs the ``(low, high, limit)`` seeks on ``pages`` and returns one list
+    of ``RESULT_COLUMNS`` rows per seek.
+    """
+    queries = [
+        _seek(pages, low, high)
+        .annotate(seek=Value(i, output_field=IntegerField()))
+        .values_list(*RESULT_COLUMNS, "seek")[:limit]
+        for i, (low, high, limit) in enumerate(seeks)
+    ]
+    features = connections[pages.db].features
+    if len(queries) > 1 and features.supports_slicing_ordering_in_compound:
+        rows = list(queries[0].union(*queries[1:], all=True))
+    else:
+        rows = [row for query in queries for row in query]
+
+    results = [[] for _ in seeks]
+    for *columns, seek in rows:
+        results[seek].append(tuple(columns))
+    return results
+
+
+@phase("random")
+def sample_pages(
+    count,
+    namespace=0,
+    exclude_redirects=True,
+    run_length=None,
+    max_rounds=3,
+    rng=None,
+):
+    """
+    Returns up to ``count`` distinct random pages in ``namespace`` as
+    ``RESULT_COLUMNS`` rows, in random order. Fewer are returned only if the
+    namespace has fewer pages, or if ``max_rounds`` rounds of seeks kept
+    landing on pages that were already sampled.
+    """
+    if run_length is None:
+        run_length = getattr(settings, "RANDOM_PAGES_RUN_LENGTH", 5)
+    rng = rng or random.Random()
+
+    pages = WikiPage.objects.filter(page_namespace=namespace)
+    if exclude_redirects:
+        pages = pages.filter(page_is_redirect=False)
+
+    found = {}
+    for _ in range(max_rounds):
+        missing = count - len(found)
+        if missing <= 0:
+            break
+
+        seeks = [
+            (rng.random(), None, min(run_length, missing))
+            for _ in range(math.ceil(missing / run_length))
+        ]
+        runs = run_seeks(pages, seeks)
+
+        # Runs that reached the end of the index continue from its start.
+        wraps = [
+            (0.0, low, limit - len(rows))
+            for (low, _, limit), rows in zip(seeks, runs, strict=True)
+            if len(rows) < limit
+        ]
+        exhausted = False
+        if wraps:
+            wrapped = run_seeks(pages, wraps)
+            runs.extend(wrapped)
+            exhausted = any(
+                len(rows) < limit
+                for (_, _, limit), rows in zip(wraps, wrapped, strict=True)
+            )
+
+        for rows in runs:
+            for row in rows:
+                found.setdefault(row[0], row)
+        if exhausted:
+            # A whole pass over the namespace came up short.
+            break
+
+    sample = list(found.values())
+    rng.shuffle(sample)
+    return sample[:count]
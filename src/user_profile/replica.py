@@ -0,0 +1,258 @@
+"""
+Connection handling for the wiki replica databases.
+
+Reads of the unmanaged replica models are sent by ``WikiReplicaRouter`` to
+one of the aliases in ``WIKI_REPLICA_ALIASES``, picked at random among
+those not currently marked down for connection errors or replication lag.
+That is for the short reads of the request path. Long reads (table scans,
+``LIKE`` scans, exports and management commands) go to
+``WIKI_REPLICA_BULK_ALIAS`` instead, the analytics replica, through
+``.using(bulk_alias())``; the web replicas are meant for interactive
+queries only.
+
+Every new replica connection gets a server-side statement time limit and
+a ``QueryTimeoutGuard`` execute wrapper, so a runaway query is cut off
+after ``WIKI_REPLICA_QUERY_TIMEOUT`` seconds and surfaces as
+``ReplicaQueryTimeout`` instead of holding a worker. Connections are kept
+open between requests through ``CONN_MAX_AGE`` and checked with
+``CONN_HEALTH_CHECKS`` in settings.
+"""
+
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, connections
+
+logger = logging.getLogger(__name__)
+
+# MySQL ER_QUERY_TIMEOUT, MariaDB ER_STATEMENT_TIMEOUT and ER_QUERY_INTERRUPTED.
+TIMEOUT_ERROR_CODES = {3024, 1969, 1317}
+
+# Can't connect, connection refused, server gone away, lost connection.
+CONNECTION_ERROR_CODES = {2002, 2003, 2006, 2013}
+
+# Models that live on the replica rather than in the default database.
+REPLICA_MODELS = {"wikipage", "wikirevision", "wikiactor"}
+
+# SQLite virtual machine instructions between deadline checks.
+SQLITE_PROGRESS_STEPS = 10000
+
+
+class ReplicaQueryTimeout(OperationalError):
+    """A replica query ran past ``WIKI_REPLICA_QUERY_TIMEOUT``."""
+
+
+def replica_aliases():
+    """Returns the configured replica aliases that exist in ``DATABASES``."""
+    aliases = getattr(settings, "WIKI_REPLICA_ALIASES", ["wiki_replica"])
+    return [alias for alias in aliases if alias in settings.DATABASES]
+
+
+def is_replica_alias(alias):
+    return alias in replica_aliases()
+
+
+def replica_available():
+    return bool(replica_aliases())
+
+
+def bulk_alias():
+    """
+    Returns the replica alias for long-running reads, or None, i.e. the
+    router's choice, if ``WIKI_REPLICA_BULK_ALIAS`` is not a configured
+    replica.
+    """
+    alias = getattr(settings, "WIKI_REPLICA_BULK_ALIAS", None)
+    return alias if is_replica_alias(alias) else None
+
+
+def is_replica_model(model):
+    return (
+        model._meta.app_label == "user_profile"
+        and model._meta.model_name in REPLICA_MODELS
+    )
+
+
+class ReplicaSet:
+    """
+    Tracks which replica aliases are usable and picks one per query.
+
+    When there is more than one alias, each is probed at most every
+    ``probe_interval`` seconds with ``lag_query`` (or ``SELECT 0``). An
+    alias whose probe fails, whose lag is above ``max_lag``, or whose
+    queries hit connection errors is taken out of rotation for
+    ``down_seconds``. If every alias is down, all of them are tried again.
+    """
+
+    def __init__(
+        self,
+        aliases,
+        down_seconds=30,
+        max_lag=None,
+        lag_query=None,
+        probe_interval=10,
+    ):
+        self.aliases = list(aliases)
+        self.down_seconds = down_seconds
+        self.max_lag = max_lag
+        self.lag_query = lag_query
+        self.probe_interval = probe_interval
+        self._down_until = {}
+        self._probed_at = {}
+        self._lock = threading.Lock()
+
+    def mark_down(self, alias, reason=""):
+        if alias not in self.aliases:
+            return
+        logger.warning("Taking replica %s out of rotation: %s", alias, reason)
+        with self._lock:
+            self._down_until[alias] = time.monotonic() + self.down_seconds
+
+    def is_down(self, alias):
+        return self._down_until.get(alias, 0) > time.monotonic()
+
+    def healthy_aliases(self):
+        healthy = [
+            alias
+            for alias in self.aliases
+            if not self.is_down(alias) and self._probe(alias)
+        ]
+        return healthy or self.aliases
+
+    def choose(self):
+        healthy = self.healthy_aliases()
+        return random.choice(healthy) if healthy else None  # nosec B311
+
+    def _probe(self, alias):
+        """Returns False if a due probe of ``alias`` fails or shows lag."""
+        if len(self.aliases) < 2:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            if now - self._probed_at.get(alias, float("-inf")) < self.probe_interval:
+                return True
+            self._probed_at[alias] = now
+
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(self.lag_query or "SELECT 0")
+                row = cursor.fetchone()
+        except DatabaseError as e:
+            self.mark_down(alias, str(e))
+            return False
+
+        lag = float(row[0]) if row and row[0] is not None else 0.0
+        if self.max_lag is not None and lag > self.max_lag:
+            self.mark_down(alias, f"replication lag {lag:.0f}s")
+            return False
+        return True
+
+
+_replica_set = None
+
+
+def get_replica_set():
+    global _replica_set
+    aliases = replica_aliases()
+    if _replica_set is None or _replica_set.aliases != aliases:
+        _replica_set = ReplicaSet(
+            aliases,
+            down_seconds=getattr(settings, "WIKI_REPLICA_DOWN_SECONDS", 30),
+            max_lag=getattr(settings, "WIKI_REPLICA_MAX_LAG", None),
+            lag_query=getattr(settings, "WIKI_REPLICA_LAG_QUERY", None),
+        )
+    return _replica_set
+
+
+class WikiReplicaRouter:
+    """Routes the unmanaged MediaWiki models to the wiki replicas."""
+
+    def db_for_read(self, model, **hints):
+        if is_replica_model(model):
+            return get_replica_set().choose()
+        return None
+
+    def db_for_write(self, model, **hints):
+        if is_replica_model(model):
+            return get_replica_set().choose()
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if is_replica_alias(db):
+            return False
+        if app_label == "user_profile" and model_name in REPLICA_MODELS:
+            return False
+        return None
+
+
+def query_timeout():
+    return getattr(settings, "WIKI_REPLICA_QUERY_TIMEOUT", 30)
+
+
+def is_timeout_error(error):
+    if error.args and error.args[0] in TIMEOUT_ERROR_CODES:
+        return True
+    return "interrupted" in str(error).lower()
+
+
+class QueryTimeoutGuard:
+    """
+    Execute wrapper that maps statement timeouts to ``ReplicaQueryTimeout``
+    and takes replicas with connection errors out of rotation.
+
+    MySQL and MariaDB enforce the limit on the server (see
+    ``configure_replica_connection``). SQLite has no such setting, so the
+    guard aborts the statement from a progress handler once the deadline
+    passes; this lets the timeout path run against a local SQLite replica.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context["connection"]
+        sqlite = connection.vendor == "sqlite"
+        if sqlite:
+            deadline = time.monotonic() + self.timeout
+            connection.connection.set_progress_handler(
+                lambda: time.monotonic() > deadline, SQLITE_PROGRESS_STEPS
+            )
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as e:
+            if is_timeout_error(e):
+                raise ReplicaQueryTimeout(
+                    f"Wiki replica query exceeded {self.timeout} seconds"
+                ) from e
+            if e.args and e.args[0] in CONNECTION_ERROR_CODES:
+                get_replica_set().mark_down(connection.alias, str(e))
+            raise
+        finally:
+            if sqlite:
+                connection.connection.set_progress_handler(None, 0)
+
+
+def set_statement_timeout(connection, timeout):
+    """Applies ``timeout`` (seconds) to every statement on a MySQL connection."""
+    if connection.vendor != "mysql":
+        return
+    with connection.cursor() as cursor:
+        if connection.mysql_is_mariadb:
+            cursor.execute("SET SESSION max_statement_time = %s", [timeout])
+        else:
+            cursor.execute("SET SESSION max_execution_time = %s", [int(timeout * 1000)])
+
+
+def configure_replica_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver for the replica aliases."""
+    if not is_replica_alias(connection.alias):
+        return
+
+    timeout = query_timeout()
+    if not any(isinstance(w, QueryTimeoutGuard) for w in connection.execute_wrappers):
+        connection.execute_wrappers.append(QueryTimeoutGuard(timeout))
+    set_statement_timeout(connection, timeout)
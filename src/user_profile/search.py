@@ -0,0 +1,387 @@
+"""
+Title search against the wiki replica ``page`` table.
+
+Three modes are supported:
+
+* ``prefix`` -- a range scan on the ``(page_namespace, page_title)`` index.
+* ``substring`` -- uses the local title index when it has been built with
+  ``manage.py build_title_index``, otherwise falls back to ``LIKE '%term%'``
+  on the replica.
+* ``fuzzy`` -- trigram ranking from the local title index (falls back to
+  ``substring`` when the index is not available).
+
+The index only covers the namespaces it was built for, which it records
+along with its build time in its ``meta`` table. Other namespaces are
+always searched on the replica. The index is a snapshot: pages created,
+moved or deleted after ``built_at`` are not reflected until it is rebuilt,
+so it should be rebuilt regularly, e.g. by a daily job.
+
+Prefix and substring results are ordered by title and can be paged with
+keyset cursors (see ``search_page``). Fuzzy results are ranked, so they
+come as a single page.
+"""
+
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from .models import WikiPage
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+from .replica import bulk_alias
+from .timing import phase
+
+SEARCH_MODES = ("prefix", "substring", "fuzzy")
+DEFAULT_SEARCH_MODE = "substring"
+
+# Columns fetched for API results, in ``values_list`` order.
+RESULT_COLUMNS = (
+    "page_id",
+    "page_namespace",
+    "page_title",
+    "page_is_redirect",
+    "page_len",
+)
+
+# FTS5's trigram tokenizer cannot match terms shorter than this.
+MIN_TRIGRAM_LENGTH = 3
+
+
+class InvalidSearchMode(ValueError):
+    pass
+
+
+def normalize_search_term(search_query, mode=DEFAULT_SEARCH_MODE):
+    """Converts user input to the underscore form stored in ``page_title``."""
+    term = search_query.strip().replace(" ", "_")
+    if mode == "prefix" and term:
+        # Titles are stored with an upper-case first letter on wikis with
+        # $wgCapitalLinks, so a lower-case prefix would never match.
+        first = term[0].upper()
+        if len(first) == 1:
+            term = first + term[1:]
+    return term
+
+
+def prefix_upper_bound(prefix):
+    """
+    Returns the smallest string greater than every string starting with
+    ``prefix``, or None if there is no such bound.
+
+    Code point order matches the byte order of the UTF-8 encoded
+    ``page_title`` column, so ``prefix <= title < bound`` is an index range.
+    """
+    chars = list(prefix)
+    while chars:
+        code = ord(chars[-1]) + 1
+        if 0xD800 <= code <= 0xDFFF:
+            code = 0xE000
+        if code <= 0x10FFFF:
+            chars[-1] = chr(code)
+            return "".join(chars)
+        chars.pop()
+    return None
+
+
+# ``(path, mtime)`` -> metadata of the index file, read once per build.
+_metadata_cache = {}
+
+
+class TitleIndex:
+    """
+    Local SQLite copy of ``(page_id, page_namespace, page_title,
+    page_is_redirect)`` with an FTS5 trigram index over the titles.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def connect(self):
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def metadata(self):
+        """
+        Returns ``{"namespaces": frozenset, "built_at": str}`` for the index
+        file. An index without a ``meta`` table covers no namespace.
+        """
+        key = (self.path, os.stat(self.path).st_mtime_ns)
+        metadata = _metadata_cache.get(key)
+        if metadata is None:
+            metadata = {"namespaces": frozenset(), "built_at": None}
+            try:
+                with closing(self.connect()) as conn:
+                    meta = dict(conn.execute("SELECT key, value FROM meta"))
+            except sqlite3.Error:
+                meta = {}
+            if meta:
+                metadata = {
+                    "namespaces": frozenset(
+                        int(n) for n in meta["namespaces"].split(",") if n
+                    ),
+                    "built_at": meta["built_at"],
+                }
+            _metadata_cache.clear()
+            _metadata_cache[key] = metadata
+        return metadata
+
+    def covers(self, namespace):
+        """Returns whether the index was built with ``namespace`` in it."""
+        return namespace in self.metadata()["namespaces"]
+
+    def build(self, rows, namespaces=None):
+        """
+        Writes ``rows`` of ``(page_id, namespace, title, is_redirect)`` into a
+        fresh index file and atomically replaces the current one.
+        ``namespaces`` are recorded as covered by the index, defaulting to
+        those found in ``rows``. Returns the number of rows written.
+        """
+        built_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        covered = set(namespaces or ())
+        tmp_path = f"{self.path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        count = 0
+        with closing(sqlite3.connect(tmp_path)) as conn:
+            conn.executescript(
+                """
+                PRAGMA journal_mode = OFF;
+                PRAGMA synchronous = OFF;
+                CREATE TABLE titles (
+                    page_id INTEGER PRIMARY KEY,
+                    page_namespace INTEGER NOT NULL,
+                    page_title TEXT NOT NULL,
+                    page_is_redirect INTEGER NOT NULL
+                );
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+                CREATE VIRTUAL TABLE titles_fts USING fts5(
+                    page_title, content='titles', content_rowid='page_id',
+                    tokenize='trigram'
+                );
+                """
+            )
+            batch = []
+            for page_id, namespace, title, is_redirect in rows:
+                if isinstance(title, bytes):
+                    title = title.decode("utf-8")
+                batch.append((page_id, namespace, title, int(bool(is_redirect))))
+                if namespaces is None:
+                    covered.add(namespace)
+                if len(batch) >= 10000:
+                    count += self._insert(conn, batch)
+                    batch = []
+            if batch:
+                count += self._insert(conn, batch)
+
+            conn.executescript(
+                """
+                CREATE INDEX titles_ns_title ON titles (page_namespace, page_title);
+                INSERT INTO titles_fts (titles_fts) VALUES ('rebuild');
+                INSERT INTO titles_fts (titles_fts) VALUES ('optimize');
+                """
+            )
+            conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [
+                    ("namespaces", ",".join(str(n) for n in sorted(covered))),
+                    ("built_at", built_at),
+                ],
+            )
+            conn.commit()
+
+        os.replace(tmp_path, self.path)
+        return count
+
+    @staticmethod
+    def _insert(conn, batch):
+        conn.executemany("INSERT INTO titles VALUES (?, ?, ?, ?)", batch)
+        return len(batch)
+
+    def substring(self, namespace, term, exclude_redirects=True, limit=10, after=""):
+        """
+        Returns page ids whose title contains ``term``, ordered by title and
+        starting after the title ``after``.
+        """
+        redirect_clause = "AND t.page_is_redirect = 0" if exclude_redirects else ""
+        if len(term) >= MIN_TRIGRAM_LENGTH:
+            sql = f"""
+                SELECT t.page_id FROM titles_fts f
+                JOIN titles t ON t.page_id = f.rowid
+                WHERE titles_fts MATCH ? AND t.page_namespace = ?
+                AND instr(t.page_title, ?) > 0 AND t.page_title > ?
+                {redirect_clause}
+                ORDER BY t.page_title LIMIT ?
+            """  # nosec B608
+            params = (_fts_phrase(term), namespace, term, after, limit)
+        else:
+            sql = f"""
+                SELECT t.page_id FROM titles t
+                WHERE t.page_namespace = ? AND instr(t.page_title, ?) > 0
+                AND t.page_title > ? {redirect_clause}
+                ORDER BY t.page_title LIMIT ?
+            """  # nosec B608
+            params = (namespace, term, after, limit)
+
+        with closing(self.connect()) as conn:
+            return [row[0] for row in conn.execute(sql, params)]
+
+    def fuzzy(self, namespace, term, exclude_redirects=True, limit=10):
+        """Returns page ids ranked by how many trigrams they share with ``term``."""
+        trigrams = {term[i : i + 3] for i in range(len(term) - 2)}
+        if not trigrams:
+            return self.substring(namespace, term, exclude_redirects, limit)
+
+        redirect_clause = "AND t.page_is_redirect = 0" if exclude_redirects else ""
+        sql = f"""
+            SELECT t.page_id FROM titles_fts f
+            JOIN titles t ON t.page_id = f.rowid
+            WHERE titles_fts MATCH ? AND t.page_namespace = ? {redirect_clause}
+            ORDER BY f.rank LIMIT ?
+        """  # nosec B608
+        match = " OR ".join(_fts_phrase(trigram) for trigram in sorted(trigrams))
+
+        with closing(self.connect()) as conn:
+            return [row[0] for row in conn.execute(sql, (match, namespace, limit))]
+
+
+def _fts_phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def get_title_index():
+    """Returns the configured local title index, or None if it is not built."""
+    path = getattr(settings, "WIKI_TITLE_INDEX_PATH", None)
+    if not path:
+        return None
+    index = TitleIndex(path)
+    return index if index.exists() else None
+
+
+@phase("search")
+def search_pages(
+    search_query,
+    namespace=0,
+    exclude_redirects=True,
+    limit=10,
+    mode=DEFAULT_SEARCH_MODE,
+    after=None,
+    values=False,
+    bulk=False,
+):
+    """
+    Searches page titles in ``namespace`` and returns a list of ``WikiPage``,
+    or of ``RESULT_COLUMNS`` tuples when ``values`` is true.
+    ``after`` restricts prefix and substring results to titles sorting after
+    it; it is ignored in fuzzy mode. ``bulk`` sends the queries to the bulk
+    replica, as for exports; ``LIKE`` scans always go there.
+    """
+    if mode not in SEARCH_MODES:
+        raise InvalidSearchMode(
+            f"Invalid search mode '{mode}', expected one of: {', '.join(SEARCH_MODES)}"
+        )
+
+    term = normalize_search_term(search_query, mode)
+    query = WikiPage.objects.filter(page_namespace=namespace)
+    if bulk:
+        query = query.using(bulk_alias())
+    if exclude_redirects:
+        query = query.filter(page_is_redirect=False)
+
+    if after and mode != "fuzzy":
+        query = query.filter(page_title__gt=after)
+
+    if mode == "prefix":
+        query = query.filter(page_title__gte=term)
+        upper = prefix_upper_bound(term)
+        if upper is not None:
+            query = query.filter(page_title__lt=upper)
+        return _fetch(query.order_by("page_title"), values, limit)
+
+    index = get_title_index()
+    if index is None or not index.covers(namespace):
+        if term:
+            query = query.using(bulk_alias()).filter(page_title__contains=term)
+        return _fetch(query.order_by("page_title"), values, limit)
+
+    if mode == "fuzzy":
+        page_ids = index.fuzzy(namespace, term, exclude_redirects, limit)
+    else:
+        page_ids = index.substring(
+            namespace, term, exclude_redirects, limit, after=after or ""
+        )
+
+    query = query.filter(page_id__in=page_ids)
+    if values:
+        pages = {row[0]: row for row in query.values_list(*RESULT_COLUMNS)}
+    else:
+        pages = {page.page_id: page for page in query}
+    return [pages[page_id] for page_id in page_ids if page_id in pages]
+
+
+def _fetch(query, values, limit):
+    if values:
+        query = query.values_list(*RESULT_COLUMNS)
+    return list(query[:limit])
+
+
+def search_page(
+    search_query, cursor=None, limit=10, mode=DEFAULT_SEARCH_MODE, **kwargs
+):
+    """
+    Returns one page of ``search_pages`` results and the cursor for the next
+    page, or None when there are no more results.
+    Raises ``InvalidCursor`` if ``cursor`` cannot be decoded.
+    """
+    after = None
+    if cursor:
+        key = decode_cursor(cursor)
+        if not isinstance(key, dict) or not isinstance(key.get("title"), str):
+            raise InvalidCursor("Invalid cursor")
+        after = key["title"]
+
+    pages = search_pages(
+        search_query, limit=limit + 1, mode=mode, after=after, **kwargs
+    )
+    if mode == "fuzzy" or len(pages) <= limit:
+        return pages[:limit], None
+
+    pages = pages[:limit]
+    if kwargs.get("values"):
+        last_title = pages[-1][RESULT_COLUMNS.index("page_title")]
+    else:
+        last_title = pages[-1].page_title
+    if isinstance(last_title, bytes):
+        last_title = last_title.decode("utf-8")
+    return pages, encode_cursor({"title": last_title})
+
+
+def iter_search_rows(search_query, chunk_size=1000, max_rows=None, **kwargs):
+    """
+    Yields every ``RESULT_COLUMNS`` row matching a prefix or substring
+    search, fetching ``chunk_size`` rows per keyset query so memory use and
+    per-query cost stay constant however many rows there are.
+    """
+    if kwargs.get("mode") == "fuzzy":
+        raise InvalidSearchMode("Fuzzy results are ranked and cannot be exported")
+
+    title_column = RESULT_COLUMNS.index("page_title")
+    after = None
+    remaining = max_rows
+    while remaining is None or remaining > 0:
+        limit = chunk_size if remaining is None else min(chunk_size, remaining)
+        rows = search_pages(
+            search_query, limit=limit, after=after, values=True, bulk=True, **kwargs
+        )
+        yield from rows
+        if len(rows) < limit:
+            return
+        if remaining is not None:
+            remaining -= len(rows)
+        after = rows[-1][title_column]
+        if isinstance(after, bytes):
+            after = after.decode("utf-8")
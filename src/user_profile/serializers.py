@@ -1,5 +1,8 @@
+from django.conf import settings
 from rest_framework import serializers
 
+from .namespaces import normalize_username
+
 
 class UserInfoSerializer(serializers.Serializer):
     """Serializer for user information."""
@@ -19,6 +22,44 @@ class WikiStatsSerializer(serializers.Serializer):
     user_edit_count = serializers.IntegerField(required=False)
 
 
+class BatchWikiStatsRequestSerializer(serializers.Serializer):
+    """Serializer for the usernames of a batch statistics request."""
+
+    usernames = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        min_length=1,
+        max_length=getattr(settings, "WIKI_STATS_BATCH_MAX_USERS", 50),
+    )
+
+    def validate_usernames(self, value):
+        usernames = [normalize_username(name) for name in value]
+        return list(dict.fromkeys(name for name in usernames if name))
+
+
+class PageLookupRequestSerializer(serializers.Serializer):
+    """Serializer for the titles and page ids of a bulk page lookup."""
+
+    titles = serializers.ListField(
+        child=serializers.CharField(max_length=255), required=False, default=list
+    )
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, default=list
+    )
+
+    def validate(self, data):
+        data["titles"] = list(dict.fromkeys(data["titles"]))
+        data["ids"] = list(dict.fromkeys(data["ids"]))
+        total = len(data["titles"]) + len(data["ids"])
+        if not total:
+            raise serializers.ValidationError("Titles or ids are required")
+        max_items = getattr(settings, "PAGE_LOOKUP_MAX_ITEMS", 500)
+        if total > max_items:
+            raise serializers.ValidationError(
+                f"At most {max_items} titles and ids can be looked up at once"
+            )
+        return data
+
+
 class SearchResultSerializer(serializers.Serializer):
     """Serializer for search results."""
 
@@ -28,3 +69,31 @@ class SearchResultSerializer(serializers.Serializer):
     page_is_redirect = serializers.BooleanField()
     page_len = serializers.IntegerField()
     url = serializers.CharField()
+
+
+class ContributionSerializer(serializers.Serializer):
+    """Serializer for one revision in a user's contributions."""
+
+    rev_id = serializers.IntegerField()
+    parent_id = serializers.IntegerField(allow_null=True)
+    page_id = serializers.IntegerField()
+    page_namespace = serializers.IntegerField(allow_null=True)
+    page_title = serializers.CharField(allow_null=True)
+    url = serializers.CharField(allow_null=True)
+    timestamp = serializers.CharField()
+    minor = serializers.BooleanField()
+    size = serializers.IntegerField(allow_null=True)
+
+
+class NamespaceStatsSerializer(serializers.Serializer):
+    """Serializer for the precomputed statistics of one namespace."""
+
+    namespace = serializers.IntegerField()
+    page_count = serializers.IntegerField()
+    redirect_count = serializers.IntegerField()
+    redirect_ratio = serializers.FloatField()
+    average_len = serializers.FloatField()
+    min_len = serializers.IntegerField(allow_null=True)
+    max_len = serializers.IntegerField(allow_null=True)
+    len_histogram = serializers.ListField(child=serializers.IntegerField())
+    refreshed_at = serializers.DateTimeField()
@@ -0,0 +1,224 @@
+"""
+Slow-query log for the wiki replicas.
+
+Replica queries that take longer than ``SLOW_QUERY_THRESHOLD`` seconds, or
+time out, are written as JSON lines to the ``user_profile.slow_queries``
+logger, which settings send to rotating files. Every worker process writes
+its own ``<name>.<pid>.log``, next to ``SLOW_QUERY_LOG_PATH``, so rotation
+never races with another process. With ``SLOW_QUERY_EXPLAIN``
+the query plan is captured too, at most once per query shape every
+``SLOW_QUERY_EXPLAIN_INTERVAL`` seconds. Staff can browse the samples,
+grouped by query shape, at ``admin/slow-queries/``.
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import DatabaseError
+from django.shortcuts import render
+
+from .replica import is_replica_alias
+
+logger = logging.getLogger(__name__)
+
+
+def _json_value(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def process_log_path(path, pid):
+    """Returns the log file of process ``pid``, e.g. ``slow.123.log``."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{pid}{ext}"
+
+
+class ProcessRotatingFileHandler(RotatingFileHandler):
+    """
+    ``RotatingFileHandler`` writing to ``process_log_path(filename, pid)``.
+
+    The pid is looked up when a record is written, not when logging is
+    configured, so workers forked after that do not share their parent's
+    file.
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        self.path = os.fspath(filename)
+        self.pid = os.getpid()
+        kwargs["delay"] = True
+        super().__init__(process_log_path(self.path, self.pid), *args, **kwargs)
+
+    def emit(self, record):
+        pid = os.getpid()
+        if pid != self.pid:
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = os.path.abspath(process_log_path(self.path, pid))
+            self.pid = pid
+        super().emit(record)
+
+
+class SlowQueryLog:
+    """Execute wrapper logging replica queries slower than ``threshold``."""
+
+    def __init__(self, threshold, explain=False, explain_interval=300):
+        self.threshold = threshold
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self._explained_at = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(self._local, "explaining", False):
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        error = None
+        try:
+            return execute(sql, params, many, context)
+        except DatabaseError as e:
+            error = e
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= self.threshold:
+                self.record(context["connection"], sql, params, many, duration, error)
+
+    def record(self, connection, sql, params, many, duration, error=None):
+        sample = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "alias": connection.alias,
+            "duration_ms": round(duration * 1000, 1),
+            "sql": sql,
+            "params": None if many else [_json_value(p) for p in params or ()],
+            "error": type(error).__name__ if error is not None else None,
+        }
+        if self.explain and not many and self._explain_due(sql):
+            sample["plan"] = self.explain_plan(connection, sql, params)
+        logger.info(json.dumps(sample))
+
+    def _explain_due(self, sql):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained_at.get(sql, float("-inf")) < self.explain_interval:
+                return False
+            self._explained_at[sql] = now
+            return True
+
+    def explain_plan(self, connection, sql, params):
+        """Returns the plan rows for ``sql``, or None if it cannot be explained."""
+        if not sql.lstrip().upper().startswith("SELECT"):
+            return None
+        self._local.explaining = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+                return [[_json_value(v) for v in row] for row in cursor.fetchall()]
+        except DatabaseError as e:
+            logger.warning("EXPLAIN of slow query failed: %s", e)
+            return None
+        finally:
+            self._local.explaining = False
+
+
+_slow_query_log = None
+
+
+def get_slow_query_log():
+    global _slow_query_log
+    if _slow_query_log is None:
+        _slow_query_log = SlowQueryLog(
+            getattr(settings, "SLOW_QUERY_THRESHOLD", 1.0),
+            explain=getattr(settings, "SLOW_QUERY_EXPLAIN", False),
+            explain_interval=getattr(settings, "SLOW_QUERY_EXPLAIN_INTERVAL", 300),
+        )
+    return _slow_query_log
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    """``connection_created`` receiver for the replica aliases."""
+    if not is_replica_alias(connection.alias):
+        return
+    if not any(isinstance(w, SlowQueryLog) for w in connection.execute_wrappers):
+        connection.execute_wrappers.append(get_slow_query_log())
+
+
+def log_files(path):
+    """
+    Returns the per-process log files for ``path`` and their rotated copies,
+    plus any file still written to ``path`` itself.
+    """
+    root, ext = os.path.splitext(path)
+    return sorted(
+        set(glob.glob(glob.escape(root) + ".*" + ext + "*"))
+        | set(glob.glob(glob.escape(path)))
+        | set(glob.glob(glob.escape(path) + ".*"))
+    )
+
+
+def read_samples(path):
+    """Returns the samples in all the log files for ``path``."""
+    samples = []
+    for candidate in log_files(path):
+        try:
+            f = open(candidate, encoding="utf-8")
+        except OSError:
+            # Rotated away since the glob.
+            continue
+        with f:
+            for line in f:
+                try:
+                    samples.append(json.loads(line))
+                except ValueError:
+                    continue
+    return samples
+
+
+def summarize(samples):
+    """Groups samples by SQL, slowest total time first."""
+    shapes = {}
+    for sample in sorted(samples, key=lambda s: s.get("time", "")):
+        shape = shapes.setdefault(
+            sample["sql"],
+            {"sql": sample["sql"], "count": 0, "total_ms": 0.0, "max_ms": 0.0},
+        )
+        shape["count"] += 1
+        shape["total_ms"] += sample["duration_ms"]
+        shape["max_ms"] = max(shape["max_ms"], sample["duration_ms"])
+        shape["last"] = sample
+        if sample.get("plan"):
+            shape["plan"] = sample["plan"]
+
+    for shape in shapes.values():
+        shape["avg_ms"] = round(shape["total_ms"] / shape["count"], 1)
+        shape["total_ms"] = round(shape["total_ms"], 1)
+    return sorted(shapes.values(), key=lambda s: s["total_ms"], reverse=True)
+
+
+@staff_member_required
+def slow_queries_view(request):
+    path = getattr(settings, "SLOW_QUERY_LOG_PATH", None)
+    shapes = summarize(read_samples(path)) if path else []
+    return render(
+        request,
+        "user_profile/admin/slow_queries.dtl",
+        {
+            "title": "Slow replica queries",
+            "shapes": shapes,
+            "log_path": path,
+            "threshold": getattr(settings, "SLOW_QUERY_THRESHOLD", 1.0),
+        },
+    )
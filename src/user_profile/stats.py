@@ -0,0 +1,262 @@
+"""
+Cached aggregate statistics read from the wiki replica.
+"""
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Case, Count, F, Max, Min, Q, Sum, Value, When
+from django.utils import timezone
+
+from .caching import TieredCache
+from .coalescing import SingleFlight
+from .models import (
+    PAGE_LEN_BUCKETS,
+    NamespaceStats,
+    UserEditCount,
+    WikiActor,
+    WikiPage,
+    WikiRevision,
+)
+from .replica import bulk_alias
+from .timing import phase
+
+TOTAL_ARTICLES_KEY = "total_articles"
+
+stats_cache = TieredCache(
+    "wiki-stats",
+    ttl=getattr(settings, "WIKI_STATS_CACHE_TTL", 600),
+    stale_ttl=getattr(settings, "WIKI_STATS_CACHE_STALE_TTL", 86400),
+)
+
+# Concurrent cold-cache loads of the same statistic share one replica query.
+stats_flight = SingleFlight("wiki-stats")
+
+
+@phase("total_articles")
+def count_total_articles():
+    """Counts non-redirect pages in the main namespace on the replica."""
+    return (
+        WikiPage.objects.using(bulk_alias())
+        .filter(page_namespace=0, page_is_redirect=False)
+        .count()
+    )
+
+
+def get_total_articles():
+    """Returns the article count, served from the stats cache."""
+    return stats_cache.get(
+        TOTAL_ARTICLES_KEY,
+        lambda: stats_flight.do(TOTAL_ARTICLES_KEY, count_total_articles),
+    )
+
+
+def _as_text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+@phase("actor_lookup")
+def find_actor_id(mw_username):
+    """Looks up the replica actor id for a MediaWiki username."""
+    # Passed as text: a CharField lookup would turn bytes into "b'...'".
+    return (
+        WikiActor.objects.filter(actor_name=_as_text(mw_username))
+        .values_list("actor_id", flat=True)
+        .first()
+    )
+
+
+@phase("revision_count")
+def count_revisions(actor_id, after="", after_id=0):
+    """
+    Counts revisions by ``actor_id`` after the ``(after, after_id)``
+    watermark, i.e. newer than ``after``, or at ``after`` with a higher
+    ``rev_id``. Returns a dict with ``count`` and the ``latest`` timestamp
+    and ``latest_id`` seen.
+    """
+    # Both queries go to one replica; a watermark from a replica ahead of
+    # the one that counted would skip the revisions in between for good.
+    alias = router.db_for_read(WikiRevision)
+    revisions = WikiRevision.objects.using(alias).filter(rev_actor=actor_id)
+    if after:
+        # The ``>=`` bound keeps the scan on the actor/timestamp index.
+        revisions = revisions.filter(rev_timestamp__gte=after).filter(
+            Q(rev_timestamp__gt=after) | Q(rev_id__gt=after_id)
+        )
+    count = revisions.count()
+    if not count:
+        return {"count": 0, "latest": None, "latest_id": None}
+    latest, latest_id = (
+        revisions.order_by("-rev_timestamp", "-rev_id")
+        .values_list("rev_timestamp", "rev_id")
+        .first()
+    )
+    return {"count": count, "latest": latest, "latest_id": latest_id}
+
+
+def recount_due(record, now=None):
+    """
+    Returns whether ``record`` is due a full recount, which picks up deleted,
+    undeleted and imported revisions that the incremental count misses.
+    """
+    if record.recounted_at is None:
+        return True
+    now = now or timezone.now()
+    max_age = getattr(settings, "WIKI_EDIT_COUNT_RECOUNT_AGE", 7 * 86400)
+    return (now - record.recounted_at).total_seconds() >= max_age
+
+
+def get_user_edit_count(mw_username, full=False):
+    """
+    Returns the edit count for ``mw_username``.
+
+    The count is stored locally along with the newest ``rev_timestamp`` and
+    the highest ``rev_id`` at that timestamp it covers, so only revisions
+    after that are counted on the replica. Revisions saved in the same
+    second as the watermark are told apart by their id. Once the last full
+    count is older than ``WIKI_EDIT_COUNT_RECOUNT_AGE`` seconds, or with
+    ``full=True``, it is recounted from scratch.
+    """
+    record, _ = UserEditCount.objects.get_or_create(mw_username=mw_username)
+
+    while True:
+        if record.actor_id is None:
+            actor_id = find_actor_id(mw_username)
+            if actor_id is None:
+                return record.edit_count
+            UserEditCount.objects.filter(pk=record.pk).update(actor_id=actor_id)
+            record.actor_id = actor_id
+
+        recount = full or recount_due(record)
+        if recount:
+            new = count_revisions(record.actor_id)
+            values = {"edit_count": new["count"], "recounted_at": timezone.now()}
+        else:
+            new = count_revisions(
+                record.actor_id,
+                after=record.max_rev_timestamp,
+                after_id=record.max_rev_id,
+            )
+            if not new["count"]:
+                return record.edit_count
+            values = {"edit_count": F("edit_count") + new["count"]}
+        values["max_rev_timestamp"] = _as_text(new["latest"]) or ""
+        values["max_rev_id"] = new["latest_id"] or 0
+
+        # Only apply the count if no concurrent refresh moved the watermark.
+        updated = UserEditCount.objects.filter(
+            pk=record.pk,
+            max_rev_timestamp=record.max_rev_timestamp,
+            max_rev_id=record.max_rev_id,
+        ).update(**values)
+        record.refresh_from_db()
+        if updated:
+            return record.edit_count
+
+
+def get_edit_counts(usernames):
+    """
+    Returns ``{username: edit_count}`` for the given MediaWiki usernames,
+    using one actor lookup and one grouped revision count. Usernames without
+    an actor row are left out.
+    """
+    actors = dict(
+        WikiActor.objects.filter(actor_name__in=list(usernames)).values_list(
+            "actor_id", "actor_name"
+        )
+    )
+    if not actors:
+        return {}
+
+    counts = dict(
+        WikiRevision.objects.filter(rev_actor__in=list(actors))
+        .values("rev_actor")
+        .annotate(edit_count=Count("rev_id"))
+        .order_by()
+        .values_list("rev_actor", "edit_count")
+    )
+    return {
+        _as_text(actor_name): counts.get(actor_id, 0)
+        for actor_id, actor_name in actors.items()
+    }
+
+
+def warm_stats_cache():
+    """Recomputes every cached statistic. Returns a dict of the new values."""
+    return {
+        TOTAL_ARTICLES_KEY: stats_cache.refresh(
+            TOTAL_ARTICLES_KEY, count_total_articles
+        ),
+    }
+
+
+def _len_bucket():
+    """Index of the ``PAGE_LEN_BUCKETS`` bucket a page's length falls in."""
+    return Case(
+        *[
+            When(page_len__lt=bound, then=Value(i))
+            for i, bound in enumerate(PAGE_LEN_BUCKETS)
+        ],
+        default=Value(len(PAGE_LEN_BUCKETS)),
+    )
+
+
+def scan_namespace_stats(chunk_size=100000):
+    """
+    Aggregates the replica ``page`` table per namespace. Each query groups
+    one ``page_id`` range of ``chunk_size`` ids, so no single query has to
+    scan the whole table.
+    """
+    pages = WikiPage.objects.using(bulk_alias())
+    max_id = pages.aggregate(max_id=Max("page_id"))["max_id"] or 0
+    stats = {}
+    for low in range(0, max_id, chunk_size):
+        groups = (
+            pages.filter(page_id__gt=low, page_id__lte=low + chunk_size)
+            .values("page_namespace", "page_is_redirect", bucket=_len_bucket())
+            .annotate(
+                pages=Count("page_id"),
+                total_len=Sum("page_len"),
+                min_len=Min("page_len"),
+                max_len=Max("page_len"),
+            )
+            .order_by()
+        )
+        for group in groups:
+            entry = stats.setdefault(
+                group["page_namespace"],
+                {
+                    "page_count": 0,
+                    "redirect_count": 0,
+                    "total_len": 0,
+                    "min_len": None,
+                    "max_len": None,
+                    "len_histogram": [0] * (len(PAGE_LEN_BUCKETS) + 1),
+                },
+            )
+            entry["page_count"] += group["pages"]
+            if group["page_is_redirect"]:
+                entry["redirect_count"] += group["pages"]
+                continue
+            entry["total_len"] += group["total_len"]
+            entry["len_histogram"][group["bucket"]] += group["pages"]
+            if entry["min_len"] is None or group["min_len"] < entry["min_len"]:
+                entry["min_len"] = group["min_len"]
+            if entry["max_len"] is None or group["max_len"] > entry["max_len"]:
+                entry["max_len"] = group["max_len"]
+    return stats
+
+
+def refresh_namespace_stats(chunk_size=100000):
+    """
+    Recomputes the ``NamespaceStats`` table from the replica and returns
+    the new values by namespace.
+    """
+    stats = scan_namespace_stats(chunk_size)
+    now = timezone.now()
+    with transaction.atomic():
+        NamespaceStats.objects.exclude(namespace__in=list(stats)).delete()
+        for namespace, values in stats.items():
+            NamespaceStats.objects.update_or_create(
+                namespace=namespace, defaults={**values, "refreshed_at": now}
+            )
+    return stats
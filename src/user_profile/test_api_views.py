@@ -1,26 +1,16 @@
+import asyncio
+
 import pytest
-from django.contrib.auth.models import User
-from django.test import Client
 from django.urls import reverse
+from django.utils import timezone
 
-
-@pytest.fixture
-def client():
-    """Create test client."""
-    return Client()
-
-
-@pytest.fixture
-def user(db):
-    """Create test user."""
-    return User.objects.create_user(username="testuser", password="testpass123")
-
-
-@pytest.fixture
-def authenticated_client(client, user):
-    """Create authenticated client."""
-    client.login(username="testuser", password="testpass123")
-    return client
+from user_profile import api_views, async_views, search
+from user_profile.api_views import search_results_data
+from user_profile.models import NamespaceStats, WikiPage
+from user_profile.serializers import (
+    BatchWikiStatsRequestSerializer,
+    SearchResultSerializer,
+)
 
 
 @pytest.mark.django_db
@@ -78,3 +68,277 @@ class TestSearchAPIView:
         response = authenticated_client.get(reverse("api-search"), {"q": "test"})
         # Should return 503 for local dev without wiki_replica
         assert response.status_code in [200, 503]
+
+
+@pytest.mark.django_db
+class TestAsyncAPIViews:
+    """Tests for the async API endpoints."""
+
+    @pytest.mark.parametrize(
+        "url_name",
+        ["api-async-user", "api-async-stats", "api-async-search", "api-async-profile"],
+    )
+    def test_requires_authentication(self, client, url_name):
+        """Test that every async endpoint requires authentication."""
+        response = client.get(reverse(url_name))
+        assert response.status_code == 403
+
+    def test_user_without_oauth(self, authenticated_client):
+        """Test that a user without a social-auth record gets a 404."""
+        response = authenticated_client.get(reverse("api-async-user"))
+        assert response.status_code == 404
+
+    def test_profile_without_oauth(self, authenticated_client):
+        """Test that the combined profile needs a social-auth record."""
+        response = authenticated_client.get(reverse("api-async-profile"))
+        assert response.status_code == 404
+
+    def test_stats_without_wiki_replica(self, authenticated_client):
+        """Test that stats return N/A without the wiki replica."""
+        response = authenticated_client.get(reverse("api-async-stats"))
+        assert response.status_code == 200
+        assert response.json()["total_articles"] == "N/A"
+
+    def test_search_requires_query(self, authenticated_client):
+        """Test that search requires a query parameter."""
+        response = authenticated_client.get(reverse("api-async-search"))
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestBatchWikiStatsAPIView:
+    """Tests for the batch statistics endpoint."""
+
+    def test_requires_authentication(self, client):
+        """Test that endpoint requires authentication."""
+        response = client.get(reverse("api-stats-batch"), {"usernames": "A|B"})
+        assert response.status_code == 403
+
+    def test_requires_usernames(self, authenticated_client):
+        """Test that at least one username is required."""
+        response = authenticated_client.get(reverse("api-stats-batch"))
+        assert response.status_code == 400
+        assert "usernames" in response.json()
+
+    def test_rejects_too_many_usernames(self, authenticated_client):
+        """Test the per-request username limit."""
+        usernames = "|".join(f"User{i}" for i in range(51))
+        response = authenticated_client.get(
+            reverse("api-stats-batch"), {"usernames": usernames}
+        )
+        assert response.status_code == 400
+
+    def test_normalizes_usernames(self):
+        """Test that usernames are normalised like MediaWiki user names."""
+        serializer = BatchWikiStatsRequestSerializer(
+            data={"usernames": ["example", "Example", "foo_bar"]}
+        )
+        assert serializer.is_valid()
+        assert serializer.validated_data["usernames"] == ["Example", "Foo bar"]
+
+    def test_returns_error_without_wiki_replica(self, authenticated_client):
+        """Test that endpoint returns 503 without wiki replica in local dev."""
+        response = authenticated_client.post(
+            reverse("api-stats-batch"),
+            {"usernames": ["A", "B"]},
+            content_type="application/json",
+        )
+        assert response.status_code in [200, 503]
+
+
+def test_search_results_data_matches_serializer():
+    """Test that the fast path produces the same output as the serializer."""
+    page = WikiPage(
+        page_id=1,
+        page_namespace=14,
+        page_title=b"Python_stubs",
+        page_is_redirect=0,
+        page_len=120,
+    )
+    expected = SearchResultSerializer(
+        {
+            "page_id": page.page_id,
+            "page_title": page.full_title,
+            "page_namespace": page.page_namespace,
+            "page_is_redirect": page.page_is_redirect,
+            "page_len": page.page_len,
+            "url": page.url,
+        }
+    ).data
+    row = (1, 14, b"Python_stubs", 0, 120)
+    assert search_results_data([row]) == [expected]
+
+
+@pytest.mark.django_db
+class TestSearchExportAPIView:
+    """Tests for the streaming search export endpoint."""
+
+    def test_requires_authentication(self, client):
+        """Test that endpoint requires authentication."""
+        response = client.get(reverse("api-search-export"), {"q": "test"})
+        assert response.status_code == 403
+
+    def test_rejects_unknown_output(self, authenticated_client):
+        """Test that only NDJSON and CSV are offered."""
+        response = authenticated_client.get(
+            reverse("api-search-export"), {"q": "test", "output": "xml"}
+        )
+        assert response.status_code == 400
+
+    def test_returns_error_without_wiki_replica(self, authenticated_client):
+        """Test that endpoint returns error without wiki replica in local dev."""
+        response = authenticated_client.get(reverse("api-search-export"), {"q": "t"})
+        assert response.status_code in [200, 503]
+
+    @pytest.mark.parametrize("output", ["ndjson", "csv"])
+    def test_streams_before_later_chunks_load(
+        self, authenticated_client, monkeypatch, settings, output
+    ):
+        """Test that the first lines go out before the next chunk is queried."""
+        settings.SEARCH_EXPORT_CHUNK_SIZE = 2
+        settings.SEARCH_EXPORT_MAX_ROWS = 10
+        calls = []
+
+        def fake_search_pages(search_query, limit, after, **kwargs):
+            calls.append(after)
+            start = int(after or 0)
+            return [
+                (i, 0, f"{i:04d}", False, 10)
+                for i in range(start + 1, start + 1 + limit)
+            ]
+
+        monkeypatch.setattr(api_views, "replica_available", lambda: True)
+        monkeypatch.setattr(search, "search_pages", fake_search_pages)
+        response = authenticated_client.get(
+            reverse("api-search-export"), {"q": "t", "output": output}
+        )
+        assert response.status_code == 200
+        content = iter(response.streaming_content)
+        next(content)
+        next(content)
+        assert calls == [None]
+        response.close()
+
+
+@pytest.mark.django_db
+class TestNamespaceStatsAPIView:
+    """Tests for the per-namespace statistics endpoint."""
+
+    def test_requires_authentication(self, client):
+        """Test that endpoint requires authentication."""
+        response = client.get(reverse("api-stats-namespaces"))
+        assert response.status_code == 403
+
+    def test_reads_local_table(self, authenticated_client):
+        """Test that the precomputed rows are returned without the replica."""
+        NamespaceStats.objects.create(
+            namespace=0,
+            page_count=10,
+            redirect_count=4,
+            total_len=6000,
+            min_len=100,
+            max_len=3000,
+            len_histogram=[1, 2, 3, 0, 0, 0, 0, 0, 0, 0],
+            refreshed_at=timezone.now(),
+        )
+        response = authenticated_client.get(reverse("api-stats-namespaces"))
+        assert response.status_code == 200
+        [namespace] = response.json()["namespaces"]
+        assert namespace["redirect_ratio"] == 0.4
+        assert namespace["average_len"] == 1000.0
+        assert len(response.json()["len_buckets"]) == 9
+
+
+@pytest.mark.django_db
+class TestContributionsAPIView:
+    """Tests for the user contributions endpoint."""
+
+    def test_requires_authentication(self, client):
+        """Test that endpoint requires authentication."""
+        response = client.get(reverse("api-contributions"))
+        assert response.status_code == 403
+
+    def test_requires_user_without_oauth(self, authenticated_client):
+        """Test that a user must be named when there is no MediaWiki login."""
+        response = authenticated_client.get(reverse("api-contributions"))
+        assert response.status_code == 400
+
+    def test_returns_error_without_wiki_replica(self, authenticated_client):
+        """Test that endpoint returns error without wiki replica in local dev."""
+        response = authenticated_client.get(
+            reverse("api-contributions"), {"user": "Example"}
+        )
+        assert response.status_code in [200, 404, 503]
+
+    def test_normalizes_user(self, authenticated_client, monkeypatch):
+        """Test that the user parameter is normalised like a MediaWiki name."""
+        users = []
+
+        def fake_contributions_page(mw_username, cursor=None, limit=50):
+            users.append(mw_username)
+            return [], None
+
+        monkeypatch.setattr(api_views, "replica_available", lambda: True)
+        monkeypatch.setattr(api_views, "contributions_page", fake_contributions_page)
+        response = authenticated_client.get(
+            reverse("api-contributions"), {"user": "example_user"}
+        )
+        assert response.json()["user"] == "Example user"
+        assert users == ["Example user"]
+
+
+@pytest.mark.django_db
+class TestRandomPagesAPIView:
+    """Tests for the random pages endpoint."""
+
+    def test_requires_authentication(self, client):
+        """Test that endpoint requires authentication."""
+        response = client.get(reverse("api-random"))
+        assert response.status_code == 403
+
+    def test_returns_error_without_wiki_replica(self, authenticated_client):
+        """Test that endpoint returns error without wiki replica in local dev."""
+        response = authenticated_client.get(reverse("api-random"), {"count": 5})
+        assert response.status_code in [200, 503]
+
+
+@pytest.mark.django_db
+class TestPageLookupAPIView:
+    """Tests for the bulk page lookup endpoint."""
+
+    def test_requires_authentication(self, client):
+        """Test that endpoint requires authentication."""
+        response = client.get(reverse("api-pages-lookup"), {"titles": "Python"})
+        assert response.status_code == 403
+
+    def test_requires_titles_or_ids(self, authenticated_client):
+        """Test that an empty lookup is rejected."""
+        response = authenticated_client.get(reverse("api-pages-lookup"))
+        assert response.status_code == 400
+
+    def test_rejects_too_many_items(self, authenticated_client, settings):
+        """Test that the number of titles and ids is capped."""
+        settings.PAGE_LOOKUP_MAX_ITEMS = 2
+        response = authenticated_client.post(
+            reverse("api-pages-lookup"),
+            {"titles": ["A", "B"], "ids": [1]},
+            content_type="application/json",
+        )
+        assert response.status_code == 400
+
+    def test_returns_error_without_wiki_replica(self, authenticated_client):
+        """Test that endpoint returns error without wiki replica in local dev."""
+        response = authenticated_client.get(
+            reverse("api-pages-lookup"), {"titles": "Python|Category:Stubs"}
+        )
+        assert response.status_code in [200, 503]
+
+
+def test_run_in_thread_closes_connections(monkeypatch):
+    """Test that worker threads close their connections when done."""
+    closed = []
+    monkeypatch.setattr(
+        async_views.connections, "close_all", lambda: closed.append(True)
+    )
+    assert asyncio.run(async_views.run_in_thread(lambda: 42)) == 42
+    assert closed == [True]
@@ -0,0 +1,80 @@
+import pytest
+from django.core.cache import cache
+
+from user_profile.caching import TieredCache
+
+
+class Loader:
+    """Counts how often a cache loader runs."""
+
+    def __init__(self, value=1):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+@pytest.fixture
+def tiered_cache():
+    cache.clear()
+    return TieredCache("test", ttl=60, stale_ttl=600)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls the time seen by the cache."""
+    now = [1000.0]
+    monkeypatch.setattr("user_profile.caching.time.time", lambda: now[0])
+    return now
+
+
+class TestTieredCache:
+    """Tests for the two-tier stats cache."""
+
+    def test_cold_cache_loads_once(self, tiered_cache, clock):
+        """Test that the loader runs once and later reads are cached."""
+        loader = Loader(42)
+        assert tiered_cache.get("key", loader) == 42
+        assert tiered_cache.get("key", loader) == 42
+        assert loader.calls == 1
+
+    def test_shared_tier_is_used_by_other_processes(self, tiered_cache, clock):
+        """Test that a fresh cache instance reads the shared tier."""
+        tiered_cache.get("key", Loader(42))
+        loader = Loader(7)
+        assert TieredCache("test", ttl=60, stale_ttl=600).get("key", loader) == 42
+        assert loader.calls == 0
+
+    def test_stale_value_served_while_refreshing(
+        self, tiered_cache, clock, monkeypatch
+    ):
+        """Test stale-while-revalidate behaviour."""
+        started = []
+        monkeypatch.setattr(
+            tiered_cache, "_start_refresh", lambda key, loader: started.append(key)
+        )
+        tiered_cache.get("key", Loader(1))
+        clock[0] += 120
+        assert tiered_cache.get("key", Loader(2)) == 1
+        assert started == ["key"]
+
+    def test_expired_value_is_reloaded(self, tiered_cache, clock):
+        """Test that values past the stale window are loaded synchronously."""
+        tiered_cache.get("key", Loader(1))
+        clock[0] += 601
+        assert tiered_cache.get("key", Loader(2)) == 2
+
+    def test_background_refresh_updates_both_tiers(self, tiered_cache, clock):
+        """Test that a background refresh stores the new value."""
+        tiered_cache.get("key", Loader(1))
+        tiered_cache._refresh_in_background("key", Loader(2))
+        assert tiered_cache.peek("key") == 2
+        assert cache.get("test:key")[0] == 2
+
+    def test_invalidate(self, tiered_cache, clock):
+        """Test that invalidation clears both tiers."""
+        tiered_cache.get("key", Loader(1))
+        tiered_cache.invalidate("key")
+        assert tiered_cache.peek("key") is None
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+
+from user_profile.coalescing import SingleFlight
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class TestSingleFlight:
+    """Tests for single-flight coalescing."""
+
+    def test_concurrent_calls_share_one_load(self):
+        """Test that threads asking for the same key run the loader once."""
+        flight = SingleFlight("test")
+        calls = []
+        started = threading.Event()
+
+        def loader():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return "value"
+
+        results = []
+
+        def call():
+            results.append(flight.do("key", loader))
+
+        threads = [threading.Thread(target=call) for _ in range(5)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert calls == [1]
+        assert results == ["value"] * 5
+
+    def test_errors_are_shared_and_not_cached(self):
+        """Test that waiters get the leader's error and later calls retry."""
+        flight = SingleFlight("test")
+
+        def failing():
+            raise ValueError("replica down")
+
+        with pytest.raises(ValueError):
+            flight.do("key", failing)
+        assert flight.do("key", lambda: "recovered") == "recovered"
+
+    def test_waits_for_other_worker(self):
+        """Test that a worker holding the shared lock provides the result."""
+        worker = SingleFlight("test", poll_interval=0.01)
+        other = SingleFlight("test", poll_interval=0.01)
+        started = threading.Event()
+
+        def slow():
+            started.set()
+            time.sleep(0.1)
+            return "from other worker"
+
+        thread = threading.Thread(target=other.do, args=("key", slow))
+        thread.start()
+        started.wait()
+
+        def loader():
+            raise AssertionError("should not query")
+
+        assert worker.do("key", loader) == "from other worker"
+        thread.join()
+
+    def test_later_calls_load_again(self):
+        """Test that results are not reused once the flight is over."""
+        flight = SingleFlight("test")
+        assert flight.do("key", lambda: 1) == 1
+        assert flight.do("key", lambda: 2) == 2
+
+    def test_runs_loader_after_wait_timeout(self):
+        """Test that a stuck worker does not block others forever."""
+        flight = SingleFlight("test", wait_timeout=0.05, poll_interval=0.01)
+        cache.add(flight._key("key") + ":lock", "stuck", 60)
+        assert flight.do("key", lambda: "own") == "own"
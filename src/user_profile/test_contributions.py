@@ -0,0 +1,89 @@
+import pytest
+from django.db import connection
+
+from user_profile.contributions import (
+    UnknownUser,
+    contributions_page,
+    format_timestamp,
+)
+from user_profile.models import WikiActor, WikiRevision
+from user_profile.pagination import InvalidCursor, encode_cursor
+from user_profile.serializers import ContributionSerializer
+
+
+@pytest.fixture
+def replica(fixture_replica):
+    """Returns the first actor with edits, after adding two in the same second."""
+    actor_id = (
+        WikiRevision.objects.values_list("rev_actor", flat=True)
+        .order_by("rev_actor")
+        .first()
+    )
+    actor = WikiActor.objects.get(actor_id=actor_id)
+    # They exercise the rev_id tie-break.
+    newest = WikiRevision.objects.order_by("-rev_id").first()
+    with connection.cursor() as cursor:
+        for rev_id in (newest.rev_id + 1, newest.rev_id + 2):
+            cursor.execute(
+                "INSERT INTO revision (rev_id, rev_page, rev_comment_id, rev_actor, "
+                "rev_timestamp, rev_minor_edit, rev_deleted, rev_len, "
+                "rev_parent_id, rev_sha1) "
+                "VALUES (%s, %s, 0, %s, '20260101000000', 0, 0, 10, 0, '')",
+                [rev_id, newest.rev_page, actor_id],
+            )
+    return actor
+
+
+def test_format_timestamp():
+    """Test that MediaWiki timestamps are returned in ISO 8601."""
+    assert format_timestamp(b"20240102030405") == "2024-01-02T03:04:05Z"
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "fixture_replica", [{"pages": 50, "actors": 3, "revisions": 200}], indirect=True
+)
+class TestContributionsPage:
+    """Tests for keyset-paged user contributions."""
+
+    def test_pages_match_full_listing(self, replica, django_assert_max_num_queries):
+        """Test that paging returns every revision once, newest first."""
+        expected = list(
+            WikiRevision.objects.filter(rev_actor=replica.actor_id)
+            .order_by("-rev_timestamp", "-rev_id")
+            .values_list("rev_id", flat=True)
+        )
+        assert len(expected) > 7
+
+        seen = []
+        cursor = None
+        while True:
+            # Actor, revisions and titles, however deep the page.
+            with django_assert_max_num_queries(3):
+                results, cursor = contributions_page(
+                    str(replica), cursor=cursor, limit=7
+                )
+            assert len(results) <= 7
+            seen.extend(result["rev_id"] for result in results)
+            if cursor is None:
+                break
+
+        assert seen == expected
+
+    def test_results_have_titles(self, replica):
+        """Test that each revision carries its page title and URL."""
+        results, _ = contributions_page(str(replica), limit=5)
+        for result in results:
+            assert result["page_title"]
+            assert result["url"].startswith("https://")
+            assert set(result) == set(ContributionSerializer().fields)
+
+    def test_unknown_user(self, replica):
+        """Test that names without an actor row are rejected."""
+        with pytest.raises(UnknownUser):
+            contributions_page("Nobody at all")
+
+    def test_invalid_cursor(self, replica):
+        """Test that malformed cursors are rejected."""
+        with pytest.raises(InvalidCursor):
+            contributions_page(str(replica), cursor=encode_cursor({"ts": 1}))
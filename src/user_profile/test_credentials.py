@@ -0,0 +1,84 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from social_django.models import UserSocialAuth
+
+from user_profile import api_views
+from user_profile.credentials import CREDENTIALS_SESSION_KEY
+from user_profile.pipeline import forget_session_credentials
+
+USERINFO = {"id": 7, "name": "Example", "groups": ["user"], "rights_count": 3}
+
+
+@pytest.fixture
+def mediawiki_client(db, monkeypatch):
+    """A logged-in client whose user has MediaWiki OAuth tokens."""
+    cache.clear()
+    monkeypatch.setattr(api_views, "get_userinfo", lambda *args, **kwargs: USERINFO)
+    user = User.objects.create_user(username="testuser", password="testpass123")
+    UserSocialAuth.objects.create(
+        user=user,
+        provider="mediawiki",
+        uid="7",
+        extra_data={"access_token": {"oauth_token": "key", "oauth_token_secret": "s"}},
+    )
+    client = Client()
+    client.login(username="testuser", password="testpass123")
+    return client
+
+
+@pytest.mark.django_db
+class TestResolveCredentials:
+    """Tests for the session-cached credentials and user."""
+
+    def test_steady_state_runs_no_default_queries(
+        self, mediawiki_client, django_assert_num_queries
+    ):
+        """Test that a repeat API request does not touch the default database."""
+        mediawiki_client.get(reverse("api-user"))
+
+        with django_assert_num_queries(0, connection=connection):
+            response = mediawiki_client.get(reverse("api-user"))
+        assert response.status_code == 200
+        assert response.json()["mw_username"] == "Example"
+
+    def test_username_is_not_written_on_get(self, mediawiki_client):
+        """Test that the username from userinfo only goes into the session."""
+        mediawiki_client.get(reverse("api-user"))
+
+        social_auth = UserSocialAuth.objects.get()
+        assert "username" not in social_auth.extra_data
+        stored = mediawiki_client.session[CREDENTIALS_SESSION_KEY]
+        assert stored == ["Example", "key", "s"]
+
+    def test_saving_user_drops_cached_user(self, mediawiki_client):
+        """Test that a changed user is not served from the cache."""
+        mediawiki_client.get(reverse("api-user"))
+        user = User.objects.get()
+        user.username = "renamed"
+        user.save()
+
+        response = mediawiki_client.get(reverse("api-user"))
+        assert response.json()["username"] == "renamed"
+
+    def test_password_change_logs_out(self, mediawiki_client):
+        """Test that the cached user still checks the session auth hash."""
+        mediawiki_client.get(reverse("api-user"))
+        user = User.objects.get()
+        user.set_password("changed-password")
+        user.save()
+
+        assert mediawiki_client.get(reverse("api-user")).status_code == 403
+
+    def test_login_pipeline_forgets_credentials(self, mediawiki_client):
+        """Test that logging in again drops the stored credentials."""
+        mediawiki_client.get(reverse("api-user"))
+        session = mediawiki_client.session
+        backend = type("Backend", (), {"name": "mediawiki"})()
+        strategy = type("Strategy", (), {"session_pop": session.pop})()
+
+        forget_session_credentials(strategy, backend)
+        assert CREDENTIALS_SESSION_KEY not in session
@@ -0,0 +1,74 @@
+import pytest
+from django.core.cache import cache
+from django.test import RequestFactory
+from django.urls import reverse
+
+from user_profile import api_views
+from user_profile.http_caching import etag_matches, make_etag
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def test_etag_matching():
+    """Test weak comparison, lists and the wildcard in If-None-Match."""
+    etag = make_etag("search", "foo", [(1, 0, b"Foo", False, 10)])
+    assert etag.startswith('W/"')
+    assert etag != make_etag("search", "foo", [(2, 0, b"Foo", False, 10)])
+
+    factory = RequestFactory()
+    opaque = etag.removeprefix("W/")
+    assert etag_matches(factory.get("/", HTTP_IF_NONE_MATCH=etag), etag)
+    assert etag_matches(factory.get("/", HTTP_IF_NONE_MATCH=f'"x", {opaque}'), etag)
+    assert etag_matches(factory.get("/", HTTP_IF_NONE_MATCH="*"), etag)
+    assert not etag_matches(factory.get("/", HTTP_IF_NONE_MATCH='"x"'), etag)
+    assert not etag_matches(factory.get("/"), etag)
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    """Tests for ETag revalidation of the search and stats APIs."""
+
+    def test_stats_not_modified(self, authenticated_client):
+        """Test that stats are private and revalidate to an empty 304."""
+        response = authenticated_client.get(reverse("api-stats"))
+        assert "private" in response["Cache-Control"]
+        etag = response["ETag"]
+
+        response = authenticated_client.get(
+            reverse("api-stats"), HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response["ETag"] == etag
+
+    def test_search_not_modified(self, authenticated_client, monkeypatch):
+        """Test that unchanged search results give 304 without serializing."""
+        rows = [(1, 0, b"Foo", False, 10)]
+        monkeypatch.setattr(api_views, "replica_available", lambda: True)
+        monkeypatch.setattr(api_views, "search_page", lambda *a, **kw: (rows, None))
+        url = reverse("api-search") + "?q=foo"
+
+        response = authenticated_client.get(url)
+        assert response.status_code == 200
+        assert "public" in response["Cache-Control"]
+        assert "max-age=60" in response["Cache-Control"]
+        assert "Accept" in response["Vary"]
+        etag = response["ETag"]
+
+        def fail(rows):
+            raise AssertionError("serialized a 304 response")
+
+        monkeypatch.setattr(api_views, "search_results_data", fail)
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        rows.append((2, 0, b"Foobar", False, 20))
+        monkeypatch.undo()
+        monkeypatch.setattr(api_views, "replica_available", lambda: True)
+        monkeypatch.setattr(api_views, "search_page", lambda *a, **kw: (rows, None))
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
@@ -0,0 +1,39 @@
+import pytest
+
+from user_profile.lookup import lookup_pages
+from user_profile.models import WikiPage
+
+
+@pytest.mark.django_db
+class TestLookupPages:
+    """Tests for the bulk page lookup."""
+
+    def test_resolves_titles_and_ids(self, fixture_replica, django_assert_num_queries):
+        """Test that titles and ids are resolved with one query per group."""
+        articles = list(WikiPage.objects.filter(page_namespace=0)[:2])
+        categories = list(WikiPage.objects.filter(page_namespace=14)[:2])
+        others = list(WikiPage.objects.filter(page_namespace=1)[:2])
+        titles = [page.full_title for page in articles] + [
+            f"Category:{page.full_title}" for page in categories
+        ]
+
+        with django_assert_num_queries(3):
+            rows, missing, invalid = lookup_pages(
+                titles + ["No such page", "  "],
+                [others[0].page_id, others[1].page_id, 10**9],
+            )
+
+        expected = articles + categories + others
+        assert [row[0] for row in rows] == [page.page_id for page in expected]
+        assert missing == ["No such page", 10**9]
+        assert invalid == ["  "]
+
+    def test_duplicates_are_returned_once(self, fixture_replica):
+        """Test that a page asked for twice appears once."""
+        page = WikiPage.objects.filter(page_namespace=0).first()
+        rows, missing, invalid = lookup_pages(
+            [page.full_title, page.full_title[0].lower() + page.full_title[1:]],
+            [page.page_id],
+        )
+        assert [row[0] for row in rows] == [page.page_id]
+        assert not missing and not invalid
@@ -0,0 +1,119 @@
+import pytest
+from django.core.cache import cache
+
+from user_profile import mediawiki
+from user_profile.mediawiki import SitePool
+from user_profile.pipeline import invalidate_cached_userinfo
+
+
+class FakeConnection:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSite:
+    def __init__(self, key):
+        self.key = key
+        self.connection = FakeConnection()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls the time seen by the pool."""
+    now = [100.0]
+    monkeypatch.setattr("user_profile.mediawiki.time.monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = SitePool(max_size=2, idle_timeout=60)
+    monkeypatch.setattr(pool, "create_site", lambda key, secret: FakeSite(key))
+    return pool
+
+
+class TestSitePool:
+    """Tests for the mwclient site pool."""
+
+    def test_reuses_site_for_same_token(self, pool, clock):
+        """Test that the same token gets the same site back."""
+        assert pool.get("a", "s") is pool.get("a", "s")
+        assert pool.get("a", "s") is not pool.get("a", "other-secret")
+
+    def test_evicts_least_recently_used(self, pool, clock):
+        """Test LRU eviction once the pool is full."""
+        first = pool.get("a", "s")
+        second = pool.get("b", "s")
+        pool.get("a", "s")
+        pool.get("c", "s")
+        assert len(pool) == 2
+        assert second.connection.closed
+        assert pool.get("a", "s") is first
+
+    def test_idle_sites_are_replaced(self, pool, clock):
+        """Test that sites idle past the timeout are closed and recreated."""
+        first = pool.get("a", "s")
+        clock[0] += 61
+        assert pool.get("a", "s") is not first
+        assert first.connection.closed
+
+    def test_discard(self, pool, clock):
+        """Test that a discarded site is closed."""
+        first = pool.get("a", "s")
+        pool.discard("a", "s")
+        assert first.connection.closed
+        assert len(pool) == 0
+
+
+class FakeUserinfoSite:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, action, **kwargs):
+        self.calls += 1
+        return {
+            "query": {
+                "userinfo": {
+                    "id": 5,
+                    "name": "Example",
+                    "groups": ["user"],
+                    "rights": ["read", "edit"],
+                }
+            }
+        }
+
+
+class TestUserinfoCache:
+    """Tests for the cached MediaWiki userinfo."""
+
+    @pytest.fixture
+    def site(self, monkeypatch):
+        cache.clear()
+        site = FakeUserinfoSite()
+        monkeypatch.setattr(mediawiki, "get_site", lambda key, secret: site)
+        return site
+
+    def test_stores_rights_count_only(self, site):
+        """Test that only the number of rights is cached."""
+        user_info = mediawiki.get_userinfo(1, "key", "secret")
+        assert user_info["rights_count"] == 2
+        assert "rights" not in user_info
+
+    def test_cached_until_refresh(self, site):
+        """Test that the API is only called again on refresh."""
+        mediawiki.get_userinfo(1, "key", "secret")
+        mediawiki.get_userinfo(1, "key", "secret")
+        assert site.calls == 1
+        mediawiki.get_userinfo(1, "key", "secret", refresh=True)
+        assert site.calls == 2
+
+    def test_login_pipeline_invalidates(self, site):
+        """Test that the login pipeline step drops the cached userinfo."""
+        mediawiki.get_userinfo(1, "key", "secret")
+        backend = type("Backend", (), {"name": "mediawiki"})()
+        user = type("User", (), {"pk": 1})()
+        invalidate_cached_userinfo(backend, user=user)
+        mediawiki.get_userinfo(1, "key", "secret")
+        assert site.calls == 2
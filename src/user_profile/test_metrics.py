@@ -0,0 +1,88 @@
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.test import Client
+
+from user_profile.metrics import Registry, registry
+
+
+def test_counter_and_histogram_render():
+    """Test the text exposition of counters and histograms."""
+    reg = Registry()
+    hits = reg.counter("hits_total", "Hits.", ["cache"])
+    latency = reg.histogram("latency_seconds", "Latency.", ["view"], buckets=(0.1, 1))
+    hits.inc(cache="stats")
+    hits.inc(2, cache="stats")
+    latency.observe(0.05, view="a")
+    latency.observe(0.5, view="a")
+
+    text = reg.render(reg.collect())
+    assert "# TYPE hits_total counter" in text
+    assert 'hits_total{cache="stats"} 3' in text
+    assert 'latency_seconds_bucket{view="a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{view="a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{view="a",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{view="a"} 2' in text
+
+
+def test_collect_adds_up_process_files(tmp_path):
+    """Test that values written by other worker processes are summed."""
+    worker = Registry()
+    worker.counter("hits_total", "Hits.").inc(2)
+    worker.histogram("latency_seconds", "Latency.", buckets=(1,)).observe(0.5)
+    # As flushed by a worker with another pid.
+    (tmp_path / "12345.json").write_text(json.dumps(worker.snapshot()))
+
+    scraper = Registry()
+    scraper.counter("hits_total", "Hits.").inc()
+    scraper.histogram("latency_seconds", "Latency.", buckets=(1,)).observe(2)
+
+    values = scraper.collect(tmp_path)
+    assert values["hits_total"]["[]"] == 3
+    assert values["latency_seconds"]["[]"]["count"] == 2
+    assert values["latency_seconds"]["[]"]["buckets"] == [1]
+
+
+def test_label_values_are_escaped():
+    """Test that quotes and backslashes in label values are escaped."""
+    reg = Registry()
+    reg.counter("errors_total", "Errors.", ["error"]).inc(error='a"b\\c')
+    assert 'errors_total{error="a\\"b\\\\c"} 1' in reg.render(reg.collect())
+
+
+@pytest.mark.django_db
+class TestMetricsView:
+    """Tests for the /metrics endpoint."""
+
+    def test_reports_request_latency_by_url_name(self):
+        """Test that requests are recorded under their URL name."""
+        User.objects.create_user(username="testuser", password="testpass123")
+        client = Client()
+        client.login(username="testuser", password="testpass123")
+        client.get("/en/api/user/")
+
+        response = Client().get("/metrics")
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain")
+        body = response.content.decode()
+        assert 'http_request_duration_seconds_count{url_name="api-user"' in body
+        assert "# TYPE cache_requests_total counter" in body
+
+    def test_token_required_when_configured(self, settings):
+        """Test that METRICS_TOKEN restricts access."""
+        settings.METRICS_TOKEN = "secret"
+        assert Client().get("/metrics").status_code == 403
+        response = Client().get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        assert response.status_code == 200
+
+
+def test_global_registry_has_app_metrics():
+    """Test that the app's metrics are registered."""
+    assert {
+        "http_request_duration_seconds",
+        "wiki_replica_query_duration_seconds",
+        "mediawiki_request_duration_seconds",
+        "mediawiki_request_errors_total",
+        "cache_requests_total",
+    } <= set(registry.metrics)
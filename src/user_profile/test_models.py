@@ -1,4 +1,4 @@
-from user_profile.models import WikiActor, WikiPage, WikiRevision
+from user_profile.models import WikiActor, WikiPage, WikiRevision, parse_full_title
 
 
 class TestWikiPage:
@@ -50,6 +50,36 @@ class TestWikiPage:
         assert page.url == "https://en.wikipedia.org/wiki/File:Example.jpg"
 
 
+class TestParseFullTitle:
+    """Tests for parsing displayed titles back into replica keys."""
+
+    def test_main_namespace(self):
+        """Test that spaces become underscores and the first letter is upper."""
+        assert parse_full_title(" python  (programming language) ") == (
+            0,
+            "Python_(programming_language)",
+        )
+
+    def test_namespace_prefix(self):
+        """Test that known prefixes select the namespace, in any case."""
+        assert parse_full_title("category:python_stubs") == (14, "Python_stubs")
+        assert parse_full_title("File: Example.jpg") == (6, "Example.jpg")
+
+    def test_unknown_prefix_stays_in_title(self):
+        """Test that colons without a known namespace belong to the title."""
+        assert parse_full_title("Star Wars: Episode I") == (0, "Star_Wars:_Episode_I")
+
+    def test_leading_colon_is_dropped(self):
+        """Test that link-style titles still have their namespace parsed."""
+        assert parse_full_title(":Category:Foo") == (14, "Foo")
+        assert parse_full_title(":foo") == (0, "Foo")
+
+    def test_empty_title(self):
+        """Test that titles with nothing left are rejected."""
+        assert parse_full_title(" _ ") is None
+        assert parse_full_title("Category:") is None
+
+
 class TestWikiRevision:
     """Tests for WikiRevision model."""
 
@@ -0,0 +1,107 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from user_profile import namespaces
+from user_profile.namespaces import (
+    NamespaceRegistry,
+    get_registry,
+    normalize_username,
+    parse_namespace,
+    read_siteinfo,
+    save_siteinfo,
+)
+
+SITEINFO = {
+    "general": {"server": "https://wiki.example", "articlepath": "/view/$1"},
+    "namespaces": {
+        "0": {"id": 0, "name": "", "case": "first-letter"},
+        "4": {"id": 4, "name": "Example", "canonical": "Project"},
+        "3000": {"id": 3000, "name": "lowercase", "case": "case-sensitive"},
+    },
+    "namespacealiases": [{"id": 4, "alias": "EX"}],
+    "interwikimap": [{"prefix": "wikt", "url": "https://wikt.example/$1"}],
+}
+
+
+@pytest.fixture
+def registry(settings, tmp_path):
+    """Loads the registry from a saved siteinfo file."""
+    path = tmp_path / "siteinfo.json"
+    save_siteinfo(SITEINFO, path)
+    settings.SITEINFO_CACHE_PATH = str(path)
+    namespaces.reset_registry()
+    yield get_registry()
+    namespaces.reset_registry()
+
+
+class TestNamespaceRegistry:
+    """Tests for the namespace registry built from siteinfo."""
+
+    def test_bundled_snapshot(self):
+        """Test that the enwiki snapshot is used without a saved file."""
+        registry = get_registry()
+        assert registry.page_url(14, "Stubs") == (
+            "https://en.wikipedia.org/wiki/Category:Stubs"
+        )
+        assert registry.names[5] == "Wikipedia talk"
+        assert registry.namespace_id("image") == 6
+
+    def test_loads_saved_siteinfo(self, registry):
+        """Test that the saved siteinfo replaces the snapshot."""
+        assert (
+            registry.page_url(4, "About") == "https://wiki.example/view/Example:About"
+        )
+        assert registry.namespace_id("project") == 4
+        assert registry.namespace_id("ex") == 4
+
+    def test_unreadable_file_falls_back(self, settings, tmp_path):
+        """Test that a broken saved file does not stop the app."""
+        path = tmp_path / "siteinfo.json"
+        path.write_text("{")
+        settings.SITEINFO_CACHE_PATH = str(path)
+        registry = namespaces.load_registry()
+        assert registry.article_url == "https://en.wikipedia.org/wiki/"
+
+    def test_parse_title_respects_case(self, registry):
+        """Test that case-sensitive namespaces keep the first letter."""
+        assert registry.parse_title("lowercase:foo") == (3000, "foo")
+        assert registry.parse_title("ex:foo bar") == (4, "Foo_bar")
+
+    def test_interwiki_titles_are_not_local(self, registry):
+        """Test that interwiki links do not resolve to local pages."""
+        assert registry.parse_title("wikt:foo") is None
+
+    def test_normalize_username(self):
+        """Test that usernames get spaces and an upper-case first letter."""
+        assert normalize_username(" example_user ") == "Example user"
+        assert normalize_username("ßtraße") == "ßtraße"
+        assert normalize_username("") == ""
+
+    def test_parse_namespace(self):
+        """Test that query parameters accept numbers and names."""
+        assert parse_namespace("14") == 14
+        assert parse_namespace("Category_talk") == 15
+        assert parse_namespace("Nonsense") == 0
+        assert parse_namespace(None, default=6) == 6
+
+
+def test_save_siteinfo_roundtrip(tmp_path):
+    """Test that saved siteinfo can be read back."""
+    path = tmp_path / "cache" / "siteinfo.json"
+    save_siteinfo(SITEINFO, path)
+    assert read_siteinfo(path) == json.loads(json.dumps(SITEINFO))
+    assert [p.name for p in path.parent.iterdir()] == ["siteinfo.json"]
+
+
+def test_refresh_siteinfo_command(monkeypatch, tmp_path):
+    """Test that the command saves the fetched siteinfo."""
+    path = tmp_path / "siteinfo.json"
+    monkeypatch.setattr(
+        "user_profile.management.commands.refresh_siteinfo.fetch_siteinfo",
+        lambda: SITEINFO,
+    )
+    call_command("refresh_siteinfo", path=str(path), stdout=StringIO())
+    assert NamespaceRegistry(read_siteinfo(path)).names[4] == "Example"
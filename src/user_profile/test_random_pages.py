@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from user_profile.models import WikiPage
+from user_profile.random_pages import sample_pages
+
+
+class FixedRandom(random.Random):
+    """``random.Random`` whose ``random()`` always returns ``value``."""
+
+    # Keeps shuffle() off random(), which would never return below 1.0.
+    getrandbits = random.Random.getrandbits
+
+    def __init__(self, value):
+        super().__init__(0)
+        self.value = value
+
+    def random(self):
+        return self.value
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("fixture_replica", [{"pages": 300}], indirect=True)
+class TestSamplePages:
+    """Tests for sampling through the page_random index."""
+
+    def test_returns_distinct_articles(self, fixture_replica):
+        """Test that the sample holds distinct non-redirect main pages."""
+        rows = sample_pages(20, rng=random.Random(1))
+        page_ids = [row[0] for row in rows]
+        assert len(rows) == 20
+        assert len(set(page_ids)) == 20
+        assert all(row[1] == 0 and not row[3] for row in rows)
+
+    def test_wraps_around_end_of_index(self, fixture_replica):
+        """Test that a seek past the last page continues from the first."""
+        first = (
+            WikiPage.objects.filter(page_namespace=0, page_is_redirect=False)
+            .order_by("page_random")
+            .values_list("page_id", flat=True)[:3]
+        )
+        rows = sample_pages(3, run_length=3, max_rounds=1, rng=FixedRandom(1.0))
+        assert {row[0] for row in rows} == set(first)
+
+    def test_small_namespace_is_exhausted(self, fixture_replica):
+        """Test that a namespace smaller than the sample is returned whole."""
+        namespace = (
+            WikiPage.objects.values_list("page_namespace", flat=True)
+            .exclude(page_namespace=0)
+            .order_by("page_namespace")
+            .first()
+        )
+        expected = set(
+            WikiPage.objects.filter(
+                page_namespace=namespace, page_is_redirect=False
+            ).values_list("page_id", flat=True)
+        )
+        count = len(expected) + 10
+        rows = sample_pages(
+            count, namespace=namespace, run_length=count, rng=random.Random(2)
+        )
+        assert len(rows) == len(expected)
+        assert {row[0] for row in rows} == expected
+
+    def test_queries_per_round(self, fixture_replica, django_assert_num_queries):
+        """Test that a round costs one seek per run without UNION support."""
+        with django_assert_num_queries(4):
+            sample_pages(20, run_length=5, max_rounds=1, rng=FixedRandom(0.0))
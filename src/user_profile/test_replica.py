@@ -0,0 +1,185 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection
+
+from user_profile.models import UserEditCount, WikiActor, WikiPage
+from user_profile.replica import (
+    QueryTimeoutGuard,
+    ReplicaQueryTimeout,
+    ReplicaSet,
+    WikiReplicaRouter,
+    bulk_alias,
+    configure_replica_connection,
+    is_timeout_error,
+)
+from user_profile.stats import count_revisions, find_actor_id, get_edit_counts
+
+SLOW_QUERY = """
+    WITH RECURSIVE counter(n) AS (
+        SELECT 1 UNION ALL SELECT n + 1 FROM counter WHERE n < 100000000
+    )
+    SELECT count(*) FROM counter
+"""
+
+
+@pytest.mark.django_db
+class TestQueryTimeoutGuard:
+    """Tests for the replica query timeout guard, run against SQLite."""
+
+    def test_slow_query_is_interrupted(self):
+        """Test that a query past the deadline raises ReplicaQueryTimeout."""
+        with connection.execute_wrapper(QueryTimeoutGuard(0.05)):
+            with pytest.raises(ReplicaQueryTimeout):
+                with connection.cursor() as cursor:
+                    cursor.execute(SLOW_QUERY)
+
+    def test_fast_query_is_untouched(self):
+        """Test that queries within the deadline run normally."""
+        with connection.execute_wrapper(QueryTimeoutGuard(5)):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                assert cursor.fetchone() == (1,)
+
+        # The progress handler is removed again afterwards.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "WITH RECURSIVE c(n) AS (SELECT 1 UNION ALL "
+                "SELECT n + 1 FROM c WHERE n < 10000) SELECT count(*) FROM c"
+            )
+            assert cursor.fetchone() == (10000,)
+
+    def test_other_errors_pass_through(self):
+        """Test that unrelated database errors are not remapped."""
+        with connection.execute_wrapper(QueryTimeoutGuard(5)):
+            with pytest.raises(OperationalError) as excinfo:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT * FROM missing_table")
+        assert not isinstance(excinfo.value, ReplicaQueryTimeout)
+
+
+def test_timeout_error_codes():
+    """Test that MySQL and MariaDB timeout codes are recognised."""
+    assert is_timeout_error(OperationalError(3024, "maximum statement time"))
+    assert is_timeout_error(OperationalError(1969, "max_statement_time"))
+    assert not is_timeout_error(OperationalError(2006, "server has gone away"))
+
+
+@pytest.mark.django_db
+def test_default_connection_is_not_guarded():
+    """Test that only replica aliases get the guard."""
+    configure_replica_connection(sender=None, connection=connection)
+    assert not any(
+        isinstance(wrapper, QueryTimeoutGuard)
+        for wrapper in connection.execute_wrappers
+    )
+
+
+class TestReplicaSet:
+    """Tests for replica selection and failover."""
+
+    def test_balances_across_aliases(self, monkeypatch):
+        """Test that reads are spread over every healthy alias."""
+        replicas = ReplicaSet(["a", "b"], probe_interval=3600)
+        monkeypatch.setattr(replicas, "_probe", lambda alias: True)
+        assert {replicas.choose() for _ in range(100)} == {"a", "b"}
+
+    def test_skips_alias_marked_down(self, monkeypatch):
+        """Test that a failed replica leaves the rotation."""
+        replicas = ReplicaSet(["a", "b"], down_seconds=60)
+        monkeypatch.setattr(replicas, "_probe", lambda alias: True)
+        replicas.mark_down("a", "connection refused")
+        assert {replicas.choose() for _ in range(20)} == {"b"}
+
+    def test_falls_back_when_all_down(self, monkeypatch):
+        """Test that all aliases are retried once every one is down."""
+        replicas = ReplicaSet(["a", "b"], down_seconds=60)
+        monkeypatch.setattr(replicas, "_probe", lambda alias: True)
+        replicas.mark_down("a")
+        replicas.mark_down("b")
+        assert replicas.choose() in {"a", "b"}
+
+    def test_no_aliases(self):
+        """Test that nothing is chosen without replicas."""
+        assert ReplicaSet([]).choose() is None
+
+
+class TestWikiReplicaRouter:
+    """Tests for the replica database router."""
+
+    def test_routes_replica_models(self, monkeypatch):
+        """Test that only the MediaWiki models go to a replica."""
+        monkeypatch.setattr(
+            "user_profile.replica.get_replica_set",
+            lambda: ReplicaSet(["wiki_replica"]),
+        )
+        router = WikiReplicaRouter()
+        assert router.db_for_read(WikiPage) == "wiki_replica"
+        assert router.db_for_read(WikiActor) == "wiki_replica"
+        assert router.db_for_read(UserEditCount) is None
+
+    def test_bulk_alias(self, monkeypatch, settings):
+        """Test that bulk reads are pinned to a configured replica only."""
+        settings.WIKI_REPLICA_BULK_ALIAS = "wiki_replica"
+        monkeypatch.setattr(
+            "user_profile.replica.replica_aliases",
+            lambda: ["wiki_replica", "wiki_replica_web"],
+        )
+        assert bulk_alias() == "wiki_replica"
+        monkeypatch.setattr("user_profile.replica.replica_aliases", lambda: [])
+        assert bulk_alias() is None
+
+    def test_never_migrates_replica_models(self):
+        """Test that migrations skip the unmanaged replica models."""
+        router = WikiReplicaRouter()
+        assert router.allow_migrate("default", "user_profile", "wikipage") is False
+        assert router.allow_migrate("default", "user_profile", "usereditcount") is None
+
+
+@pytest.mark.django_db
+class TestCreateFixtureReplica:
+    """Tests for the create_fixture_replica management command."""
+
+    def create(self, **options):
+        call_command(
+            "create_fixture_replica",
+            database="default",
+            pages=50,
+            actors=5,
+            revisions=200,
+            batch_size=30,
+            stdout=StringIO(),
+            **options,
+        )
+
+    def test_creates_synthetic_rows(self):
+        """Test that the tables are filled and work with the replica queries."""
+        self.create()
+
+        assert WikiPage.objects.count() == 50
+        assert WikiActor.objects.count() == 5
+        actor = WikiActor.objects.get(actor_id=1)
+        assert find_actor_id(actor.actor_name) == 1
+        assert count_revisions(1)["count"] > 0
+        assert (
+            sum(
+                get_edit_counts(
+                    [a.actor_name for a in WikiActor.objects.all()]
+                ).values()
+            )
+            == 200
+        )
+
+        indexes = connection.introspection.get_constraints(connection.cursor(), "page")
+        assert indexes["page_name_title"]["unique"]
+        assert indexes["page_random"]["columns"] == ["page_random"]
+
+    def test_refuses_to_replace_tables_without_force(self):
+        """Test that existing tables are only replaced with --force."""
+        self.create()
+        with pytest.raises(CommandError):
+            self.create()
+        self.create(force=True, seed=1)
+        assert WikiPage.objects.count() == 50
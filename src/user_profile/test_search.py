@@ -0,0 +1,229 @@
+import pytest
+
+from user_profile import search
+from user_profile.models import WikiPage
+from user_profile.pagination import InvalidCursor, decode_cursor, encode_cursor
+from user_profile.search import (
+    InvalidSearchMode,
+    TitleIndex,
+    normalize_search_term,
+    prefix_upper_bound,
+    search_pages,
+)
+
+
+class TestPrefixUpperBound:
+    """Tests for prefix range bounds."""
+
+    def test_increments_last_character(self):
+        """Test that the bound is the prefix with its last character bumped."""
+        assert prefix_upper_bound("Pyth") == "Pyti"
+
+    def test_skips_surrogates(self):
+        """Test that the bound never lands in the surrogate range."""
+        assert prefix_upper_bound("a\ud7ff") == "a\ue000"
+
+    def test_drops_maximal_characters(self):
+        """Test that trailing maximal code points are dropped."""
+        assert prefix_upper_bound("a\U0010ffff") == "b"
+        assert prefix_upper_bound("\U0010ffff") is None
+
+
+class TestNormalizeSearchTerm:
+    """Tests for search term normalisation."""
+
+    def test_spaces_become_underscores(self):
+        """Test that spaces are converted to underscores."""
+        assert normalize_search_term(" New York ") == "New_York"
+
+    def test_prefix_capitalises_first_letter(self):
+        """Test that prefix mode upper-cases the first letter only."""
+        assert normalize_search_term("python lang", "prefix") == "Python_lang"
+        assert normalize_search_term("python", "substring") == "python"
+
+
+class TestTitleIndex:
+    """Tests for the local title index."""
+
+    @pytest.fixture
+    def index(self, tmp_path):
+        index = TitleIndex(tmp_path / "titles.sqlite3")
+        index.build(
+            [
+                (1, 0, b"Python_(programming_language)", False),
+                (2, 0, "Monty_Python", False),
+                (3, 0, "Python", True),
+                (4, 14, "Python_stubs", False),
+                (5, 0, "Pythagoras", False),
+            ]
+        )
+        return index
+
+    def test_build_replaces_file(self, index):
+        """Test that building leaves no temporary file behind."""
+        assert index.exists()
+        assert index.build([(1, 0, "A", False)]) == 1
+        assert index.substring(0, "A", exclude_redirects=False) == [1]
+
+    def test_substring_is_ordered_and_case_sensitive(self, index):
+        """Test substring matches within a namespace ordered by title."""
+        assert index.substring(0, "Python", exclude_redirects=False) == [2, 3, 1]
+        assert index.substring(0, "Python") == [2, 1]
+        assert index.substring(0, "python") == []
+
+    def test_short_terms(self, index):
+        """Test that terms shorter than a trigram still match."""
+        assert index.substring(0, "th", limit=2) == [2, 5]
+
+    def test_records_metadata(self, index, tmp_path):
+        """Test that the covered namespaces and build time are stored."""
+        metadata = index.metadata()
+        assert metadata["namespaces"] == {0, 14}
+        assert metadata["built_at"]
+        assert not index.covers(4)
+
+        other = TitleIndex(tmp_path / "other.sqlite3")
+        other.build([(1, 0, "A", False)], namespaces=[0, 4])
+        assert other.covers(4)
+
+    def test_fuzzy_ranks_closest_match_first(self, index):
+        """Test that fuzzy search ranks by shared trigrams."""
+        results = index.fuzzy(0, "Pythn_programming")
+        assert results[0] == 1
+        assert 4 not in results
+
+
+@pytest.mark.django_db
+class TestSearchPagesWithIndex:
+    """Tests for searching with a local title index configured."""
+
+    def test_uncovered_namespace_uses_replica(
+        self, fixture_replica, settings, tmp_path
+    ):
+        """Test that namespaces missing from the index are searched with LIKE."""
+        page = WikiPage.objects.exclude(page_namespace=0).first()
+        title = page.page_title
+        if isinstance(title, bytes):
+            title = title.decode("utf-8")
+        term = title[1:4]
+        settings.WIKI_TITLE_INDEX_PATH = None
+        expected = search_pages(term, page.page_namespace, exclude_redirects=False)
+        assert expected
+
+        settings.WIKI_TITLE_INDEX_PATH = str(tmp_path / "titles.sqlite3")
+        TitleIndex(settings.WIKI_TITLE_INDEX_PATH).build(
+            WikiPage.objects.filter(page_namespace=0).values_list(
+                "page_id", "page_namespace", "page_title", "page_is_redirect"
+            ),
+            namespaces=[0],
+        )
+        assert (
+            search_pages(term, page.page_namespace, exclude_redirects=False) == expected
+        )
+
+    def test_like_scans_use_bulk_replica(self, fixture_replica, monkeypatch):
+        """Test that LIKE scans go to the bulk replica and prefix ones do not."""
+        calls = []
+
+        def bulk_alias():
+            calls.append("default")
+            return "default"
+
+        monkeypatch.setattr(search, "bulk_alias", bulk_alias)
+        search_pages("a", mode="prefix")
+        assert calls == []
+        search_pages("a", mode="substring")
+        assert calls == ["default"]
+
+
+def test_search_pages_rejects_unknown_mode():
+    """Test that an unknown mode raises before any query runs."""
+    with pytest.raises(InvalidSearchMode):
+        search_pages("test", mode="regex")
+
+
+class TestSearchPage:
+    """Tests for keyset-paginated search."""
+
+    @pytest.fixture
+    def titles(self, monkeypatch):
+        titles = ["Alpha", "Beta", "Gamma", "Delta_(letter)", "Epsilon"]
+
+        def fake_search_pages(search_query, limit=10, mode="substring", after=None):
+            matches = sorted(t for t in titles if after is None or t > after)
+            return [WikiPage(page_id=i, page_title=t) for i, t in enumerate(matches)][
+                :limit
+            ]
+
+        monkeypatch.setattr(search, "search_pages", fake_search_pages)
+        return titles
+
+    def test_pages_through_all_results(self, titles):
+        """Test that following next cursors visits every title once."""
+        seen, cursor = [], None
+        while True:
+            pages, cursor = search.search_page("a", cursor=cursor, limit=2)
+            seen.extend(page.page_title for page in pages)
+            if cursor is None:
+                break
+        assert seen == sorted(titles)
+
+    def test_last_page_has_no_cursor(self, titles):
+        """Test that an exactly full last page has no next cursor."""
+        pages, cursor = search.search_page("a", limit=5)
+        assert len(pages) == 5
+        assert cursor is None
+
+    def test_fuzzy_is_single_page(self, titles):
+        """Test that fuzzy results are never paged."""
+        _, cursor = search.search_page("a", limit=2, mode="fuzzy")
+        assert cursor is None
+
+    def test_invalid_cursor(self, titles):
+        """Test that malformed cursors are rejected."""
+        with pytest.raises(InvalidCursor):
+            search.search_page("a", cursor="not-a-cursor")
+        with pytest.raises(InvalidCursor):
+            search.search_page("a", cursor=encode_cursor(["Alpha"]))
+
+
+def test_cursor_round_trip():
+    """Test that cursors decode to the key they were made from."""
+    key = {"title": "Ünïcode_title"}
+    assert decode_cursor(encode_cursor(key)) == key
+
+
+class TestIterSearchRows:
+    """Tests for the chunked export iterator."""
+
+    @pytest.fixture
+    def queries(self, monkeypatch):
+        titles = [f"Title_{i:03d}" for i in range(25)]
+        queries = []
+
+        def fake_search_pages(search_query, limit=10, after=None, values=False, **kw):
+            queries.append((after, limit))
+            matches = [t for t in titles if after is None or t > after]
+            return [(i, 0, t.encode(), False, 10) for i, t in enumerate(matches)][
+                :limit
+            ]
+
+        monkeypatch.setattr(search, "search_pages", fake_search_pages)
+        return queries
+
+    def test_reads_all_rows_in_chunks(self, queries):
+        """Test that rows are read with one keyset query per chunk."""
+        rows = list(search.iter_search_rows("Title", chunk_size=10))
+        assert len(rows) == 25
+        assert queries == [(None, 10), ("Title_009", 10), ("Title_019", 10)]
+
+    def test_stops_at_max_rows(self, queries):
+        """Test that the export is capped at max_rows."""
+        rows = list(search.iter_search_rows("Title", chunk_size=10, max_rows=15))
+        assert len(rows) == 15
+        assert queries[-1] == ("Title_009", 5)
+
+    def test_rejects_fuzzy(self):
+        """Test that ranked fuzzy results cannot be exported."""
+        with pytest.raises(InvalidSearchMode):
+            next(search.iter_search_rows("Title", mode="fuzzy"))
@@ -0,0 +1,123 @@
+import json
+import logging
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+
+from user_profile import slow_queries
+from user_profile.slow_queries import (
+    ProcessRotatingFileHandler,
+    SlowQueryLog,
+    read_samples,
+    summarize,
+)
+
+
+@pytest.fixture
+def slow_query_records(caplog, monkeypatch):
+    """Capture the slow-query logger instead of writing its file."""
+    slow_logger = logging.getLogger("user_profile.slow_queries")
+    monkeypatch.setattr(slow_logger, "handlers", [caplog.handler])
+    return caplog
+
+
+@pytest.mark.django_db
+class TestSlowQueryLog:
+    """Tests for the slow-query execute wrapper, run against SQLite."""
+
+    def run(self, log, sql, params=()):
+        with connection.execute_wrapper(log), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def test_logs_queries_over_threshold(self, slow_query_records):
+        """Test that slow queries are logged with their parameters."""
+        assert self.run(SlowQueryLog(0), "SELECT %s", [b"abc"]) == [(b"abc",)]
+
+        sample = json.loads(slow_query_records.records[-1].getMessage())
+        assert sample["sql"] == "SELECT %s"
+        assert sample["params"] == ["abc"]
+        assert sample["alias"] == "default"
+        assert "plan" not in sample
+
+    def test_ignores_fast_queries(self, slow_query_records):
+        """Test that queries under the threshold are not logged."""
+        self.run(SlowQueryLog(60), "SELECT 1")
+        assert not slow_query_records.records
+
+    def test_explain_once_per_shape(self, slow_query_records):
+        """Test that the plan is captured once per query shape."""
+        log = SlowQueryLog(0, explain=True, explain_interval=300)
+        sql = "SELECT id FROM auth_user WHERE username = %s"
+        self.run(log, sql, ["a"])
+        self.run(log, sql, ["b"])
+
+        first, second = (json.loads(r.getMessage()) for r in slow_query_records.records)
+        assert first["plan"]
+        assert "plan" not in second
+
+
+def test_process_handler_writes_one_file_per_process(tmp_path, monkeypatch):
+    """Test that a process forked after configuration gets its own file."""
+    monkeypatch.setattr(slow_queries.os, "getpid", lambda: 100)
+    handler = ProcessRotatingFileHandler(tmp_path / "slow.log", encoding="utf-8")
+    record = logging.makeLogRecord({"msg": json.dumps({"sql": "A"})})
+    handler.handle(record)
+    monkeypatch.setattr(slow_queries.os, "getpid", lambda: 200)
+    handler.handle(record)
+    handler.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "slow.100.log",
+        "slow.200.log",
+    ]
+    assert read_samples(str(tmp_path / "slow.log")) == [{"sql": "A"}] * 2
+
+
+def test_summarize_groups_by_sql(tmp_path):
+    """Test that samples are read from every process's rotated files."""
+    lines = [
+        {"time": "1", "sql": "A", "duration_ms": 1500.0},
+        {"time": "2", "sql": "B", "duration_ms": 1200.0},
+    ]
+    (tmp_path / "slow.1.log").write_text(
+        "\n".join(json.dumps(line) for line in lines) + "\nnot json\n"
+    )
+    (tmp_path / "slow.2.log.1").write_text(
+        json.dumps({"time": "0", "sql": "A", "duration_ms": 2500.0}) + "\n"
+    )
+    (tmp_path / "other.1.log").write_text(
+        json.dumps({"time": "0", "sql": "C", "duration_ms": 2500.0}) + "\n"
+    )
+
+    shapes = summarize(read_samples(str(tmp_path / "slow.log")))
+    assert [shape["sql"] for shape in shapes] == ["A", "B"]
+    assert shapes[0]["count"] == 2
+    assert shapes[0]["max_ms"] == 2500.0
+    assert shapes[0]["last"]["time"] == "1"
+
+
+@pytest.mark.django_db
+class TestSlowQueriesView:
+    """Tests for the admin slow-query view."""
+
+    def test_requires_staff(self):
+        """Test that non-staff users are sent to the admin login."""
+        response = Client().get("/en/admin/slow-queries/")
+        assert response.status_code == 302
+
+    def test_lists_samples(self, settings, tmp_path):
+        """Test that staff see the logged query shapes."""
+        (tmp_path / "slow.123.log").write_text(
+            json.dumps({"time": "1", "sql": "SELECT slow", "duration_ms": 1500.0})
+        )
+        settings.SLOW_QUERY_LOG_PATH = str(tmp_path / "slow.log")
+        User.objects.create_user(username="admin", password="pw", is_staff=True)
+        client = Client()
+        client.login(username="admin", password="pw")
+
+        response = client.get("/en/admin/slow-queries/")
+        assert response.status_code == 200
+        assert b"SELECT slow" in response.content
@@ -0,0 +1,159 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from user_profile import stats
+from user_profile.models import NamespaceStats, UserEditCount, WikiRevision
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """Fakes the replica lookups used by the edit count cache."""
+
+    class FakeReplica:
+        def __init__(self):
+            self.actor_id = 7
+            self.revisions = [("20240101000000", 1), ("20240102000000", 2)]
+            self.calls = []
+
+        def find_actor_id(self, mw_username):
+            return self.actor_id
+
+        def count_revisions(self, actor_id, after="", after_id=0):
+            self.calls.append((after, after_id))
+            newer = [rev for rev in self.revisions if rev > (after, after_id)]
+            latest, latest_id = max(newer, default=(None, None))
+            return {"count": len(newer), "latest": latest, "latest_id": latest_id}
+
+    fake = FakeReplica()
+    monkeypatch.setattr(stats, "find_actor_id", fake.find_actor_id)
+    monkeypatch.setattr(stats, "count_revisions", fake.count_revisions)
+    return fake
+
+
+@pytest.mark.django_db
+class TestUserEditCount:
+    """Tests for the incremental edit count cache."""
+
+    def test_first_refresh_counts_everything(self, replica):
+        """Test that the first refresh stores the total and watermark."""
+        assert stats.get_user_edit_count("Example") == 2
+        record = UserEditCount.objects.get(mw_username="Example")
+        assert record.actor_id == 7
+        assert record.max_rev_timestamp == "20240102000000"
+        assert record.max_rev_id == 2
+
+    def test_refresh_only_counts_new_revisions(self, replica):
+        """Test that later refreshes start from the stored watermark."""
+        stats.get_user_edit_count("Example")
+        replica.revisions.append(("20240103000000", 3))
+        assert stats.get_user_edit_count("Example") == 3
+        assert replica.calls[-1] == ("20240102000000", 2)
+
+    def test_refresh_counts_same_second_revisions(self, replica):
+        """Test that revisions in the watermark's second are told apart by id."""
+        stats.get_user_edit_count("Example")
+        replica.revisions.append(("20240102000000", 3))
+        assert stats.get_user_edit_count("Example") == 3
+        assert UserEditCount.objects.get(mw_username="Example").max_rev_id == 3
+
+    def test_full_refresh_recounts(self, replica):
+        """Test that a full refresh replaces the stored total."""
+        stats.get_user_edit_count("Example")
+        replica.revisions.pop(0)
+        assert stats.get_user_edit_count("Example", full=True) == 1
+
+    def test_recounts_after_max_age(self, replica, settings):
+        """Test that an old count is recounted, picking up deleted revisions."""
+        settings.WIKI_EDIT_COUNT_RECOUNT_AGE = 3600
+        stats.get_user_edit_count("Example")
+        replica.revisions.pop(0)
+        assert stats.get_user_edit_count("Example") == 2
+
+        UserEditCount.objects.update(recounted_at=timezone.now() - timedelta(hours=2))
+        assert stats.get_user_edit_count("Example") == 1
+        assert replica.calls[-1] == ("", 0)
+
+    def test_full_refresh_without_revisions(self, replica):
+        """Test that a recount finding no revisions resets the count."""
+        stats.get_user_edit_count("Example")
+        replica.revisions.clear()
+        assert stats.get_user_edit_count("Example", full=True) == 0
+        record = UserEditCount.objects.get(mw_username="Example")
+        assert (record.max_rev_timestamp, record.max_rev_id) == ("", 0)
+
+    def test_unknown_actor(self, replica):
+        """Test that users without an actor row have no edits."""
+        replica.actor_id = None
+        assert stats.get_user_edit_count("Nobody") == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("fixture_replica", [{"revisions": 20}], indirect=True)
+class TestCountRevisions:
+    """Tests for counting revisions after a watermark on the replica."""
+
+    def test_uses_one_replica(self, fixture_replica, monkeypatch):
+        """Test that the count and the watermark come from the same replica."""
+        aliases = []
+
+        def db_for_read(model, **hints):
+            aliases.append("default")
+            return "default"
+
+        actor_id = WikiRevision.objects.values_list("rev_actor", flat=True).first()
+        monkeypatch.setattr(stats.router, "db_for_read", db_for_read)
+        assert stats.count_revisions(actor_id)["count"]
+        assert aliases == ["default"]
+
+    def test_counts_after_watermark(self, fixture_replica):
+        """Test that a same-second revision after the watermark is counted."""
+        newest = WikiRevision.objects.order_by("-rev_timestamp", "-rev_id").first()
+        timestamp = newest.rev_timestamp
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO revision (rev_id, rev_page, rev_comment_id, rev_actor, "
+                "rev_timestamp, rev_minor_edit, rev_deleted, rev_len, "
+                "rev_parent_id, rev_sha1) "
+                "VALUES (%s, %s, 0, %s, %s, 0, 0, 10, 0, '')",
+                [newest.rev_id + 1, newest.rev_page, newest.rev_actor, timestamp],
+            )
+
+        new = stats.count_revisions(
+            newest.rev_actor, after=timestamp, after_id=newest.rev_id
+        )
+        assert new["count"] == 1
+        assert new["latest_id"] == newest.rev_id + 1
+        assert stats.count_revisions(
+            newest.rev_actor, after=timestamp, after_id=newest.rev_id + 1
+        ) == {"count": 0, "latest": None, "latest_id": None}
+
+
+@pytest.mark.django_db
+class TestNamespaceStats:
+    """Tests for the precomputed per-namespace statistics."""
+
+    @pytest.mark.parametrize("fixture_replica", [{"pages": 300}], indirect=True)
+    def test_refresh_matches_page_table(self, fixture_replica):
+        """Test that the chunked scan agrees with whole-table aggregates."""
+        NamespaceStats.objects.create(namespace=99, refreshed_at=timezone.now())
+
+        stats.refresh_namespace_stats(chunk_size=70)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT page_namespace, COUNT(*), SUM(page_is_redirect), "
+                "SUM(CASE WHEN page_is_redirect = 0 THEN page_len END) "
+                "FROM page GROUP BY page_namespace"
+            )
+            expected = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        rows = {ns.namespace: ns for ns in NamespaceStats.objects.all()}
+        assert set(rows) == set(expected)
+        for namespace, (pages, redirects, total_len) in expected.items():
+            row = rows[namespace]
+            assert (row.page_count, row.redirect_count) == (pages, redirects)
+            assert row.total_len == (total_len or 0)
+            assert sum(row.len_histogram) == row.content_count
@@ -0,0 +1,89 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from user_profile.throttling import TokenBucket
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class TestTokenBucket:
+    """Tests for the token bucket."""
+
+    def test_burst_then_refill(self):
+        """Test that a full bucket allows a burst and then refills at the rate."""
+        bucket = TokenBucket("test-bucket", rate=2, burst=3)
+        assert [bucket.take(now=100) for _ in range(3)] == [0, 0, 0]
+        assert bucket.take(now=100) == pytest.approx(0.5)
+        assert bucket.take(now=100.5) == 0
+        assert bucket.take(now=100.5) > 0
+
+    def test_refill_is_capped_at_burst(self):
+        """Test that an idle bucket never holds more than burst tokens."""
+        bucket = TokenBucket("test-bucket", rate=1, burst=2)
+        bucket.take(now=0)
+        assert [bucket.take(now=1000) for _ in range(3)][-1] > 0
+
+
+@pytest.mark.django_db
+class TestAPIThrottles:
+    """Tests for the token-bucket throttles on the replica endpoints."""
+
+    @pytest.fixture
+    def client(self):
+        User.objects.create_user(username="testuser", password="testpass123")
+        client = Client()
+        client.login(username="testuser", password="testpass123")
+        return client
+
+    def test_user_bucket(self, client, settings):
+        """Test that a user over their bucket gets 429 with Retry-After."""
+        settings.TOKEN_BUCKET_THROTTLES = {"stats": (0.01, 2)}
+        url = reverse("api-stats")
+        assert client.get(url).status_code == 200
+        assert client.get(url).status_code == 200
+        response = client.get(url)
+        assert response.status_code == 429
+        assert int(response["Retry-After"]) > 0
+
+    def test_async_views_share_buckets(self, client, settings):
+        """Test that the async stats URL draws from the same bucket."""
+        settings.TOKEN_BUCKET_THROTTLES = {"stats": (0.01, 2)}
+        assert client.get(reverse("api-stats")).status_code == 200
+        assert client.get(reverse("api-async-stats")).status_code == 200
+        response = client.get(reverse("api-async-stats"))
+        assert response.status_code == 429
+        assert int(response["Retry-After"]) > 0
+
+    def test_global_bucket(self, client, settings):
+        """Test that the global bucket is shared by all users."""
+        settings.TOKEN_BUCKET_THROTTLES = {"search-global": (0.01, 1)}
+        User.objects.create_user(username="other", password="testpass123")
+        other = Client()
+        other.login(username="other", password="testpass123")
+
+        url = reverse("api-search") + "?q=test"
+        assert client.get(url).status_code != 429
+        assert other.get(url).status_code == 429
+
+    def test_rejected_requests_leave_global_bucket(self, client, settings):
+        """Test that requests over the user bucket take no global token."""
+        settings.TOKEN_BUCKET_THROTTLES = {
+            "stats": (0.001, 1),
+            "stats-global": (0.001, 3),
+        }
+        User.objects.create_user(username="other", password="testpass123")
+        other = Client()
+        other.login(username="other", password="testpass123")
+
+        url = reverse("api-stats")
+        statuses = [client.get(url).status_code for _ in range(5)]
+        assert statuses == [200, 429, 429, 429, 429]
+        assert other.get(url).status_code == 200
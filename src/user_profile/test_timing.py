@@ -0,0 +1,66 @@
+import logging
+
+import pytest
+from django.urls import reverse
+
+from user_profile.timing import RequestTimer, _current_timer, current_timer, phase
+
+
+class TestPhase:
+    """Tests for the phase timing API."""
+
+    def test_records_into_current_timer(self):
+        """Test that phases add up per name on the current timer."""
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+        try:
+            with phase("work"):
+                pass
+
+            @phase("work")
+            def work():
+                return 42
+
+            assert work() == 42
+        finally:
+            _current_timer.reset(token)
+
+        duration, count = timer.phases["work"]
+        assert count == 2
+        assert duration >= 0
+        assert "work;dur=" in timer.server_timing()
+
+    def test_noop_outside_request(self):
+        """Test that phase works without a current timer."""
+        assert current_timer() is None
+        with phase("work"):
+            pass
+
+
+@pytest.mark.django_db
+class TestRequestTimingMiddleware:
+    """Tests for the request timing middleware."""
+
+    def test_server_timing_header(self, authenticated_client):
+        """Test that responses carry total and per-alias query timings."""
+        response = authenticated_client.get(reverse("api-user"))
+        header = response["Server-Timing"]
+        assert header.startswith("total;dur=")
+        assert "db-default;dur=" in header
+        assert 'desc="' in header
+
+    def test_logs_request_fields(self, authenticated_client, caplog):
+        """Test that each request is logged with its url name and timings."""
+        with caplog.at_level(logging.INFO, logger="user_profile.timing"):
+            authenticated_client.get(reverse("api-user"))
+
+        [record] = [r for r in caplog.records if r.name == "user_profile.timing"]
+        assert record.timing["url_name"] == "api-user"
+        assert record.timing["db_default_queries"] > 0
+        assert "url_name=api-user" in record.getMessage()
+
+    def test_header_can_be_disabled(self, client, settings):
+        """Test that REQUEST_TIMING_HEADER=False omits the header."""
+        settings.REQUEST_TIMING_HEADER = False
+        response = client.get(reverse("search"))
+        assert "Server-Timing" not in response
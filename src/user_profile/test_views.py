@@ -1,8 +1,14 @@
+import html
+import re
+
 import pytest
 from django.contrib.auth.models import User
 from django.test import Client
 from django.urls import reverse
 
+from user_profile import views
+from user_profile.search import search_pages
+
 
 @pytest.fixture
 def client():
@@ -86,3 +92,26 @@ class TestSearchView:
         """Test search with query parameter."""
         response = authenticated_client.get(reverse("search"), {"q": "test"})
         assert response.status_code == 200
+
+    def test_follows_next_cursor(
+        self, authenticated_client, fixture_replica, monkeypatch
+    ):
+        """Test that the next page link continues after the first page."""
+        monkeypatch.setattr(views, "replica_available", lambda: True)
+        expected = [
+            page.page_id for page in search_pages("_", exclude_redirects=False, limit=6)
+        ]
+
+        response = authenticated_client.get(
+            reverse("search"), {"q": "_", "mode": "substring", "limit": 3}
+        )
+        assert response.context["mode"] == "substring"
+        first = [page.page_id for page in response.context["results"]]
+
+        link = re.search(r'href="(\?[^"]*cursor=[^"]*)"', response.content.decode())
+        query = html.unescape(link.group(1))
+        assert "mode=substring" in query
+        response = authenticated_client.get(reverse("search") + query)
+        second = [page.page_id for page in response.context["results"]]
+
+        assert first + second == expected
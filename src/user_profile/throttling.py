@@ -0,0 +1,109 @@
+"""
+Token-bucket throttles protecting the wiki replica.
+
+Unlike DRF's window-based throttles, a token bucket lets a client make a
+short burst of ``burst`` requests and then sustain ``rate`` requests per
+second. Buckets are configured per throttle scope in ``TOKEN_BUCKET_THROTTLES``:
+
+    TOKEN_BUCKET_THROTTLES = {
+        "search": (0.5, 10),          # per user
+        "search-global": (20, 50),    # shared by all users
+    }
+
+Views opt in with ``throttle_scope`` and ``TokenBucketThrottle``; plain
+Django views call ``throttle_wait`` instead. The shared bucket only gives
+a token to requests the user's bucket allowed, so a client retrying on 429
+cannot drain it for everyone else.
+Bucket state lives in the shared cache. Updates are serialized within a
+process, but workers can race each other, so a bucket may let slightly
+more through than configured.
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucket:
+    """A bucket of ``burst`` tokens refilled at ``rate`` tokens per second."""
+
+    def __init__(self, key, rate, burst):
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+
+    def take(self, now=None):
+        """
+        Takes one token. Returns 0 if one was available, otherwise the
+        seconds until the next token.
+        """
+        now = time.time() if now is None else now
+        tokens, updated = cache.get(self.key) or (self.burst, now)
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            cache.set(self.key, (tokens, now), self.ttl())
+            return (1 - tokens) / self.rate
+        cache.set(self.key, (tokens - 1, now), self.ttl())
+        return 0
+
+    def ttl(self):
+        """Seconds until an untouched bucket is full again."""
+        return int(self.burst / self.rate) + 1
+
+
+_bucket_lock = threading.Lock()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Takes a token from the per-user bucket of the view's ``throttle_scope``
+    (per client address for anonymous requests), then from the bucket of
+    ``<scope>-global`` shared by all users.
+    """
+
+    def get_buckets(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if not scope:
+            return []
+        config = getattr(settings, "TOKEN_BUCKET_THROTTLES", {})
+        buckets = []
+        for suffix, ident in (("", self.get_ident_key(request)), ("-global", "all")):
+            if scope + suffix in config:
+                rate, burst = config[scope + suffix]
+                buckets.append(
+                    TokenBucket(f"throttle-bucket:{scope}{suffix}:{ident}", rate, burst)
+                )
+        return buckets
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"user-{request.user.pk}"
+        return f"ip-{self.get_ident(request)}"
+
+    def allow_request(self, request, view):
+        self.wait_seconds = 0
+        with _bucket_lock:
+            for bucket in self.get_buckets(request, view):
+                self.wait_seconds = bucket.take()
+                if self.wait_seconds:
+                    return False
+        return True
+
+    def wait(self):
+        return getattr(self, "wait_seconds", None)
+
+
+def throttle_wait(request, scope):
+    """
+    Takes a token from the user and global buckets of ``scope`` for a view
+    that is not a DRF view. Returns None if the request may go ahead,
+    otherwise the seconds until it may be retried.
+    """
+    throttle = TokenBucketThrottle()
+    if throttle.allow_request(request, SimpleNamespace(throttle_scope=scope)):
+        return None
+    return throttle.wait()
@@ -0,0 +1,157 @@
+"""
+Lightweight per-request timing.
+
+``RequestTimingMiddleware`` gives each request a ``RequestTimer`` held in a
+context variable. Code marks the parts worth knowing about with ``phase``,
+as a context manager or decorator::
+
+    with phase("mediawiki"):
+        site.get(...)
+
+and every database query is counted and timed per alias by an execute
+wrapper installed on each new connection. The results are sent back in a
+``Server-Timing`` header and written as one log line per request.
+
+Context variables follow ``sync_to_async`` onto worker threads, so the
+phases of the async views are recorded too. Outside a request, ``phase``
+and the query wrapper do nothing but check the context variable.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current_timer = ContextVar("request_timer", default=None)
+
+
+class RequestTimer:
+    """Accumulated phase and query timings of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.queries = {}
+        self._lock = threading.Lock()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def add_phase(self, name, duration_ms):
+        with self._lock:
+            total, count = self.phases.get(name, (0.0, 0))
+            self.phases[name] = (total + duration_ms, count + 1)
+
+    def add_query(self, alias, duration_ms):
+        with self._lock:
+            total, count = self.queries.get(alias, (0.0, 0))
+            self.queries[alias] = (total + duration_ms, count + 1)
+
+    def server_timing(self):
+        """Returns the value of the ``Server-Timing`` header."""
+        metrics = [f"total;dur={self.elapsed_ms():.1f}"]
+        for name, (duration, _) in self.phases.items():
+            metrics.append(f"{name};dur={duration:.1f}")
+        for alias, (duration, count) in self.queries.items():
+            noun = "query" if count == 1 else "queries"
+            metrics.append(f'db-{alias};dur={duration:.1f};desc="{count} {noun}"')
+        return ", ".join(metrics)
+
+    def as_fields(self):
+        """Returns the timings as a flat dict for structured logging."""
+        fields = {"total_ms": round(self.elapsed_ms(), 1)}
+        for name, (duration, count) in self.phases.items():
+            fields[f"{name}_ms"] = round(duration, 1)
+            if count > 1:
+                fields[f"{name}_calls"] = count
+        for alias, (duration, count) in self.queries.items():
+            fields[f"db_{alias}_ms"] = round(duration, 1)
+            fields[f"db_{alias}_queries"] = count
+        return fields
+
+
+def current_timer():
+    """Returns the timer of the request being handled, or None."""
+    return _current_timer.get()
+
+
+@contextmanager
+def phase(name):
+    """Adds the time spent in the block to the current request's ``name`` phase."""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add_phase(name, (time.perf_counter() - start) * 1000)
+
+
+def time_query(execute, sql, params, many, context):
+    """Execute wrapper that records query time per database alias."""
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.add_query(
+            context["connection"].alias, (time.perf_counter() - start) * 1000
+        )
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """``connection_created`` receiver adding ``time_query`` to a connection."""
+    if time_query not in connection.execute_wrappers:
+        # Outermost, so the time includes the other wrappers.
+        connection.execute_wrappers.insert(0, time_query)
+
+
+def format_log_fields(fields):
+    return " ".join(f"{key}={value}" for key, value in fields.items())
+
+
+class RequestTimingMiddleware:
+    """
+    Times each request and reports the phases in a ``Server-Timing`` header
+    (unless ``REQUEST_TIMING_HEADER`` is False) and in an INFO log line.
+    Should come first in ``MIDDLEWARE`` so the total covers the others.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+
+        if getattr(settings, "REQUEST_TIMING_HEADER", True):
+            response["Server-Timing"] = timer.server_timing()
+
+        if logger.isEnabledFor(logging.INFO):
+            match = request.resolver_match
+            fields = {
+                "method": request.method,
+                "path": request.path,
+                "url_name": match.url_name if match else None,
+                "status": response.status_code,
+                **timer.as_fields(),
+            }
+            logger.info(
+                "request %s", format_log_fields(fields), extra={"timing": fields}
+            )
+        return response
@@ -1,6 +1,6 @@
 from django.urls import include, path
 
-from . import api_views, views
+from . import api_views, async_views, views
 
 urlpatterns = [
     path("profile", views.profile, name="profile"),
@@ -11,5 +11,35 @@ urlpatterns = [
     path("", views.index),
     path("api/user/", api_views.UserInfoAPIView.as_view(), name="api-user"),
     path("api/stats/", api_views.WikiStatsAPIView.as_view(), name="api-stats"),
+    path(
+        "api/stats/namespaces/",
+        api_views.NamespaceStatsAPIView.as_view(),
+        name="api-stats-namespaces",
+    ),
+    path(
+        "api/stats/batch/",
+        api_views.BatchWikiStatsAPIView.as_view(),
+        name="api-stats-batch",
+    ),
     path("api/search/", api_views.SearchAPIView.as_view(), name="api-search"),
+    path(
+        "api/search/export/",
+        api_views.SearchExportAPIView.as_view(),
+        name="api-search-export",
+    ),
+    path(
+        "api/contributions/",
+        api_views.ContributionsAPIView.as_view(),
+        name="api-contributions",
+    ),
+    path(
+        "api/pages/lookup/",
+        api_views.PageLookupAPIView.as_view(),
+        name="api-pages-lookup",
+    ),
+    path("api/random/", api_views.RandomPagesAPIView.as_view(), name="api-random"),
+    path("api/async/user/", async_views.user_info, name="api-async-user"),
+    path("api/async/stats/", async_views.wiki_stats, name="api-async-stats"),
+    path("api/async/search/", async_views.search, name="api-async-search"),
+    path("api/async/profile/", async_views.profile, name="api-async-profile"),
 ]
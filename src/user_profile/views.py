@@ -1,12 +1,15 @@
-from urllib.parse import urlparse
-
-from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
-from mwclient import Site
 from social_django.models import UserSocialAuth
 
-from .models import WikiActor, WikiPage, WikiRevision
+from .credentials import remember_username, resolve_credentials
+from .mediawiki import get_userinfo
+from .namespaces import parse_namespace
+from .pagination import InvalidCursor
+from .replica import ReplicaQueryTimeout, replica_available
+from .search import DEFAULT_SEARCH_MODE, SEARCH_MODES, search_page
+from .stats import get_total_articles, get_user_edit_count
+from .timing import phase
 
 
 def index(request):
@@ -22,76 +25,30 @@ def profile(request):
     wiki_stats = {}
 
     try:
-        social_auth = request.user.social_auth.get(provider="mediawiki")
-
-        mw_username = (
-            social_auth.extra_data.get("username")
-            or social_auth.extra_data.get("user", {}).get("name")
-            or None
-        )
-
-        token_blob = social_auth.extra_data.get("access_token") or {}
-        if isinstance(token_blob, dict):
-            access_key = token_blob.get("oauth_token") or token_blob.get("key")
-            access_secret = token_blob.get("oauth_token_secret") or token_blob.get(
-                "secret"
-            )
-        else:
-            access_key = token_blob
-            access_secret = social_auth.extra_data.get("access_token_secret")
+        mw_username, access_key, access_secret = resolve_credentials(request)
 
         if not access_key or not access_secret:
             raise ValueError("Missing OAuth access token/secret")
 
-        parsed_url = urlparse(settings.SOCIAL_AUTH_MEDIAWIKI_URL)
-        host = parsed_url.netloc
-        path = "/w/"
-
-        site = Site(
-            host,
-            path=path,
-            consumer_token=settings.SOCIAL_AUTH_MEDIAWIKI_KEY,
-            consumer_secret=settings.SOCIAL_AUTH_MEDIAWIKI_SECRET,
-            access_token=access_key,
-            access_secret=access_secret,
+        user_info = get_userinfo(
+            request.user.pk,
+            access_key,
+            access_secret,
+            refresh=request.GET.get("refresh") == "1",
         )
 
-        result = site.get("query", meta="userinfo", uiprop="email|groups|rights")
-        user_info = result.get("query", {}).get("userinfo", {})
-
         if not mw_username:
             mw_username = user_info.get("name")
             if mw_username:
-                social_auth.extra_data["username"] = mw_username
-                social_auth.save()
+                remember_username(request, mw_username)
 
         try:
-            if "wiki_replica" in settings.DATABASES:
-                total_articles = (
-                    WikiPage.objects.using("wiki_replica")
-                    .filter(page_namespace=0, page_is_redirect=False)
-                    .count()
-                )
+            if replica_available():
+                total_articles = get_total_articles()
 
                 user_edit_count = 0
                 if mw_username:
-                    username_bytes = (
-                        mw_username.encode("utf-8")
-                        if isinstance(mw_username, str)
-                        else mw_username
-                    )
-                    actor = (
-                        WikiActor.objects.using("wiki_replica")
-                        .filter(actor_name=username_bytes)
-                        .first()
-                    )
-
-                    if actor:
-                        user_edit_count = (
-                            WikiRevision.objects.using("wiki_replica")
-                            .filter(rev_actor=actor.actor_id)
-                            .count()
-                        )
+                    user_edit_count = get_user_edit_count(mw_username)
 
                 wiki_stats = {
                     "total_articles": total_articles,
@@ -116,7 +73,8 @@ def profile(request):
         "error": error,
         "wiki_stats": wiki_stats,
     }
-    return render(request, "user_profile/profile.dtl", context)
+    with phase("render"):
+        return render(request, "user_profile/profile.dtl", context)
 
 
 def login_oauth(request):
@@ -133,6 +91,8 @@ def search_articles(request):
     limit = 10
     namespace = 0
     exclude_redirects = True
+    mode = DEFAULT_SEARCH_MODE
+    next_cursor = None
     error = None
 
     if request.method == "GET" and request.GET.get("q"):
@@ -142,30 +102,31 @@ def search_articles(request):
         except ValueError:
             limit = 10
 
-        try:
-            namespace = int(request.GET.get("namespace", 0))
-        except ValueError:
-            namespace = 0
+        namespace = parse_namespace(request.GET.get("namespace"))
 
         exclude_redirects = request.GET.get("exclude_redirects") == "on"
 
+        mode = request.GET.get("mode", DEFAULT_SEARCH_MODE)
+        if mode not in SEARCH_MODES:
+            mode = DEFAULT_SEARCH_MODE
+
         try:
-            if "wiki_replica" not in settings.DATABASES:
+            if not replica_available():
                 error = "Search is only available on Toolforge (wiki replica database not configured locally)"
             else:
-                query = WikiPage.objects.using("wiki_replica").filter(
-                    page_namespace=namespace
+                results, next_cursor = search_page(
+                    search_query,
+                    cursor=request.GET.get("cursor"),
+                    namespace=namespace,
+                    exclude_redirects=exclude_redirects,
+                    limit=limit,
+                    mode=mode,
                 )
 
-                if search_query:
-                    search_term = search_query.replace(" ", "_")
-                    query = query.filter(page_title__contains=search_term)
-
-                if exclude_redirects:
-                    query = query.filter(page_is_redirect=False)
-
-                results = list(query[:limit])
-
+        except InvalidCursor:
+            error = "Invalid page cursor, please start the search again."
+        except ReplicaQueryTimeout:
+            error = "The search took too long, try a prefix search or a longer term."
         except Exception as e:
             error = f"Search error: {str(e)}"
             import traceback
@@ -178,9 +139,13 @@ def search_articles(request):
         "limit": limit,
         "namespace": namespace,
         "exclude_redirects": exclude_redirects,
+        "mode": mode,
+        "search_modes": SEARCH_MODES,
+        "next_cursor": next_cursor,
         "error": error,
     }
-    return render(request, "user_profile/search.dtl", context)
+    with phase("render"):
+        return render(request, "user_profile/search.dtl", context)
 
 
 @login_required